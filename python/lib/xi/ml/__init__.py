@@ -1,9 +1,26 @@
 # -*-coding:utf-8 -*
 
 
+import sys
+import importlib
 
-import gensim
-import sklearn
-
-from . import common, error, tools, corpus, transform, classify
 from .version import __version__
+
+
+# subpackages imported on first access: the NumPy-only modules
+# (ex: the shape engine) load without gensim and sklearn
+__all__ = [
+    'common', 'error', 'tools', 'corpus', 'transform', 'classify', 'index']
+
+def __getattr__(name):
+    """Import the subpackage on first access (python >= 3.7)"""
+
+    if name in __all__:
+        return importlib.import_module('.' + name, __name__)
+
+    raise AttributeError(
+        "module '{}' has no attribute '{}'".format(__name__, name))
+
+if sys.version_info < (3, 7):
+    for _name in __all__:
+        globals()[_name] = __getattr__(_name)
@@ -1,10 +1,40 @@
 # -*-coding:utf-8 -*
 
 
-from .train_classifier import TrainClassifier
-from .multiclass_classifier import MulticlassClassifier
-from .multilabel_classifier import MultilabelClassifier
+import sys
+import importlib
 
-from .load_classifier import LoadClassifier
-from .prediction_statistics import PredictionStatistics
-from .eval_metrics import EvalMetrics
+
+# classes imported from their module on first access: the NumPy-only
+# modules (ex: the shape engine) load without sklearn
+_MODULES = {
+    'TrainClassifier': 'train_classifier',
+    'MulticlassClassifier': 'multiclass_classifier',
+    'MultilabelClassifier': 'multilabel_classifier',
+
+    'LoadClassifier': 'load_classifier',
+    'PredictionStatistics': 'prediction_statistics',
+    'EvalMetrics': 'eval_metrics',
+    'ClassifyPipeline': 'classify_pipeline',
+    'ParallelPrediction': 'parallel_prediction',
+    'ParallelTraining': 'parallel_training',
+    'ShapeClassifier': 'shape_classifier',
+    'StreamingTrainer': 'streaming_trainer',
+    'CascadeClassifier': 'cascade_classifier'
+}
+
+__all__ = list(_MODULES)
+
+def __getattr__(name):
+    """Import the class from its module on first access (python >= 3.7)"""
+
+    if name in _MODULES:
+        module = importlib.import_module('.' + _MODULES[name], __name__)
+        return getattr(module, name)
+
+    raise AttributeError(
+        "module '{}' has no attribute '{}'".format(__name__, name))
+
+if sys.version_info < (3, 7):
+    for _name in __all__:
+        globals()[_name] = __getattr__(_name)
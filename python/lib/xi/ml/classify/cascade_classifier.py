@@ -0,0 +1,304 @@
+# -*-coding:utf-8 -*
+
+
+import json
+import time
+
+import numpy
+
+from xi.ml.common import Component
+from xi.ml.tools import utils
+from xi.ml.error import ConfigError
+from xi.ml.classify.load_classifier import LoadClassifier, store_predictions
+from xi.ml.classify.prediction_statistics import div
+
+
+def categories_set(labels):
+    """Return the set of a document's categories (one or a list)"""
+
+    if isinstance(labels, str):
+        return set([labels])
+
+    return set(labels)
+
+def correct_predictions(doc_classes, labels):
+    """
+    Return the boolean array of the correctly classified documents:
+    the predicted categories are the real ones (a category or a list
+    of categories, compared as sets)
+    """
+
+    return numpy.array([
+        categories_set(doc_class) == categories_set(label)
+        for doc_class, label in zip(doc_classes, labels)], dtype=bool)
+
+
+class CascadeClassifier(Component):
+    """
+    Class classifying documents with a cascade of two classifiers:
+    a cheap model classifies every document, and only the documents
+    whose confidence falls below the threshold are escalated to
+    the expensive model (whose predictions replace the cheap ones)
+    """
+
+    def __init__(self, cheap_file, expensive_file, threshold=0.0):
+        """
+        Load the cheap and the expensive classifiers' models
+        and initialize with the escalation threshold
+        """
+
+        super().__init__()
+
+        self.cheap = LoadClassifier(cheap_file)
+        self.expensive = LoadClassifier(expensive_file)
+
+        if set(self.cheap.categories) != set(self.expensive.categories):
+            raise ConfigError(
+                "Cascade classifiers with different categories: {} / {}"
+                .format(self.cheap.categories, self.expensive.categories))
+
+        if self.cheap.multilabel != self.expensive.multilabel:
+            raise ConfigError(
+                'Cascade of a multiclass and a multilabel classifier')
+
+        self.files = [cheap_file, expensive_file]
+        self.categories = list(self.cheap.categories)
+        self.multilabel = self.cheap.multilabel
+        self.threshold = threshold
+
+        # column of each category in the expensive model's probabilities
+        expensive_categories = list(self.expensive.categories)
+        self.columns = [
+            expensive_categories.index(category)
+            for category in self.categories]
+
+        # dev set statistics of the tuned threshold
+        self.stats = {}
+
+        # classified & escalated documents, time spent in each model
+        self.ndocs = 0
+        self.nescalated = 0
+        self.cheap_time = 0.0
+        self.expensive_time = 0.0
+
+    def classify_batch(self, features):
+        """
+        Test the cascade on a batch of new documents (features matrix).
+        Return the predicted categories of each document
+        and the matrix of class-probabilities.
+        """
+
+        if len(features) == 0:
+            return [], numpy.zeros((0, len(self.categories)))
+
+        features = numpy.array(features, dtype=numpy.float64, ndmin=2)
+
+        start = time.time()
+        doc_classes, probas = self.cheap.classify_batch(features)
+        self.cheap_time += time.time() - start
+
+        escalated = numpy.nonzero(self.confidence(probas) < self.threshold)[0]
+
+        if len(escalated) > 0:
+            start = time.time()
+            expensive_classes, expensive_probas = \
+                self.expensive.classify_batch(features[escalated])
+            self.expensive_time += time.time() - start
+
+            probas = numpy.array(probas, dtype=numpy.float64)
+            probas[escalated] = expensive_probas[:, self.columns]
+
+            for index, doc_class in zip(escalated, expensive_classes):
+                doc_classes[index] = doc_class
+
+        self.ndocs += len(features)
+        self.nescalated += len(escalated)
+
+        return doc_classes, probas
+
+    def confidence(self, probas):
+        """
+        Return the confidence of the cheap model in each document's
+        prediction: its top probability (multiclass), or the distance
+        to 0.5 of its least certain category's probability (multilabel:
+        independent decision of each category)
+        """
+
+        probas = numpy.asarray(probas, dtype=numpy.float64)
+
+        if self.multilabel:
+            return numpy.abs(probas - 0.5).min(axis=1)
+
+        return probas.max(axis=1)
+
+    def predictions(self, features):
+        """
+        Test the cascade on a batch of new documents.
+        Return the list of predictions (same format as LoadClassifier).
+        """
+
+        doc_classes, probas = self.classify_batch(features)
+
+        return [
+            {
+                'category': doc_class,
+                'probas': dict(zip(self.categories, doc_probas.tolist()))
+            }
+            for doc_class, doc_probas in zip(doc_classes, probas)]
+
+    def store_prediction(self, input_file, output_file, batch_size=1000):
+        """
+        Test the cascade on 'untagged' documents, by batches.
+        Store prediction category and prediction probability in file.
+        """
+
+        ndocs = store_predictions(
+            self.predictions, input_file, output_file, batch_size)
+        self.logger.info("Stored {} documents to file".format(ndocs))
+
+    def tune(self, features, labels, target_accuracy):
+        """
+        Tune the threshold on the dev documents (features & real categories):
+        the lowest threshold (fewest escalated documents) whose cascade
+        accuracy reaches the target accuracy (the best accuracy otherwise).
+        Return the threshold.
+        """
+
+        if len(features) == 0:
+            raise ConfigError('No dev documents to tune the cascade threshold')
+
+        features = numpy.array(features, dtype=numpy.float64, ndmin=2)
+        ndocs = len(features)
+
+        start = time.time()
+        cheap_classes, cheap_probas = self.cheap.classify_batch(features)
+        cheap_time = time.time() - start
+
+        start = time.time()
+        expensive_classes, _ = self.expensive.classify_batch(features)
+        expensive_time = time.time() - start
+
+        cheap_correct = correct_predictions(cheap_classes, labels)
+        expensive_correct = correct_predictions(expensive_classes, labels)
+
+        # documents sorted from the least confident cheap prediction:
+        # accuracy when escalating the first 0, 1, ..., ndocs documents
+        confidence = self.confidence(cheap_probas)
+        order = numpy.argsort(confidence, kind='mergesort')
+        top = confidence[order]
+
+        changes = numpy.cumsum(
+            expensive_correct[order].astype(numpy.int64) -
+            cheap_correct[order])
+        accuracies = (
+            cheap_correct.sum() + numpy.concatenate(([0], changes))) / \
+            float(ndocs)
+
+        # a threshold only separates different confidences
+        valid = numpy.ones(ndocs + 1, dtype=bool)
+        valid[1:ndocs] = top[1:] > top[:-1]
+
+        reached = numpy.nonzero(valid & (accuracies >= target_accuracy))[0]
+
+        if len(reached) > 0:
+            nescalated = reached[0]
+        else:
+            nescalated = numpy.nonzero(valid)[0][
+                numpy.argmax(accuracies[valid])]
+
+            self.logger.warning(
+                "Target accuracy {:.2%} not reached by the cascade: "
+                "best accuracy {:.2%}"
+                .format(target_accuracy, accuracies[nescalated]))
+
+        if nescalated == 0:
+            self.threshold = float(top[0])
+        elif nescalated == ndocs:
+            self.threshold = float(numpy.nextafter(top[-1], 2.0))
+        else:
+            self.threshold = float(
+                (top[nescalated - 1] + top[nescalated]) / 2.0)
+
+        escalated = nescalated / float(ndocs)
+
+        self.stats = {
+            'ndocs': ndocs,
+            'threshold': self.threshold,
+            'target_accuracy': target_accuracy,
+            'accuracy': float(accuracies[nescalated]),
+            'cheap_accuracy': float(cheap_correct.mean()),
+            'expensive_accuracy': float(expensive_correct.mean()),
+            'escalated': escalated,
+            'cheap_time': cheap_time,
+            'expensive_time': expensive_time,
+            'speedup': div(
+                expensive_time, cheap_time + escalated * expensive_time)
+        }
+
+        self.logger.info(
+            "Tuned the cascade threshold on {} dev documents: {:.4f} "
+            "(accuracy {:.2%}, cheap {:.2%}, expensive {:.2%}; "
+            "{:.2%} escalated, estimated speedup x{:.2f})"
+            .format(
+                ndocs, self.threshold, self.stats['accuracy'],
+                self.stats['cheap_accuracy'],
+                self.stats['expensive_accuracy'], escalated,
+                self.stats['speedup']))
+
+        return self.threshold
+
+    def report(self):
+        """
+        Log and return the fraction of escalated documents and the
+        throughput gain against the expensive classifier alone
+        (estimated from its time on the escalated or on the dev documents)
+        """
+
+        elapsed = self.cheap_time + self.expensive_time
+
+        report = {
+            'ndocs': self.ndocs,
+            'escalated': div(self.nescalated, self.ndocs),
+            'docs_per_second': div(self.ndocs, elapsed),
+            'throughput_gain': None
+        }
+
+        # time of the expensive classifier for one document
+        expensive_doc_time = None
+        if self.nescalated > 0:
+            expensive_doc_time = self.expensive_time / float(self.nescalated)
+        elif self.stats:
+            expensive_doc_time = \
+                self.stats['expensive_time'] / float(self.stats['ndocs'])
+
+        if expensive_doc_time is not None:
+            report['throughput_gain'] = div(
+                expensive_doc_time * self.ndocs, elapsed)
+
+        self.logger.info(
+            "Cascade classified {} documents: {:.2%} escalated, "
+            "{:.1f} documents per second (throughput gain: {})"
+            .format(
+                report['ndocs'], report['escalated'],
+                report['docs_per_second'],
+                'n/a' if report['throughput_gain'] is None
+                else "x{:.2f}".format(report['throughput_gain'])))
+
+        return report
+
+    def save(self, output):
+        """Save the cascade's models, threshold and dev statistics (json)"""
+
+        utils.create_path(output)
+
+        with open(output, 'w') as ostream:
+            ostream.write(json.dumps({
+                'cheap': self.files[0],
+                'expensive': self.files[1],
+                'threshold': self.threshold,
+                'dev': self.stats,
+                'test': self.report()
+            }, indent=2))
+
+        self.logger.info(
+            "Saved the cascade's threshold under the '{}' file".format(output))
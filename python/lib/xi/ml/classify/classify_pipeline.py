@@ -0,0 +1,109 @@
+# -*-coding:utf-8 -*
+
+
+from xi.ml.common import Component
+from xi.ml.tools import utils
+from xi.ml.error import ConfigError, CaughtException
+from xi.ml.corpus import StreamCorpus, PushCorpus
+
+
+class ClassifyPipeline(Component):
+    """
+    Class transforming and classifying preprocessed documents in one pass:
+    each batch of documents goes through the dictionary, the TF-IDF model,
+    the transformation model and all the classifiers, without intermediate
+    transformed files
+    """
+
+    def __init__(self, transformer, classifiers):
+        """
+        Initialize with the loaded transformation model (LoadTransformer)
+        and the loaded classifiers (dict of LoadClassifier)
+        """
+
+        super().__init__()
+
+        if not classifiers:
+            raise ConfigError('No classifier given to the pipeline')
+
+        self.transformer = transformer
+        self.classifiers = dict(classifiers)
+
+    def store_predictions(
+            self, input_file, output_files, dict_file, tfidf_file,
+            features_file=None):
+
+        """
+        Transform and classify the preprocessed documents of the input file.
+        Store the predictions of each classifier in its output file
+        (same keys as the classifiers); store the transformed documents
+        in the features file when given.
+        """
+
+        for key in self.classifiers:
+            if key not in output_files:
+                raise ConfigError(
+                    "No output file for the '{}' classifier".format(key))
+
+        utils.check_file_readable(input_file)
+
+        for classifier in self.classifiers.values():
+            if not classifier.prediction_checkups():
+                return
+
+        cdictionary, tfidf_model = self.transformer.load_resources(
+            dict_file, tfidf_file)
+
+        sc = StreamCorpus(input_file)
+        pool = self.transformer.create_pool()
+
+        streams = {}
+        try:
+            for key in self.classifiers:
+                streams[key] = PushCorpus(output_files[key])
+
+            if features_file is not None:
+                streams[None] = PushCorpus(features_file)
+
+            self.timer.start_timer()
+            ndocs = 0
+
+            for batch in sc.batches(self.transformer.options['batch_size']):
+                docs = [
+                    doc for doc in batch if 'content' in doc and 'id' in doc]
+
+                features = self.transformer.transform_batch(
+                    cdictionary, tfidf_model,
+                    [doc['content'] for doc in docs],
+                    [doc['id'] for doc in docs],
+                    pool)
+
+                if features_file is not None:
+                    for doc, doc_features in zip(docs, features):
+                        streams[None].add(dict(doc, features=doc_features))
+
+                for key, classifier in self.classifiers.items():
+                    for doc, prediction in zip(
+                            docs, classifier.predictions(features)):
+
+                        streams[key].add(dict(
+                            doc,
+                            season=prediction['category'],
+                            season_prob=prediction['probas']))
+
+                ndocs += len(docs)
+        except Exception as e:
+            raise CaughtException(
+                "Exception encountered when classifying documents: {}"
+                .format(e))
+        else:
+            self.timer.stop_timer(
+                "Transformed and classified {} documents ({} classifiers)"
+                .format(ndocs, len(self.classifiers)))
+        finally:
+            for stream in streams.values():
+                stream.close_stream()
+
+            if pool is not None:
+                pool.close()
+                pool.join()
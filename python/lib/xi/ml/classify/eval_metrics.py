@@ -1,14 +1,15 @@
 # -*-coding:utf-8 -*
 
 
-import itertools
+import numpy
 import pylab
 
 import sklearn.metrics
 
 from xi.ml.common import Component
 from xi.ml.tools import utils
-from xi.ml.corpus import StreamCorpus
+from xi.ml.classify.label_indicator import load_predictions, \
+    load_predictions_probas
 
 def percentage(x):
     """Convert decimal to percentage. Return a string"""
@@ -40,55 +41,16 @@ class EvalMetrics(Component):
 
         self.logger.info('Compute global confusion matrix')
 
-        true_labels = []
-        pred_labels = []
+        real, predicted = load_predictions(self.data_files, self.categories)
+        real = real.astype(numpy.int64)
+        predicted = predicted.astype(numpy.int64)
 
-        for input_file in self.data_files:
-            sc = StreamCorpus(input_file)
+        # correct predictions on the diagonal,
+        # then all the combinations of the wrong real-predicted categories
+        correct = real.multiply(predicted)
 
-            for doc in sc:
-                if 'category' in doc and 'season' in doc:
-
-                    # convert real categories to list
-                    real_categories = doc['category']
-                    if isinstance(real_categories, str):
-                        real_categories = [real_categories]
-
-                    # convert predicted categories to list
-                    pred_categories = doc['season']
-                    if isinstance(pred_categories, str):
-                        pred_categories = [pred_categories]
-
-                    # save correct predictions
-                    for real_cat in real_categories:
-                        if real_cat in pred_categories:
-                            true_labels.append(real_cat)
-                            pred_labels.append(real_cat)
-
-                            # delete the correct label
-                            # from real labels and predicted labels
-                            real_categories.remove(real_cat)
-                            pred_categories.remove(real_cat)
-
-                    # save wrong predictions
-                    # combine all possible real-predicted categories
-                    if real_categories and pred_categories:
-                        params = {
-                            'real': real_categories,
-                            'predicted': pred_categories
-                        }
-
-                        for combination in itertools.product(*params.values()):
-                            dict_comb = dict(zip(params.keys(), combination))
-
-                            real_cat = dict_comb['real']
-                            pred_cat = dict_comb['predicted']
-
-                            true_labels.append(real_cat)
-                            pred_labels.append(pred_cat)
-
-        cm = sklearn.metrics.confusion_matrix(
-            true_labels, pred_labels, labels=self.categories)
+        cm = numpy.diag(numpy.asarray(correct.sum(axis=0)).ravel())
+        cm += (real - correct).T.dot(predicted - correct).toarray()
 
         self.logger.info(
             "Confusion-matrix on {} classes:\n{}".format(self.categories, cm))
@@ -115,41 +77,17 @@ class EvalMetrics(Component):
         roc = {}
         _, fig = pylab.subplots()
 
-        for index, category in enumerate(self.categories):
-            true_labels = []
-            pred_labels = []
-            pred_probas = []
-
-            for input_file in self.data_files:
-                sc = StreamCorpus(input_file)
-
-                for doc in sc:
-                    if 'category' in doc and 'season' in doc \
-                        and 'season_prob' in doc:
-
-                        # convert real categories to list
-                        real_categories = doc['category']
-                        if isinstance(real_categories, str):
-                            real_categories = [real_categories]
-
-                        # convert predicted categories to list
-                        pred_categories = doc['season']
-                        if isinstance(pred_categories, str):
-                            pred_categories = [pred_categories]
+        # indicator matrices of the real & predicted categories
+        # and predicted probabilities (documents read once)
+        real, predicted, probas = load_predictions_probas(
+            self.data_files, self.categories)
+        real = real.toarray()
+        predicted = predicted.toarray()
 
-                        # check if 'category'
-                        # present in the list of real categories
-                        real_cat = 1 if category in real_categories else 0
-
-                        # check if 'category'
-                        # present in the list of predicted categories
-                        pred_cat = 1 if category in pred_categories else 0
-
-                        pred_proba = doc['season_prob'][category]
-
-                        true_labels.append(real_cat)
-                        pred_labels.append(pred_cat)
-                        pred_probas.append(pred_proba)
+        for index, category in enumerate(self.categories):
+            true_labels = real[:, index]
+            pred_labels = predicted[:, index]
+            pred_probas = probas[:, index]
 
             prec = sklearn.metrics.precision_score(true_labels, pred_labels)
             recall = sklearn.metrics.recall_score(true_labels, pred_labels)
@@ -0,0 +1,146 @@
+# -*-coding:utf-8 -*
+
+
+import array
+import numpy
+import scipy.sparse
+
+from xi.ml.common import Component
+from xi.ml.corpus import StreamCorpus
+
+
+def indicator_matrix(labels, categories, dense=True):
+    """
+    Return the binary indicator matrix (uint8, one column per category)
+    of the documents' labels: one category or a list of categories
+    per document. ex: ['sport'] => [0, 1, 0] (for [society, sport, unk])
+    """
+
+    indicator = LabelIndicator(categories)
+
+    if len(labels) > 0 and isinstance(labels[0], str):
+        indicator.extend_single(labels)
+    else:
+        for doc_labels in labels:
+            indicator.add(doc_labels)
+
+    return indicator.matrix(dense)
+
+def load_predictions(data_files, categories):
+    """
+    Read the classified documents of the data files in one pass.
+    Return the indicator matrices (sparse) of the real and predicted
+    categories.
+    """
+
+    real, predicted, _ = _read_predictions(data_files, categories, False)
+    return real, predicted
+
+def load_predictions_probas(data_files, categories):
+    """
+    Read the classified documents of the data files in one pass.
+    Return the indicator matrices (sparse) of the real and predicted
+    categories, and the matrix of the predicted probabilities
+    (documents without probabilities skipped).
+    """
+
+    return _read_predictions(data_files, categories, True)
+
+def _read_predictions(data_files, categories, probas):
+    """
+    Return the real & predicted indicator matrices and the probabilities'
+    matrix (empty without 'probas') of the classified documents
+    """
+
+    real = LabelIndicator(categories)
+    predicted = LabelIndicator(categories)
+    doc_probas = []
+
+    for input_file in data_files:
+        for doc in StreamCorpus(input_file):
+            if 'category' not in doc or 'season' not in doc:
+                continue
+
+            if probas:
+                if 'season_prob' not in doc:
+                    continue
+
+                doc_probas.append(
+                    [doc['season_prob'][category] for category in categories])
+
+            real.add(doc['category'])
+            predicted.add(doc['season'])
+
+    return real.matrix(False), predicted.matrix(False), numpy.array(
+        doc_probas, dtype=numpy.float64).reshape(-1, len(categories))
+
+
+class LabelIndicator(Component):
+    """
+    Class building the binary indicator matrix of the documents' categories
+    (sparse CSR rows, integer category indices), one document at a time
+    or by batches of single-category documents
+    """
+
+    def __init__(self, categories):
+        """Initialize with the list of categories (the matrix columns)"""
+
+        super().__init__()
+
+        self.categories = list(categories)
+        self.index = {
+            category: index for index, category in enumerate(categories)}
+
+        # CSR structure: category indices & row pointers of the documents
+        self.indices = array.array('l')
+        self.indptr = array.array('l', [0])
+
+    def __len__(self):
+        """Return the number of documents"""
+
+        return len(self.indptr) - 1
+
+    def add(self, labels):
+        """
+        Add a document with its category or its list of categories
+        (unknown categories ignored)
+        """
+
+        if isinstance(labels, str):
+            labels = [labels]
+
+        self.indices.extend(sorted(set(
+            self.index[label] for label in labels if label in self.index)))
+        self.indptr.append(len(self.indices))
+
+    def extend_single(self, labels):
+        """
+        Add the documents of a single category each
+        (unknown categories ignored)
+        """
+
+        indices = numpy.array(
+            [self.index.get(label, -1) for label in labels], dtype=numpy.int64)
+        known = indices >= 0
+
+        self.indices.extend(indices[known].tolist())
+        self.indptr.extend(
+            (self.indptr[-1] + numpy.cumsum(known)).tolist())
+
+    def matrix(self, dense=True):
+        """
+        Return the indicator matrix of the added documents:
+        dense uint8 array, or sparse CSR matrix
+        """
+
+        indices = numpy.array(self.indices, dtype=numpy.int64)
+        indptr = numpy.array(self.indptr, dtype=numpy.int64)
+
+        matrix = scipy.sparse.csr_matrix(
+            (numpy.ones(len(indices), dtype=numpy.uint8), indices, indptr),
+            shape=(len(self), len(self.categories)))
+
+        if dense:
+            return matrix.toarray()
+
+        return matrix
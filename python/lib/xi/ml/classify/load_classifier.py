@@ -3,11 +3,50 @@
 
 import pickle
 import numpy
+import sklearn
 
 from xi.ml.common import Component
 from xi.ml.tools import utils
 from xi.ml.error import CaughtException
 from xi.ml.corpus import StreamCorpus, PushCorpus
+from xi.ml.classify import model_format
+from xi.ml.classify.predictions import predicted_categories
+
+
+def store_predictions(predictions, input_file, output_file, batch_size=1000):
+    """
+    Classify the documents of the input file by batches, with the
+    'predictions' method of a classifier (features => predictions).
+    Store prediction category and prediction probability in file.
+    Return the number of stored documents.
+    """
+
+    utils.check_file_readable(input_file)
+    utils.create_path(output_file)
+
+    sc = StreamCorpus(input_file)
+
+    try:
+        pc = PushCorpus(output_file)
+
+        for batch in sc.batches(batch_size):
+            docs = [doc for doc in batch if 'features' in doc]
+
+            for doc, prediction in zip(docs, predictions(
+                    [doc['features'] for doc in docs])):
+
+                doc['season'] = prediction['category']
+                doc['season_prob'] = prediction['probas']
+                pc.add(doc)
+    except Exception as e:
+        raise CaughtException(
+            "Exception encountered when storing classified documents: {}"
+            .format(e))
+    finally:
+        pc.close_stream()
+
+    return pc.size
+
 
 class LoadClassifier(Component):
     """
@@ -15,93 +54,144 @@ class LoadClassifier(Component):
     and to predict class and class-probability for new documents.
     """
 
-    def __init__(self, model_file):
-        """Load classifier model from binary file"""
+    def __init__(self, model_file, mmap_mode='r'):
+        """
+        Load classifier model from its model folder (arrays memory-mapped)
+        or from its legacy binary (pickle) file
+        """
 
         super().__init__()
 
         utils.check_file_readable(model_file)
 
         self.model = None
-        with open(model_file, 'rb') as icstream:
-            try:
-                self.model = pickle.load(icstream)
-            except Exception as e:
-                raise CaughtException(
-                    "Exception encountered when loading the classifier: {}"
-                    .format(e))
+        try:
+            if model_format.is_model_folder(model_file):
+                self.model = model_format.load(model_file, mmap_mode)
+
+                version = model_format.sklearn_version(model_file)
+                if version != sklearn.__version__:
+                    self.logger.warning(
+                        "Classifier trained with sklearn {} (current: {})"
+                        .format(version, sklearn.__version__))
+            else:
+                with open(model_file, 'rb') as icstream:
+                    self.model = pickle.load(icstream)
+        except Exception as e:
+            raise CaughtException(
+                "Exception encountered when loading the classifier: {}"
+                .format(e))
 
         self.name = type(self.model).__name__
         self.categories = self.model.classes_
+        self.multilabel = self.is_multilabel()
 
         self.logger.info(
             "Loaded already-trained {} classifier model "
             "from '{}' file".format(self.name, model_file))
 
-    def classify_doc(self, feat):
-        """Test the classifier on a new document"""
+    def is_multilabel(self):
+        """Check whether the model predicts several categories per document"""
+
+        binarizer = getattr(
+            self.model, '_label_binarizer',
+            getattr(self.model, 'label_binarizer_', None))
+        if binarizer is not None:
+            return binarizer.y_type_ == 'multilabel-indicator'
+
+        return getattr(self.model, 'n_outputs_', 1) > 1
+
+    def classify_batch(self, features):
+        """
+        Test the classifier on a batch of new documents (features matrix).
+        Return the predicted categories of each document
+        and the matrix of class-probabilities.
+        """
 
         if not self.prediction_checkups():
-            return {}
+            return [], None
+
+        categories = list(self.categories)
+
+        if len(features) == 0:
+            return [], numpy.zeros((0, len(categories)))
+
+        features = numpy.array(features, dtype=numpy.float64, ndmin=2)
+
+        # one forward pass for the whole batch:
+        # the predicted categories derive from the probabilities
+        probas = self.model.predict_proba(features)
+
+        # multi-output models: probability of the positive class of each output
+        # (zero for an output without positive class)
+        if isinstance(probas, list):
+            probas = numpy.column_stack([
+                proba[:, numpy.asarray(classes) == 1].sum(axis=1)
+                for proba, classes in zip(probas, self.output_classes(probas))])
+
+        return predicted_categories(probas, categories, self.multilabel), probas
+
+    def output_classes(self, probas):
+        """
+        Return the binary classes of each output of a multi-output model
+        (a category missing from the training documents: class 0 only)
+        """
+
+        classes = getattr(self.model, 'output_classes_', None)
+        if classes is not None:
+            return classes
+
+        estimators = getattr(self.model, 'estimators_', None)
+        if isinstance(estimators, list) and len(estimators) == len(probas) \
+                and all(hasattr(model, 'classes_') for model in estimators):
+            return [model.classes_ for model in estimators]
 
-        categories = list(self.model.classes_)
-        features = [float(x) for x in feat]
+        # models saved without their outputs' classes: sorted binary classes
+        return [[0, 1] if proba.shape[1] == 2 else [0] for proba in probas]
 
-        doc_class = self.model.predict([features])
-        doc_class = list(doc_class)[0]
+    def classify_doc(self, feat):
+        """Test the classifier on a new document"""
 
-        doc_proba = self.model.predict_proba([features])
-        doc_proba = dict(zip(categories, list(doc_proba[0])))
+        if not self.prediction_checkups():
+            return {}
 
-        # return real class names when using a multi-label classifier
-        if isinstance(doc_class, numpy.ndarray):
-            doc_class = [categories[index] \
-                for index, val in enumerate(doc_class) if val == 1]
-            if not doc_class:
-                doc_class = [max(doc_proba, key=doc_proba.get)]
+        doc_classes, probas = self.classify_batch([feat])
 
         prediction = {}
-        prediction['category'] = doc_class
-        prediction['probas'] = doc_proba
+        prediction['category'] = doc_classes[0]
+        prediction['probas'] = dict(zip(
+            list(self.categories), [float(x) for x in probas[0]]))
 
         return prediction
 
-    def store_prediction(self, input_file, output_file):
+    def store_prediction(self, input_file, output_file, batch_size=1000):
         """
-        Test the classifier on 'untagged' documents.
+        Test the classifier on 'untagged' documents, by batches.
         Store prediction category and prediction probability in file.
         """
 
         if not self.prediction_checkups():
             return
 
-        utils.check_file_readable(input_file)
-        utils.create_path(output_file)
-
-        sc = StreamCorpus(input_file)
-
-        try:
-            pc = PushCorpus(output_file)
+        ndocs = store_predictions(
+            self.predictions, input_file, output_file, batch_size)
+        self.logger.info("Stored {} documents to file".format(ndocs))
 
-            for doc in sc:
-                if 'features' in doc:
-                    prediction = self.classify_doc(doc['features'])
+    def predictions(self, features):
+        """
+        Test the classifier on a batch of new documents.
+        Return the list of predictions (same format as classify_doc).
+        """
 
-                    if isinstance(prediction, dict) and \
-                        'category' in prediction and \
-                        'probas' in prediction:
+        doc_classes, probas = self.classify_batch(features)
+        categories = list(self.categories)
 
-                        doc['season'] = prediction['category']
-                        doc['season_prob'] = prediction['probas']
-                        pc.add(doc)
-        except Exception as e:
-            raise CaughtException(
-                "Exception encountered when storing classified documents: {}"
-                .format(e))
-        else:
-            self.logger.info("Stored {} documents to file".format(pc.size))
-        finally:
-            pc.close_stream()
+        return [
+            {
+                'category': doc_class,
+                'probas': dict(zip(categories, doc_probas.tolist()))
+            }
+            for doc_class, doc_probas in zip(doc_classes, probas)]
 
     def prediction_checkups(self):
         """Predictions checkups"""
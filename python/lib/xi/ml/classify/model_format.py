@@ -0,0 +1,239 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import json
+import pickle
+import shutil
+import importlib
+
+import numpy
+import sklearn
+
+from xi.ml.tools import utils
+from xi.ml.error import ConfigError, DataError
+
+
+# Module: save and load classifier models as a '.model' folder
+# - manifest.json: format version, sklearn version, estimator class,
+#   its parameters and its fitted attributes
+# - one .npy file per array of the estimator (memory-mapped when loading)
+# - fallback.pkl: the few attributes with no array/json form
+#   (ex: the decision tree structure, the nearest neighbors' trees)
+# Only the estimators saved without fallback.pkl (linear models, MLP, ...)
+# are portable across sklearn versions: the pickled attributes depend on
+# the sklearn version which saved them, as the legacy models do.
+# The training-only state of an estimator (ex: the MLP's optimizer)
+# is not saved: a loaded model predicts, it is not trained further.
+# A legacy classifier model is the pickled estimator itself.
+
+FORMAT = 'xi-ml-classifier'
+VERSION = 1
+EXTENSION = '.model'
+MANIFEST = 'manifest.json'
+FALLBACK = 'fallback.pkl'
+
+# training-only attributes of the estimators: optimizer, early stopping
+# and loss history (copies of the weights for some of them)
+TRAINING_STATE = {
+    'MLPClassifier': [
+        '_optimizer', '_random_state', '_best_coefs', '_best_intercepts',
+        '_no_improvement_count', '_coef_indptr', '_intercept_indptr',
+        'loss_curve_', 'validation_scores_', 'best_validation_score_',
+        'best_loss_']
+}
+
+def is_model_folder(path):
+    """Check whether the path is a classifier model folder"""
+
+    return os.path.isdir(path) \
+        and os.path.exists(os.path.join(path, MANIFEST))
+
+def save(output, model):
+    """Save the estimator under the output folder (replaced if existing)"""
+
+    tmp_folder = output.rstrip(os.sep) + '.tmp'
+    if os.path.isdir(tmp_folder):
+        shutil.rmtree(tmp_folder)
+    utils.create_folder(tmp_folder)
+
+    fallback = {}
+    manifest = {
+        'format': FORMAT,
+        'version': VERSION,
+        'sklearn_version': sklearn.__version__,
+        'estimator': _encode_estimator(model, tmp_folder, '', fallback)
+    }
+
+    if fallback:
+        with open(os.path.join(tmp_folder, FALLBACK), 'wb') as ostream:
+            pickle.dump(fallback, ostream)
+
+    with open(os.path.join(tmp_folder, MANIFEST), 'w') as ostream:
+        json.dump(manifest, ostream, indent=2, sort_keys=True)
+
+    if os.path.isdir(output):
+        shutil.rmtree(output)
+    os.rename(tmp_folder, output)
+
+    return manifest
+
+def load(input_folder, mmap_mode='r'):
+    """Load the estimator saved under the input folder"""
+
+    manifest_file = os.path.join(input_folder, MANIFEST)
+    utils.check_file_readable(manifest_file)
+
+    with open(manifest_file, 'r') as istream:
+        manifest = json.load(istream)
+
+    if manifest.get('format') != FORMAT:
+        raise DataError(
+            "Not a classifier model folder: '{}'".format(input_folder))
+
+    if manifest.get('version', 0) > VERSION:
+        raise ConfigError(
+            "Classifier model format version {} not supported (<= {})"
+            .format(manifest.get('version'), VERSION))
+
+    fallback = {}
+    fallback_file = os.path.join(input_folder, FALLBACK)
+    if os.path.exists(fallback_file):
+        with open(fallback_file, 'rb') as istream:
+            fallback = pickle.load(istream)
+
+    return _decode_estimator(
+        manifest['estimator'], input_folder, mmap_mode, fallback)
+
+def sklearn_version(input_folder):
+    """Return the sklearn version of the saved model"""
+
+    with open(os.path.join(input_folder, MANIFEST), 'r') as istream:
+        return json.load(istream).get('sklearn_version')
+
+def _encode_estimator(model, folder, prefix, fallback):
+    """
+    Return the json description of the estimator: class, parameters
+    and fitted attributes (arrays saved under the folder),
+    without its training-only state
+    """
+
+    params = model.get_params(deep=False)
+    skipped = TRAINING_STATE.get(type(model).__name__, [])
+    entry = {
+        'class': _class_path(type(model)),
+        'params': {},
+        'attributes': {}
+    }
+
+    for key, value in sorted(vars(model).items()):
+        if key in skipped:
+            continue
+
+        section = 'params' if key in params else 'attributes'
+        name = "{}{}".format(prefix, key)
+
+        try:
+            entry[section][key] = _encode(value, folder, name, fallback)
+        except TypeError:
+            fallback[name] = value
+            entry[section][key] = {'fallback': name}
+
+    return entry
+
+def _class_path(cls):
+    """
+    Return the shortest import path of the class
+    (public sklearn modules, stable across versions)
+    """
+
+    parts = cls.__module__.split('.')
+
+    for end in range(1, len(parts)):
+        module = '.'.join(parts[:end])
+        if getattr(importlib.import_module(module), cls.__name__, None) is cls:
+            return "{}.{}".format(module, cls.__name__)
+
+    return "{}.{}".format(cls.__module__, cls.__name__)
+
+def _encode(value, folder, name, fallback):
+    """Return the json description of a parameter or attribute value"""
+
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return {'json': value}
+
+    if isinstance(value, numpy.generic):
+        return {'json': value.item()}
+
+    if isinstance(value, numpy.ndarray) and value.dtype.kind in 'biufUS':
+        filename = "{}.npy".format(name)
+        numpy.save(os.path.join(folder, filename), value)
+        return {'array': filename}
+
+    if isinstance(value, (list, tuple)):
+        items = [
+            _encode(item, folder, "{}.{}".format(name, index), fallback)
+            for index, item in enumerate(value)]
+
+        if all('json' in item for item in items) \
+                and isinstance(value, list):
+            return {'json': [item['json'] for item in items]}
+
+        key = 'tuple' if isinstance(value, tuple) else 'list'
+        return {key: items}
+
+    if isinstance(value, dict) \
+            and all(isinstance(key, str) for key in value):
+        return {'dict': {
+            key: _encode(item, folder, "{}.{}".format(name, key), fallback)
+            for key, item in value.items()}}
+
+    if hasattr(value, 'get_params'):
+        return {'estimator': _encode_estimator(
+            value, folder, "{}.".format(name), fallback)}
+
+    raise TypeError("No json form for '{}'".format(name))
+
+def _decode_estimator(entry, folder, mmap_mode, fallback):
+    """Rebuild the estimator from its json description"""
+
+    module, name = entry['class'].rsplit('.', 1)
+    model = getattr(importlib.import_module(module), name)(**{
+        key: _decode(value, folder, mmap_mode, fallback)
+        for key, value in entry['params'].items()})
+
+    for key, value in entry['attributes'].items():
+        setattr(model, key, _decode(value, folder, mmap_mode, fallback))
+
+    return model
+
+def _decode(value, folder, mmap_mode, fallback):
+    """Return the parameter or attribute value of its json description"""
+
+    if 'json' in value:
+        return value['json']
+
+    if 'array' in value:
+        return numpy.load(
+            os.path.join(folder, value['array']), mmap_mode=mmap_mode)
+
+    if 'list' in value or 'tuple' in value:
+        items = [
+            _decode(item, folder, mmap_mode, fallback)
+            for item in value.get('list', value.get('tuple'))]
+
+        return items if 'list' in value else tuple(items)
+
+    if 'dict' in value:
+        return {
+            key: _decode(item, folder, mmap_mode, fallback)
+            for key, item in value['dict'].items()}
+
+    if 'estimator' in value:
+        return _decode_estimator(
+            value['estimator'], folder, mmap_mode, fallback)
+
+    if 'fallback' in value:
+        return fallback[value['fallback']]
+
+    raise DataError("Unknown saved value {}".format(value))
@@ -47,7 +47,10 @@ class MulticlassClassifier(Component):
         try:
             if train_type == "offline":
                 self.model.fit(features, labels)
+            elif hasattr(self.model, 'classes_'):
+                self.model.partial_fit(features, labels)
             else:
+                # the categories are given on the first call only
                 self.model.partial_fit(
                     features, labels, classes=self.categories)
         except:
@@ -72,6 +75,7 @@ class MulticlassClassifier(Component):
                 shape['coeffs'] = \
                     [[float(x) for x in coefs] for coefs in self.model.coef_]
                 shape['intercept'] = [float(x) for x in self.model.intercept_]
+                shape['multi_class'] = self._multi_class()
             elif self.name == 'MLPClassifier':
                 shape = {}
                 shape['name'] = self.name
@@ -121,3 +125,20 @@ class MulticlassClassifier(Component):
                 .format(self.name))
 
         return shape
+
+    def _multi_class(self):
+        """
+        Return the multiclass scheme of the LogisticRegression model:
+        'ovr' (sigmoid of each class, then normalized) or 'multinomial'
+        (softmax); a binary model is always 'ovr'
+        """
+
+        if len(self.model.coef_) == 1:
+            return 'ovr'
+
+        # 'auto' (or no such parameter): multinomial unless liblinear
+        multi_class = self.model.get_params().get('multi_class', 'auto')
+        if multi_class in ['ovr', 'multinomial']:
+            return multi_class
+
+        return 'ovr' if self.model.solver == 'liblinear' else 'multinomial'
@@ -5,8 +5,13 @@ import xi.ml.classify
 
 from xi.ml.common import Component
 from xi.ml.error import ConfigError, CaughtException
+from xi.ml.classify.label_indicator import indicator_matrix
 
 
+# intercept of the binary model of a category never (-) or always (+)
+# positive in the training documents: probability 0.0 or 1.0
+CONSTANT_INTERCEPT = 30.0
+
 class MultilabelClassifier(Component):
     """
     Class used for training and saving dt/rf/nn/mlp/...
@@ -25,6 +30,13 @@ class MultilabelClassifier(Component):
         self.trained = False
         self.categories = list(categories)
 
+        # number of features of the last training documents
+        self.n_features = None
+
+        # binary classes of the last training (the model's 'classes_'
+        # are reset to the category names after each training)
+        self.binary_classes = None
+
         classifiers = xi.ml.classify.TrainClassifier.CLASSIFIERS['multilabel']
 
         try:
@@ -46,10 +58,16 @@ class MultilabelClassifier(Component):
             return
 
         self.logger.info("Train using {} documents".format(len(features)))
+        self.n_features = len(features[0]) if len(features) else 0
 
         # change labels format for multilabel training
         labels = self._binarize_labels(labels)
 
+        # warm start: restore the binary classes of the previous training
+        if self.model.get_params().get('warm_start') \
+                and self.binary_classes is not None:
+            self.model.classes_ = self.binary_classes
+
         try:
             self.model.fit(features, labels)
         except:
@@ -59,29 +77,61 @@ class MultilabelClassifier(Component):
         else:
             self.trained = True
 
+        self.binary_classes = getattr(self.model, 'classes_', None)
+
+        # keep the binary classes of each output of multi-output models
+        # (the positive class' probabilities at prediction time)
+        if isinstance(self.binary_classes, list):
+            self.model.output_classes_ = self.binary_classes
+
         # reset category binary labels to real category names
         self.model.classes_ = self.categories
 
     def _binarize_labels(self, labels):
-        """Convert labels into binary format"""
+        """
+        Convert labels into binary format: uint8 indicator matrix
+        ex: ['sport'] => [0, 1, 0] (for classes=[society, sport, unk])
+        """
 
         if not isinstance(labels, list):
             return []
 
-        # transform each label into an array of labels,
-        # if it's not already the case
-        if len(labels) > 0 and not isinstance(labels[0], list):
-            labels = [[label] for label in labels]
+        return indicator_matrix(labels, self.categories)
 
-        # transform labels into a fixed-length array of binary indicators
-        # ex: ['sport'] => [0, 1, 0] (for classes=[society, sport, unk])
-        bin_labels = []
+    def _lr_shape(self):
+        """
+        The LogisticRegression shape of the binary models:
+        one row of coefficients & one intercept per category
+        (independent probabilities of each category)
+        """
+
+        models = self.model.estimators_
+
+        # constant predictors (no coefficients) for the categories
+        # never or always positive in the training documents
+        fitted = [model for model in models if hasattr(model, 'coef_')]
+        n_features = len(fitted[0].coef_[0]) if fitted else self.n_features
 
-        for ref_labels in labels:
-            new_labels = [1 if x in ref_labels else 0 for x in self.categories]
-            bin_labels.append(new_labels)
+        coeffs, intercept = [], []
+        for model in models:
+            if hasattr(model, 'coef_'):
+                coeffs.append([float(x) for x in model.coef_[0]])
+                intercept.append(float(model.intercept_[0]))
+            else:
+                coeffs.append([0.0] * n_features)
+                intercept.append(
+                    CONSTANT_INTERCEPT if model.y_[0] else -CONSTANT_INTERCEPT)
+
+        shape = {}
+        shape['name'] = 'LogisticRegression'
+        shape['classifier_type'] = 'multilabel'
+        shape['classes'] = list(self.model.classes_)
+        shape['n_classes'] = len(self.model.classes_)
+        shape['n_features'] = n_features
+        shape['coeffs'] = coeffs
+        shape['intercept'] = intercept
 
-        return bin_labels
+        return shape
 
     def shape(self):
         """The dictionary shape of the model"""
@@ -89,7 +139,9 @@ class MultilabelClassifier(Component):
         shape = {}
 
         try:
-            if self.name == 'MLPClassifier':
+            if self.name == 'LogisticRegression':
+                shape = self._lr_shape()
+            elif self.name == 'MLPClassifier':
                 shape = {}
                 shape['name'] = self.name
                 shape['classifier_type'] = 'multilabel'
@@ -0,0 +1,170 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import json
+import multiprocessing
+
+from xi.ml.common import Component
+from xi.ml.tools import utils
+from xi.ml.error import CaughtException
+from xi.ml.classify.load_classifier import LoadClassifier
+
+
+# classifiers of the current (worker) process, by model file:
+# each model is loaded once per process and per run
+_classifiers = {}
+
+def line_ranges(input_file, size):
+    """
+    Split the input file into (start, end) byte ranges of about 'size' bytes,
+    cut at the end of a line
+    """
+
+    fsize = os.path.getsize(input_file)
+    offsets = [0]
+
+    with open(input_file, 'rb') as istream:
+        while offsets[-1] < fsize:
+            istream.seek(offsets[-1] + size)
+            istream.readline()
+            offsets.append(min(istream.tell(), fsize))
+
+    return list(zip(offsets[:-1], offsets[1:]))
+
+def predict_range(job):
+    """
+    Classify the documents of the job's byte range, by batches.
+    Return the json lines of the classified documents.
+    """
+
+    model_file, input_file, start, end, batch_size = job
+
+    if model_file not in _classifiers:
+        _classifiers[model_file] = LoadClassifier(model_file)
+    classifier = _classifiers[model_file]
+
+    lines = []
+
+    with open(input_file, 'rb') as istream:
+        istream.seek(start)
+
+        docs = []
+        while istream.tell() < end:
+            line = istream.readline()
+            if not line:
+                break
+
+            doc = json.loads(line.decode('utf-8'))
+            if 'features' in doc:
+                docs.append(doc)
+
+            if len(docs) >= batch_size or istream.tell() >= end:
+                for doc, prediction in zip(docs, classifier.predictions(
+                        [doc['features'] for doc in docs])):
+
+                    doc['season'] = prediction['category']
+                    doc['season_prob'] = prediction['probas']
+                    lines.append(json.dumps(doc, ensure_ascii=False) + '\n')
+
+                docs = []
+
+    return lines
+
+
+class ParallelPrediction(Component):
+    """
+    Class classifying the documents of several (model, input file) jobs
+    on a pool of worker processes:
+    - each input file is split into byte ranges classified by batches
+    - each worker loads a classifier model once, on its first range
+    - the classified documents are written in the input files' order
+    """
+
+    def __init__(self, workers=0, batch_size=1000, range_size=8388608):
+        """
+        Initialize with the number of worker processes (all cores: 0),
+        the number of documents classified at once and the size of
+        the input ranges (bytes)
+        """
+
+        super().__init__()
+
+        self.workers = int(workers) or multiprocessing.cpu_count()
+        self.batch_size = int(batch_size)
+        self.range_size = int(range_size)
+
+        # (model file, input file, output file) of each job
+        self.jobs = []
+
+    def add(self, model_file, input_file, output_file):
+        """Add the classification of the input file by the given model"""
+
+        utils.check_file_readable(model_file)
+        utils.check_file_readable(input_file)
+
+        self.jobs.append((model_file, input_file, output_file))
+
+    def run(self):
+        """Classify the documents of all the added jobs"""
+
+        ranges, outputs = [], []
+        for model_file, input_file, output_file in self.jobs:
+            for start, end in line_ranges(input_file, self.range_size):
+                ranges.append(
+                    (model_file, input_file, start, end, self.batch_size))
+                outputs.append(output_file)
+
+        workers = max(1, min(self.workers, len(ranges)))
+
+        self.logger.info(
+            "Classify {} ranges of {} files on {} worker processes"
+            .format(len(ranges), len(self.jobs), workers))
+        self.timer.start_timer()
+
+        pool = None
+        if workers > 1:
+            pool = multiprocessing.Pool(workers)
+
+        # empty output files first (also for the empty input files)
+        for _, _, output_file in self.jobs:
+            utils.create_path(output_file)
+            open(output_file, 'w').close()
+
+        ndocs = 0
+        ostream, current = None, None
+
+        try:
+            results = map(predict_range, ranges) if pool is None \
+                else pool.imap(predict_range, ranges)
+
+            # results come back in the ranges' order
+            for output_file, lines in zip(outputs, results):
+                if output_file != current:
+                    if ostream is not None:
+                        ostream.close()
+
+                    ostream = open(output_file, 'a')
+                    current = output_file
+
+                ostream.write(''.join(lines))
+                ndocs += len(lines)
+        except Exception as e:
+            raise CaughtException(
+                "Exception encountered when classifying documents: {}"
+                .format(e))
+        finally:
+            if ostream is not None:
+                ostream.close()
+
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+            # models loaded by the current process (no worker processes)
+            _classifiers.clear()
+
+        self.timer.stop_timer(
+            "Classified {} documents of {} files".format(ndocs, len(self.jobs)))
+
+        self.jobs = []
@@ -0,0 +1,359 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import multiprocessing
+
+from threadpoolctl import threadpool_limits
+
+from xi.ml.common import Component
+from xi.ml.tools import utils
+from xi.ml.tools.benchmark import peak_memory
+from xi.ml.error import ConfigError, CaughtException
+from xi.ml.corpus import ArrayCorpora, save_corpora
+from xi.ml.classify.train_classifier import TrainClassifier
+
+
+# environment variables limiting the threads of the BLAS/OpenMP libraries
+THREAD_VARIABLES = [
+    'OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS']
+
+def _limit_threads(threads):
+    """
+    Limit the threads of the current (worker) process: the libraries
+    already loaded, inherited from the parent process (threadpoolctl),
+    and the next ones (environment variables)
+    """
+
+    for variable in THREAD_VARIABLES:
+        os.environ[variable] = str(threads)
+
+    threadpool_limits(threads)
+
+def _class_size(job):
+    """Return the sort key of the job's chunk size (all documents: last)"""
+
+    if job['chunk_size'] in [-1, 'max']:
+        return float('inf')
+
+    return job['chunk_size']
+
+def train_task(jobs):
+    """
+    Train and save the classifiers of the task's jobs: one job, or the
+    chunk sizes of a progressive training, each fit initialized from
+    the previous model (warm start).
+    Return the wall time, the peak memory and the iterations of each job
+    (None for a job without training documents: no model saved);
+    the peak memory of the process at the job's start is reported too
+    (a forked worker starts with the memory inherited from its parent)
+    """
+
+    stats = []
+    classifier = None
+    warm_started = False
+
+    for job in jobs:
+        start = time.time()
+        start_memory = peak_memory()
+
+        if classifier is None or not classifier.warm_start():
+            kwargs = dict(job['kwargs'])
+            classifier = TrainClassifier(
+                job['name'], job['type'], job['categories'], **kwargs)
+
+            # thread budget of the job for the estimators running jobs
+            # in parallel
+            model = classifier.classifier.model
+            if job['threads'] and 'n_jobs' in model.get_params() \
+                    and 'n_jobs' not in kwargs:
+                model.set_params(n_jobs=job['threads'])
+
+        # a skipped fit (no documents) must not save the previous model
+        classifier.classifier.trained = False
+
+        if job['data_folder'] is not None:
+            corpora = ArrayCorpora(
+                job['data_folder'], job['order'], job['seed'])
+            classifier.train_corpora(
+                job['train_type'], corpora, job['chunk_size'])
+        else:
+            classifier.train(
+                job['train_type'], job['train_files'], job['chunk_size'],
+                job['online'])
+
+        if not classifier.classifier.trained:
+            stats.append(None)
+            continue
+
+        classifier.save(job['model_file'])
+        classifier.save_shape(job['shape_file'])
+
+        stats.append({
+            'time': time.time() - start,
+            'peak_memory_mb': peak_memory(),
+            'start_memory_mb': start_memory,
+            'iterations': classifier.iterations(),
+            'warm_start': warm_started and bool(
+                classifier.classifier.model.get_params().get('warm_start'))
+        })
+        warm_started = True
+
+    return stats
+
+
+class ParallelTraining(Component):
+    """
+    Class training and saving several classifiers on a pool of
+    worker processes:
+    - the training documents of each set of input files are loaded once
+      (as many as the largest chunk size) and shared read-only
+      (memory-mapped matrix) by the offline jobs, each job training on
+      a prefix or on a nested random subset of the documents
+    - each job runs in a new worker process, with a budget of threads;
+      the chunk sizes of a progressive training run in the same process,
+      from the smallest to the largest, each fit warm started
+    - the wall time, the peak memory and the iterations of each job
+      are reported, with the peak memory at the job's start: the memory
+      inherited from the parent process (forked worker), or the peak
+      of the previous jobs (single worker: the jobs run in the current
+      process, whose peak memory is cumulative)
+    """
+
+    def __init__(self, workers=1, threads=0, order='prefix', seed=0):
+        """
+        Initialize with the number of worker processes (all cores: 0),
+        the number of threads of each job (no limit: 0) and the subsets
+        of the training documents ('prefix' or 'random' with its seed)
+        """
+
+        super().__init__()
+
+        if order not in ArrayCorpora.ORDERS:
+            raise ConfigError(
+                "Unknown subset order '{}'. Choose from {}"
+                .format(order, ArrayCorpora.ORDERS))
+
+        self.workers = int(workers) or multiprocessing.cpu_count()
+        self.threads = int(threads)
+        self.order = order
+        self.seed = seed
+
+        self.jobs = []
+
+    def add(self, classif_name, classif_type, categories, train_type,
+            train_files, chunk_size, model_file, kwargs=None, online=None,
+            progressive=False):
+        """
+        Add the training of a classifier, saved under the model file
+        (progressive: warm started from the same classifier trained
+        offline on the previous chunk size)
+        """
+
+        self.jobs.append({
+            'name': classif_name,
+            'type': classif_type,
+            'categories': list(categories),
+            'kwargs': kwargs or {},
+            'train_type': train_type,
+            'train_files': list(train_files),
+            'chunk_size': chunk_size,
+            'online': online or {},
+            'model_file': model_file,
+            'shape_file': utils.change_extension(model_file, 'json'),
+            'threads': self.threads,
+            'order': self.order,
+            'seed': self.seed,
+            'progressive': progressive and train_type == 'offline',
+            'data_folder': None
+        })
+
+    def run(self):
+        """
+        Train all the added classifiers.
+        Return the wall time, the peak memory and the iterations of each job.
+        """
+
+        tmp_folder = tempfile.mkdtemp(prefix='xi-ml-train-')
+
+        try:
+            self._share_data(tmp_folder)
+            stats = self._run_jobs()
+        finally:
+            shutil.rmtree(tmp_folder)
+
+        self.jobs = []
+
+        return stats
+
+    def _share_data(self, tmp_folder):
+        """
+        Load & save once the training documents of the offline jobs:
+        the largest number of documents per file needed by the jobs
+        """
+
+        jobs = {}
+        for job in self.jobs:
+            if job['train_type'] == 'offline':
+                jobs.setdefault(tuple(job['train_files']), []).append(job)
+
+        for index, (train_files, file_jobs) in enumerate(sorted(jobs.items())):
+            class_sizes = [
+                -1 if job['chunk_size'] in [-1, 'max']
+                else job['chunk_size'] // len(train_files)
+                for job in file_jobs]
+
+            class_size = -1 if -1 in class_sizes else max(class_sizes)
+
+            data_folder = os.path.join(tmp_folder, str(index))
+
+            self.timer.start_timer()
+            save_corpora(list(train_files), data_folder, class_size)
+            self.timer.stop_timer(
+                "Loaded the training documents of {} for {} classifiers"
+                .format(list(train_files), len(file_jobs)))
+
+            for job in file_jobs:
+                job['data_folder'] = data_folder
+
+    def _tasks(self):
+        """
+        Return the jobs of each worker task: one job, or the chunk sizes
+        of a progressive training sorted from the smallest
+        """
+
+        tasks, chains = [], {}
+
+        for job in self.jobs:
+            if not job['progressive']:
+                tasks.append([job])
+                continue
+
+            key = (
+                job['name'], job['type'], tuple(job['train_files']),
+                json.dumps(job['kwargs'], sort_keys=True))
+
+            if key not in chains:
+                chains[key] = []
+                tasks.append(chains[key])
+
+            chains[key].append(job)
+
+        return [sorted(jobs, key=_class_size) for jobs in tasks]
+
+    def _run_jobs(self):
+        """Train the classifiers on the worker processes"""
+
+        tasks = self._tasks()
+        workers = max(1, min(self.workers, len(tasks)))
+
+        self.logger.info(
+            "Train {} classifiers ({} tasks) on {} worker processes "
+            "({} threads each)"
+            .format(
+                len(self.jobs), len(tasks), workers, self.threads or 'all'))
+        self.timer.start_timer()
+
+        pool, limits = None, None
+        if workers > 1:
+            # a new process for each task: its own peak memory
+            pool = multiprocessing.Pool(
+                workers,
+                _limit_threads if self.threads else None,
+                (self.threads,) if self.threads else (),
+                maxtasksperchild=1)
+        elif self.threads:
+            # tasks in the current process: threads limited until the end
+            limits = threadpool_limits(self.threads)
+
+        stats = []
+
+        try:
+            results = map(train_task, tasks) if pool is None \
+                else pool.imap(train_task, tasks)
+
+            for jobs, task_stats in zip(tasks, results):
+                for job, job_stats in zip(jobs, task_stats):
+                    if job_stats is None:
+                        self.logger.warning(
+                            "No {}-{}-{}-{} classifier trained (no training "
+                            "documents), '{}' not saved"
+                            .format(
+                                job['name'], job['type'], job['train_type'],
+                                job['chunk_size'], job['model_file']))
+                        continue
+
+                    self.logger.info(
+                        "Trained the {}-{}-{}-{} classifier in {:.3f} seconds"
+                        ", {} iterations{} ({}peak memory: {:.1f} MB, "
+                        "+{:.1f} MB over the {:.1f} MB at the job's start)"
+                        .format(
+                            job['name'], job['type'], job['train_type'],
+                            job['chunk_size'], job_stats['time'],
+                            job_stats['iterations'],
+                            ' (warm start)' if job_stats['warm_start'] else '',
+                            'cumulative ' if pool is None else '',
+                            job_stats['peak_memory_mb'],
+                            job_stats['peak_memory_mb'] -
+                            job_stats['start_memory_mb'],
+                            job_stats['start_memory_mb']))
+
+                    # without worker processes: peak memory of the
+                    # current process since its start (all jobs so far)
+                    job_stats.update({
+                        'peak_memory_cumulative': pool is None,
+                        'name': job['name'],
+                        'type': job['type'],
+                        'train_type': job['train_type'],
+                        'chunk_size': job['chunk_size'],
+                        'model_file': job['model_file']
+                    })
+                    stats.append(job_stats)
+
+                task_stats = [
+                    job_stats for job_stats in task_stats
+                    if job_stats is not None]
+
+                if len(task_stats) > 1:
+                    self._log_progressive(task_stats)
+        except Exception as e:
+            raise CaughtException(
+                "Exception encountered when training classifiers: {}"
+                .format(e))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+            if limits is not None:
+                limits.unregister()
+
+        self.timer.stop_timer("Trained {} classifiers".format(len(stats)))
+
+        return stats
+
+    def _log_progressive(self, task_stats):
+        """
+        Log the iterations of a progressive training against its
+        first (cold) fit: the iterations a cold fit would need
+        on each chunk size (estimate)
+        """
+
+        first = task_stats[0]['iterations']
+        warm = [
+            job_stats['iterations'] for job_stats in task_stats[1:]
+            if job_stats['warm_start']]
+
+        if first is None or not warm:
+            return
+
+        self.logger.info(
+            "Progressive {}-{} training: {} iterations for the {} warm "
+            "started fits, about {} iterations saved (first cold fit: {})"
+            .format(
+                task_stats[0]['name'], task_stats[0]['type'], sum(warm),
+                len(warm), max(0, first * len(warm) - sum(warm)), first))
@@ -2,11 +2,24 @@
 
 
 import json
+import numpy
 
 from xi.ml.common import Component
 from xi.ml.tools import utils
-from xi.ml.corpus import StreamCorpus
+from xi.ml.classify.label_indicator import load_predictions
 
+def column_sums(matrix):
+    """Return the list of the column sums of the sparse matrix"""
+
+    return numpy.asarray(matrix.sum(axis=0)).ravel().tolist()
+
+def div(x, y):
+    """Division accounting for zero division error (0)"""
+
+    if y != 0:
+        return x / y
+
+    return 0
 
 class PredictionStatistics(Component):
     """Class displaying and storing the statistics of given prediction"""
@@ -28,47 +41,24 @@ class PredictionStatistics(Component):
 
         self.stats = {}
 
-        tp, fn, fp, tn = {}, {}, {}, {}
-        n_total, n_incorrect = {}, {}
+        fn, tn = {}, {}
 
-        # init stats dictionary
-        # - number of total documents in class 'category'
-        # - number of correctly classified documents in class 'category'
-        for category in self.categories:
-            tp[category] = 0
-            fn[category] = 0
-            fp[category] = 0
-            tn[category] = 0
-            n_total[category] = 0
-            n_incorrect[category] = 0
+        # indicator matrices of the real & predicted categories
+        real, predicted = load_predictions(self.data_files, self.categories)
+        real = real.astype(numpy.int64)
+        predicted = predicted.astype(numpy.int64)
 
         # count correct predictions in given data files
-        for input_file in self.data_files:
-            sc = StreamCorpus(input_file)
-
-            for doc in sc:
-                if 'category' not in doc or 'season' not in doc:
-                    continue
-
-                real_categories = doc['category']
-                predicted_categories = doc['season']
-
-                # convert real_category to list
-                if isinstance(real_categories, str):
-                    real_categories = [real_categories]
-
-                # convert predicted_category to list
-                if isinstance(predicted_categories, str):
-                    predicted_categories = [predicted_categories]
-
-                for real_category in real_categories:
-                    n_total[real_category] += 1
+        # - number of total documents in class 'category'
+        # - number of correctly classified documents in class 'category'
+        # - each real category not predicted counts as a false positive
+        #   for each predicted category of the document
+        correct = real.multiply(predicted)
+        missed = numpy.asarray((real - correct).sum(axis=1)).ravel()
 
-                    if real_category in predicted_categories:
-                        tp[real_category] += 1
-                    else:
-                        for predicted_category in predicted_categories:
-                            fp[predicted_category] += 1
+        n_total = dict(zip(self.categories, column_sums(real)))
+        tp = dict(zip(self.categories, column_sums(correct)))
+        fp = dict(zip(self.categories, predicted.T.dot(missed).tolist()))
 
         if sum(n_total.values()) == 0:
             self.logger.warning('No data to process')
@@ -159,8 +149,7 @@ class PredictionStatistics(Component):
     def div(self, x, y):
         """Own div method to account for zero division error"""
 
-        if y != 0:
-            return x / y
-        else:
+        if y == 0:
             self.logger.warning('Zero division error')
-            return 0
+
+        return div(x, y)
@@ -0,0 +1,28 @@
+# -*-coding:utf-8 -*
+
+
+import numpy
+
+
+# Module: predicted categories from the class-probabilities
+# (NumPy only: shared by the sklearn models and the shape engine)
+
+def predicted_categories(probas, categories, multilabel=False):
+    """
+    Return the predicted categories of each document
+    given the matrix of class-probabilities:
+    - multi-class: the most probable category
+    - multi-label: all categories above 0.5 (the most probable otherwise)
+    """
+
+    best = numpy.argmax(probas, axis=1)
+
+    if not multilabel:
+        return [categories[index] for index in best]
+
+    predicted = probas > 0.5
+    predicted[numpy.arange(len(best)), best] |= ~predicted.any(axis=1)
+
+    return [
+        [categories[index] for index in numpy.nonzero(row)[0]]
+        for row in predicted]
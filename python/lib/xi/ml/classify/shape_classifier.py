@@ -0,0 +1,165 @@
+# -*-coding:utf-8 -*
+
+
+import json
+import numpy
+
+from xi.ml.common import Component
+from xi.ml.tools import utils
+from xi.ml.error import ConfigError, DataError
+from xi.ml.classify.predictions import predicted_categories
+
+
+def logistic(values):
+    """Logistic function (no overflow for large negative values)"""
+
+    return 0.5 * (1.0 + numpy.tanh(0.5 * values))
+
+def softmax(values):
+    """Softmax function of each row"""
+
+    values = numpy.exp(values - values.max(axis=1)[:, numpy.newaxis])
+    return values / values.sum(axis=1)[:, numpy.newaxis]
+
+def relu(values):
+    """Rectified linear unit function"""
+
+    return numpy.maximum(values, 0.0)
+
+def identity(values):
+    """Identity function"""
+
+    return values
+
+
+class ShapeClassifier(Component):
+    """
+    Class predicting class-probabilities from the json shape
+    of a trained LogisticRegression or MLPClassifier model
+    (float32 NumPy forward passes, no sklearn estimator unpickled)
+    """
+
+    ACTIVATIONS = {
+        'identity': identity,
+        'logistic': logistic,
+        'tanh': numpy.tanh,
+        'relu': relu,
+        'softmax': softmax
+    }
+
+    def __init__(self, shape_file, dtype=numpy.float32):
+        """Load the classifier's weights from its shape file"""
+
+        super().__init__()
+
+        utils.check_file_readable(shape_file)
+        with open(shape_file, 'r') as istream:
+            shape = json.load(istream)
+
+        self.name = shape.get('name')
+        self.dtype = dtype
+
+        self.categories = list(shape['classes'])
+        self.nfeatures = shape['n_features']
+        self.multilabel = shape.get('classifier_type') == 'multilabel'
+
+        # LogisticRegression: one-vs-rest (older shapes) or multinomial
+        self.multi_class = shape.get('multi_class', 'ovr')
+        if self.multi_class not in ['ovr', 'multinomial']:
+            raise ConfigError(
+                "Unknown multiclass scheme '{}'. Choose from {}"
+                .format(self.multi_class, ['ovr', 'multinomial']))
+
+        # weights & intercepts of each layer, activation of each layer
+        if self.name == 'LogisticRegression':
+            self.coeffs = [numpy.asarray(shape['coeffs'], dtype=dtype).T]
+            self.intercepts = [numpy.asarray(shape['intercept'], dtype=dtype)]
+            self.activations = [
+                'softmax' if self.multi_class == 'multinomial'
+                and not self.multilabel and self.coeffs[0].shape[1] > 1
+                else 'logistic']
+        elif self.name == 'MLPClassifier':
+            self.coeffs = [
+                numpy.asarray(layer, dtype=dtype)
+                for layer in shape['hidden_coeffs'] + [shape['output_coeffs']]]
+            self.intercepts = [
+                numpy.asarray(layer, dtype=dtype)
+                for layer in shape['hidden_intercepts'] +
+                [shape['output_intercepts']]]
+            self.activations = \
+                [shape['hidden_activation']] * len(shape['hidden_coeffs']) + \
+                [shape['output_activation']]
+        else:
+            raise ConfigError(
+                "Unknown shape for {} classifier".format(self.name))
+
+        for activation in self.activations:
+            if activation not in self.ACTIVATIONS:
+                raise ConfigError(
+                    "Unknown activation '{}'. Choose from {}"
+                    .format(activation, list(self.ACTIVATIONS.keys())))
+
+        self.logger.info(
+            "Loaded the {} classifier shape from '{}' file"
+            .format(self.name, shape_file))
+
+    def predict_proba(self, features):
+        """Return the class-probabilities of the documents' features"""
+
+        values = numpy.array(features, dtype=self.dtype, ndmin=2)
+
+        if values.shape[1] != self.nfeatures:
+            raise DataError(
+                "Documents must contain {} features instead of {} features"
+                .format(self.nfeatures, values.shape[1]))
+
+        for coeffs, intercepts, activation in zip(
+                self.coeffs, self.intercepts, self.activations):
+
+            values = self.ACTIVATIONS[activation](
+                values.dot(coeffs) + intercepts)
+
+        # multilabel classifier: independent probability of each category
+        if self.multilabel:
+            return values
+
+        # binary classifier: probability of the second class
+        if values.shape[1] == 1 and len(self.categories) == 2:
+            values = numpy.hstack((1.0 - values, values))
+
+        # one-vs-rest logistic regression: normalized probabilities
+        elif self.name == 'LogisticRegression' \
+                and self.activations[-1] == 'logistic':
+            values /= values.sum(axis=1)[:, numpy.newaxis]
+
+        return values
+
+    def classify_batch(self, features):
+        """
+        Test the classifier on a batch of new documents (features matrix).
+        Return the predicted categories of each document
+        and the matrix of class-probabilities.
+        """
+
+        if len(features) == 0:
+            return [], numpy.zeros((0, len(self.categories)), self.dtype)
+
+        probas = self.predict_proba(features)
+
+        return predicted_categories(
+            probas, self.categories, self.multilabel), probas
+
+    def predictions(self, features):
+        """
+        Test the classifier on a batch of new documents.
+        Return the list of predictions (same format as LoadClassifier).
+        """
+
+        doc_classes, probas = self.classify_batch(features)
+
+        return [
+            {
+                'category': doc_class,
+                'probas': dict(zip(self.categories, doc_probas.tolist()))
+            }
+            for doc_class, doc_probas in zip(doc_classes, probas)]
@@ -0,0 +1,144 @@
+# -*-coding:utf-8 -*
+
+
+import queue
+import threading
+
+import numpy
+
+from xi.ml.common import Component
+from xi.ml.error import ConfigError, CaughtException
+
+
+# end of the batches of the current epoch
+_END = None
+
+# seconds between two checks of the stop event by a blocked producer
+_TIMEOUT = 0.1
+
+def _put(buffer, item, stop):
+    """
+    Put the item into the buffer, unless the consumer stops first.
+    Return whether the item was put.
+    """
+
+    while not stop.is_set():
+        try:
+            buffer.put(item, timeout=_TIMEOUT)
+            return True
+        except queue.Full:
+            continue
+
+    return False
+
+def _produce(batches, buffer, stop):
+    """
+    Put the batches into the buffer (then the end marker),
+    until the consumer stops; close the batches' file streams
+    """
+
+    try:
+        for batch in batches:
+            if not _put(buffer, batch, stop):
+                return
+
+        _put(buffer, _END, stop)
+    except Exception as e:
+        _put(buffer, CaughtException(
+            "Exception encountered when reading a training batch: {}"
+            .format(e)), stop)
+    finally:
+        batches.close()
+
+class StreamingTrainer(Component):
+    """
+    Class training a classifier out-of-core with its 'partial_fit' method:
+    several epochs over the documents of an OffsetCorpora, in shuffled
+    mini-batches read by a background thread while the model trains
+    """
+
+    # options of the online training:
+    # - epochs: number of passes over the training documents
+    # - shuffle: shuffle the documents' order at each epoch
+    # - prefetch: number of batches read in advance
+    # - seed: seed of the documents' shuffling
+    OPTIONS = {
+        'epochs': 1,
+        'shuffle': True,
+        'prefetch': 2,
+        'seed': 0
+    }
+
+    def __init__(self, classifier, **kwargs):
+        """
+        Initialize with the classifier to train online
+        (MulticlassClassifier) and the training options
+        """
+
+        super().__init__()
+
+        unknown = set(kwargs.keys()).difference(self.OPTIONS.keys())
+        if unknown:
+            raise ConfigError(
+                "Unknown online training options {}. Choose from {}"
+                .format(list(unknown), list(self.OPTIONS.keys())))
+
+        if not callable(getattr(classifier.model, 'partial_fit', None)):
+            raise ConfigError(
+                "{} can not be trained online".format(classifier.name))
+
+        self.classifier = classifier
+
+        self.options = dict(self.OPTIONS)
+        self.options.update(kwargs)
+
+    def train(self, corpora, batch_size):
+        """
+        Train the classifier on the documents of the corpora,
+        by batches of 'batch_size' documents.
+        Return the number of documents seen.
+        """
+
+        rstate = None
+        if self.options['shuffle']:
+            rstate = numpy.random.RandomState(self.options['seed'])
+
+        total_ndocs = 0
+
+        for epoch in range(self.options['epochs']):
+            self.timer.start_timer()
+
+            # read the next batches while training on the current one
+            buffer = queue.Queue(max(1, self.options['prefetch']))
+            stop = threading.Event()
+            producer = threading.Thread(
+                target=_produce,
+                args=(corpora.batches(batch_size, rstate), buffer, stop))
+            producer.daemon = True
+            producer.start()
+
+            ndocs = 0
+            try:
+                while True:
+                    batch = buffer.get()
+                    if batch is _END:
+                        break
+
+                    if isinstance(batch, Exception):
+                        raise batch
+
+                    features, labels = batch
+                    self.classifier.train(features, labels, 'online')
+                    ndocs += len(labels)
+            finally:
+                # unblock the producer (training error): it closes its files
+                stop.set()
+                producer.join()
+
+            total_ndocs += ndocs
+
+            self.timer.stop_timer(
+                "Epoch {}/{}: {} documents"
+                .format(epoch + 1, self.options['epochs'], ndocs))
+
+        return total_ndocs
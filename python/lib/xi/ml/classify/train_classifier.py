@@ -4,21 +4,34 @@
 import os
 import json
 import pickle
+import numpy
 
 import sklearn.tree
 import sklearn.neighbors
 import sklearn.linear_model
 import sklearn.naive_bayes
 import sklearn.svm
+import sklearn.multiclass
 import sklearn.neural_network
 
 from xi.ml.common import Component
 from xi.ml.tools import utils
 from xi.ml.error import ConfigError
-from xi.ml.corpus import MergeCorpora
+from xi.ml.corpus import MergeCorpora, OffsetCorpora
+from xi.ml.classify import model_format
 
 import xi.ml.classify
 
+def one_vs_rest_lr(n_jobs=1, **kwargs):
+    """
+    Return a multilabel LogisticRegression: one binary model per category,
+    trained in 'n_jobs' parallel processes (all cores: -1) sharing
+    the training features (memory-mapped by joblib)
+    """
+
+    return sklearn.multiclass.OneVsRestClassifier(
+        sklearn.linear_model.LogisticRegression(**kwargs), n_jobs=n_jobs)
+
 class TrainClassifier(Component):
     """
     Class used for training and saving multiclass / multilabel
@@ -46,6 +59,7 @@ class TrainClassifier(Component):
             'models': {
                 'DecisionTreeClassifier': sklearn.tree.DecisionTreeClassifier,
                 'NearestNeighbors': sklearn.neighbors.NearestNeighbors,
+                'LogisticRegression': one_vs_rest_lr,
                 'MLPClassifier': sklearn.neural_network.MLPClassifier
             },
             'training': ['offline']
@@ -87,13 +101,20 @@ class TrainClassifier(Component):
         self.logger.info("Initialized a '{}-{}' classifier".format(
             classif_name, classif_type))
 
-    def train(self, train_type, input_files, chunk_size=-1):
-        """Train the current classifier"""
+    def train(self, train_type, input_files, chunk_size=-1, online=None):
+        """
+        Train the current classifier;
+        'online' holds the options of the online training (StreamingTrainer)
+        """
 
         # check if training is possible
         if not self._checkups(train_type, input_files):
             return
 
+        if train_type == 'online':
+            self._train_online(input_files, chunk_size, online or {})
+            return
+
         # init data corpus
         self.logger.info('Load data for training')
         corpora = MergeCorpora(input_files)
@@ -131,6 +152,108 @@ class TrainClassifier(Component):
             "Trained {} the {}-{} model on {} total documents"
             .format(train_type, self.name, self.type, total_ndocs))
 
+    def train_corpora(self, train_type, corpora, chunk_size=-1):
+        """
+        Train the current classifier offline on a subset of
+        already loaded documents (ArrayCorpora)
+        """
+
+        if train_type != 'offline':
+            self.logger.error(
+                "Can only train offline on loaded documents, not {}"
+                .format(train_type))
+            return
+
+        class_size = self._get_numbers(
+            len(corpora.ndocs), corpora.ndocs, chunk_size)
+
+        if class_size == 0:
+            return
+
+        features, labels = corpora.subset(class_size)
+        chunk_size = len(labels)
+
+        self.logger.info(
+            "{} training the {}-{} classifier on {} documents"
+            .format(train_type, self.name, self.type, chunk_size))
+
+        self.timer.start_timer()
+        self._train_on_chunk(train_type, features, list(labels))
+        self.timer.stop_timer(
+            "Trained {} the {}-{} model on {} total documents"
+            .format(train_type, self.name, self.type, chunk_size))
+
+    def _train_online(self, input_files, chunk_size, options):
+        """
+        Train the classifier out-of-core: epochs over shuffled batches
+        of 'chunk_size' documents (all documents at once: -1)
+        """
+
+        trainer = xi.ml.classify.StreamingTrainer(self.classifier, **options)
+
+        # index the documents (same number of documents per file)
+        corpora = OffsetCorpora(input_files)
+
+        batch_size = len(corpora)
+        if chunk_size != -1:
+            class_size = self._get_numbers(
+                len(input_files), corpora.ndocs, chunk_size)
+
+            if class_size == 0:
+                return
+
+            batch_size = class_size * len(input_files)
+
+        self.logger.info(
+            "online training the {}-{} classifier on {} documents "
+            "by batches of {} documents ({})"
+            .format(
+                self.name, self.type, len(corpora), batch_size,
+                trainer.options))
+
+        self.timer.start_timer()
+        total_ndocs = trainer.train(corpora, batch_size)
+        self.timer.stop_timer(
+            "Trained online the {}-{} model on {} total documents"
+            .format(self.name, self.type, total_ndocs))
+
+    def warm_start(self):
+        """
+        Initialize the next offline training from the current model's
+        weights; return False if the model can not be warm started
+        """
+
+        model = self.classifier.model
+
+        if 'warm_start' not in model.get_params():
+            self.logger.warning(
+                "{} can not be warm started".format(self.name))
+            return False
+
+        if model.get_params().get('solver') == 'liblinear':
+            self.logger.warning(
+                "{} can not be warm started with the liblinear solver"
+                .format(self.name))
+            return False
+
+        model.set_params(warm_start=True)
+        return True
+
+    def iterations(self):
+        """Return the number of iterations of the last training (or None)"""
+
+        # one-vs-rest: the iterations of the slowest binary model
+        models = getattr(
+            self.classifier.model, 'estimators_', [self.classifier.model])
+        n_iter = [
+            numpy.max(model.n_iter_) for model in models
+            if hasattr(model, 'n_iter_')]
+
+        if not n_iter:
+            return None
+
+        return int(max(n_iter))
+
     def _train_on_chunk(self, train_type, features, labels):
         """Train the classifier on the given data"""
 
@@ -164,16 +287,22 @@ class TrainClassifier(Component):
         return class_size
 
     def save(self, output):
-        """Save model to binary file"""
+        """
+        Save model to a model folder ('.model' extension: arrays and manifest)
+        or to a legacy binary (pickle) file
+        """
 
         if not self.classifier.trained:
             return
 
         utils.create_path(output)
 
-        with open(output, 'wb') as ocstream:
-            serializer = pickle.Pickler(ocstream)
-            serializer.dump(self.classifier.model)
+        if utils.extname(output) == model_format.EXTENSION:
+            model_format.save(output, self.classifier.model)
+        else:
+            with open(output, 'wb') as ocstream:
+                serializer = pickle.Pickler(ocstream)
+                serializer.dump(self.classifier.model)
 
         self.logger.info(
             "Saved the {}-{}'s model under the '{}' file"
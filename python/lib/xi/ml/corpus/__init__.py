@@ -4,8 +4,11 @@
 from .push_corpus import PushCorpus
 from .stream_corpus import StreamCorpus
 from .merge_corpora import MergeCorpora
+from .offset_corpora import OffsetCorpora
+from .array_corpora import ArrayCorpora, save_corpora
 
 # gensim based models
 from . import pickler
+from . import sparse_matrix
 from . import dictionary
 from .load_corpora import LoadCorpora
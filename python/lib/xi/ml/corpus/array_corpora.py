@@ -0,0 +1,128 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import json
+import numpy
+
+from xi.ml.common import Component
+from xi.ml.tools import utils
+from xi.ml.error import ConfigError, DataError
+from xi.ml.corpus.merge_corpora import MergeCorpora
+
+
+FEATURES = 'features.npy'
+LABELS = 'labels.json'
+
+def save_corpora(input_files, data_folder, class_size=-1):
+    """
+    Load once 'class_size' documents of each input file (all: -1),
+    interleaved file after file as in MergeCorpora, and save them under
+    the data folder: features matrix (.npy) and labels (.json)
+    """
+
+    corpora = MergeCorpora(input_files)
+
+    min_ndocs = min(corpora.ndocs)
+    if class_size == -1 or class_size > min_ndocs:
+        class_size = min_ndocs
+
+    nfiles = len(input_files)
+    features_file = os.path.join(data_folder, FEATURES)
+    utils.create_folder(data_folder)
+
+    # stream the documents into the preallocated .npy file
+    # (the number of features is read from the first documents)
+    features = None
+    labels = []
+
+    for index in range(class_size):
+        doc_features, doc_labels = corpora.load_data(1)
+
+        if features is None:
+            features = numpy.lib.format.open_memmap(
+                features_file, mode='w+', dtype=numpy.float64,
+                shape=(class_size * nfiles, len(doc_features[0])))
+
+        features[index * nfiles:(index + 1) * nfiles] = doc_features
+        labels.extend(doc_labels)
+
+    if features is None:
+        numpy.save(features_file, numpy.zeros((0, 0), dtype=numpy.float64))
+    else:
+        features.flush()
+        del features
+
+    with open(os.path.join(data_folder, LABELS), 'w') as ostream:
+        json.dump({
+            'ndocs': corpora.ndocs,
+            'class_size': class_size,
+            'labels': labels
+        }, ostream)
+
+class ArrayCorpora(Component):
+    """
+    Merged documents corpora saved by 'save_corpora', memory-mapped:
+    each training run takes a subset of the same number of documents
+    from each file without reading the input files again.
+    (used for sklearn chunk size sweeps: the smaller subsets are
+    included in the larger ones)
+    """
+
+    # subset of documents taken from each file:
+    # - prefix: the first documents
+    # - random: a random subset (same order for all the subsets)
+    ORDERS = ['prefix', 'random']
+
+    def __init__(self, data_folder, order='prefix', seed=0):
+        """Load the saved documents (read-only memory-mapped features)"""
+
+        super().__init__()
+
+        if order not in self.ORDERS:
+            raise ConfigError(
+                "Unknown subset order '{}'. Choose from {}"
+                .format(order, self.ORDERS))
+
+        labels_file = os.path.join(data_folder, LABELS)
+        utils.check_file_readable(labels_file)
+
+        with open(labels_file, 'r') as istream:
+            data = json.load(istream)
+
+        # number of documents of the input files, loaded from each file
+        self.ndocs = data['ndocs']
+        self.class_size = data['class_size']
+        self.labels = data['labels']
+
+        self.features = numpy.load(
+            os.path.join(data_folder, FEATURES), mmap_mode='r')
+
+        self.permutation = None
+        if order == 'random':
+            self.permutation = numpy.random.RandomState(seed).permutation(
+                self.class_size)
+
+    def subset(self, class_size):
+        """
+        Return the features matrix and the labels of 'class_size'
+        documents of each file (a view of the matrix for the prefixes)
+        """
+
+        if class_size > self.class_size:
+            raise DataError(
+                "Only {} documents per file loaded, {} requested"
+                .format(self.class_size, class_size))
+
+        nfiles = len(self.ndocs)
+
+        if self.permutation is None:
+            end = class_size * nfiles
+            return self.features[:end], self.labels[:end]
+
+        # rows of the selected documents of each file, in the files' order
+        rows = (
+            numpy.sort(self.permutation[:class_size])[:, numpy.newaxis] *
+            nfiles + numpy.arange(nfiles)).ravel()
+
+        return self.features[rows], [self.labels[row] for row in rows]
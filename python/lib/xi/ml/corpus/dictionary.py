@@ -3,14 +3,33 @@
 
 import json
 
-from gensim.corpora import Dictionary
+from gensim.corpora import Dictionary, HashDictionary
 from xi.ml.tools import utils
 
 # Module: load gensim dictionary from file
+# - dictionary mode: vocabulary built and filtered on the training corpus
+# - hashing mode: word ids hashed into 'id_range' buckets (no vocabulary)
+
+MODES = ['dictionary', 'hashing']
+
+def load(input_file=None, mmap=None):
+    """
+    Load the gensim dictionary; 'mmap' memory-maps its arrays
+    saved in their own .npy files (None: load them in memory)
+    """
 
-def load(input_file=None):
     utils.check_file_readable(input_file)
-    return Dictionary.load(input_file)
+    return Dictionary.load(input_file, mmap=mmap)
+
+def create_hashing(id_range=262144):
+    """Return the hashing dictionary (constant memory, no word tracking)"""
+
+    return HashDictionary(id_range=int(id_range), debug=False)
+
+def is_hashing(cdictionary):
+    """Check whether the word ids are hashed (no known vocabulary)"""
+
+    return isinstance(cdictionary, HashDictionary)
 
 def load_and_save_as_json(input_file, output_file):
     cdict = Dictionary.load(input_file)
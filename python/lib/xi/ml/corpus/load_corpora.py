@@ -15,14 +15,22 @@ class LoadCorpora(Component, TextCorpus):
     input is an array with a list of json files
     """
 
-    def __init__(self, input_files=None):
-        """Redefine the gensim's TextCorpus init method"""
+    def __init__(self, input_files=None, cdictionary=None):
+        """
+        Redefine the gensim's TextCorpus init method;
+        reuse the given dictionary instead of building a new one
+        """
 
         super().__init__()
 
         self.input = input_files
-        self.dictionary = Dictionary(prune_at=5000000)
         self.metadata = False
+
+        if cdictionary is not None:
+            self.dictionary = cdictionary
+            return
+
+        self.dictionary = Dictionary(prune_at=5000000)
         if input_files is not None:
             self.dictionary.add_documents(self.get_texts(), prune_at=5000000)
         else:
@@ -0,0 +1,102 @@
+# -*-coding:utf-8 -*
+
+
+import json
+import numpy
+
+from xi.ml.common import Component
+from xi.ml.tools import utils
+from xi.ml.error import ConfigError
+
+
+def line_offsets(filename):
+    """Return the byte offset of each line of the input file"""
+
+    offsets = []
+    position = 0
+
+    with open(filename, 'rb') as stream:
+        for line in stream:
+            offsets.append(position)
+            position += len(line)
+
+    return numpy.asarray(offsets, dtype=numpy.int64)
+
+
+class OffsetCorpora(Component):
+    """
+    Merge documents corpora (one file for each category) without loading
+    them: only the byte offset of each document is kept in memory, and
+    batches of documents are read from the files in any (shuffled) order.
+    (used for sklearn out-of-core classification training)
+    """
+
+    def __init__(self, input_files, class_size=-1):
+        """
+        Index the documents of each file:
+        the same number of documents per file ('class_size',
+        the size of the smallest file by default)
+        """
+
+        super().__init__()
+
+        if not isinstance(input_files, list):
+            raise ConfigError('Given parameter is not a List')
+
+        for filename in input_files:
+            utils.check_file_readable(filename)
+
+        self.input_files = list(input_files)
+
+        offsets = [line_offsets(filename) for filename in input_files]
+        self.ndocs = [len(foffsets) for foffsets in offsets]
+
+        if class_size == -1 or class_size > min(self.ndocs):
+            class_size = min(self.ndocs)
+
+        # documents interleaved file after file, as in MergeCorpora
+        self.files = numpy.tile(
+            numpy.arange(len(input_files)), class_size)
+        self.offsets = numpy.vstack(
+            [foffsets[:class_size] for foffsets in offsets]).T.ravel()
+
+        self.logger.info(
+            "Indexed {} documents for training ({} per file)"
+            .format(len(self.offsets), class_size))
+
+    def __len__(self):
+        """Return the number of indexed documents"""
+
+        return len(self.offsets)
+
+    def batches(self, batch_size, rstate=None):
+        """
+        Yield the (features matrix, labels) of batches of 'batch_size'
+        documents, in a random order when a random state is given
+        """
+
+        order = numpy.arange(len(self.offsets))
+        if rstate is not None:
+            rstate.shuffle(order)
+
+        if batch_size == -1:
+            batch_size = max(len(order), 1)
+
+        streams = [open(filename, 'rb') for filename in self.input_files]
+
+        try:
+            for start in range(0, len(order), batch_size):
+                features, labels = [], []
+
+                for index in order[start:start + batch_size]:
+                    stream = streams[self.files[index]]
+                    stream.seek(self.offsets[index])
+
+                    doc = json.loads(stream.readline().decode('utf-8'))
+                    features.append(doc['features'])
+                    labels.append(doc['category'])
+
+                yield numpy.asarray(features, dtype=numpy.float64), labels
+        finally:
+            for stream in streams:
+                stream.close()
@@ -0,0 +1,163 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import json
+import shutil
+import tempfile
+
+import numpy
+import scipy.sparse
+
+from xi.ml.tools import utils
+from xi.ml.error import DataError
+
+
+# Module: store a gensim corpus as a memory-mapped sparse CSR matrix
+# (one row per document, one column per word id):
+# - data.bin, indices.bin, indptr.bin: the raw little-endian CSR arrays
+# - header.json: the matrix dimensions, the arrays' types and the
+#   fingerprint of the data the matrix is built from (optional)
+# A matrix is written under a temporary folder renamed into place:
+# an older matrix memory-mapped from the same folder stays readable.
+
+DTYPES = {
+    'data': '<f4',
+    'indices': '<i4',
+    'indptr': '<i8'
+}
+
+def save(output, corpus, num_terms, chunksize=10000, fingerprint=None):
+    """
+    Stream the gensim corpus into the 'output' folder
+    (written by chunks of documents); return the number of stored documents
+    """
+
+    output = os.path.abspath(output)
+    utils.create_folder(os.path.dirname(output))
+
+    tmp_folder = tempfile.mkdtemp(
+        prefix='.{}-'.format(os.path.basename(output)),
+        dir=os.path.dirname(output))
+
+    try:
+        ndocs = _write(tmp_folder, corpus, num_terms, chunksize, fingerprint)
+        _replace_folder(tmp_folder, output)
+    finally:
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+
+    return ndocs
+
+def _write(output, corpus, num_terms, chunksize, fingerprint):
+    """Write the raw arrays and the header of the matrix under 'output'"""
+
+    ndocs, nnz = 0, 0
+    streams = {
+        name: open(os.path.join(output, name + '.bin'), 'wb')
+        for name in DTYPES}
+
+    def flush(indices, data, indptr):
+        """Append the buffered chunk to the raw arrays"""
+
+        numpy.asarray(indices, dtype=DTYPES['indices'])\
+            .tofile(streams['indices'])
+        numpy.asarray(data, dtype=DTYPES['data']).tofile(streams['data'])
+        numpy.asarray(indptr, dtype=DTYPES['indptr'])\
+            .tofile(streams['indptr'])
+
+    try:
+        indices, data, indptr = [], [], [0]
+
+        for doc in corpus:
+            for word_id, weight in doc:
+                indices.append(word_id)
+                data.append(weight)
+
+            nnz += len(doc)
+            indptr.append(nnz)
+            ndocs += 1
+
+            if len(indptr) >= chunksize:
+                flush(indices, data, indptr)
+                indices, data, indptr = [], [], []
+
+        flush(indices, data, indptr)
+    finally:
+        for stream in streams.values():
+            stream.close()
+
+    header = {
+        'shape': [ndocs, int(num_terms)],
+        'nnz': nnz,
+        'dtypes': DTYPES,
+        'fingerprint': fingerprint
+    }
+
+    with open(os.path.join(output, 'header.json'), 'w') as ostream:
+        json.dump(header, ostream, indent=2)
+
+    return ndocs
+
+def _replace_folder(source, output):
+    """
+    Move the 'source' folder to 'output': a previous 'output' folder is
+    renamed aside then removed (its files stay valid for open memory maps)
+    """
+
+    if not os.path.exists(output):
+        os.rename(source, output)
+        return
+
+    old_folder = tempfile.mkdtemp(
+        prefix='.{}-old-'.format(os.path.basename(output)),
+        dir=os.path.dirname(output))
+
+    previous = os.path.join(old_folder, 'matrix')
+
+    try:
+        os.rename(output, previous)
+
+        try:
+            os.rename(source, output)
+        except OSError:
+            os.rename(previous, output)
+            raise
+    finally:
+        shutil.rmtree(old_folder, ignore_errors=True)
+
+def load_header(input_folder):
+    """Return the header of the matrix stored in the given folder"""
+
+    utils.check_folder_readable(input_folder)
+
+    header_file = os.path.join(input_folder, 'header.json')
+    utils.check_file_readable(header_file)
+
+    with open(header_file, 'r') as istream:
+        return json.load(istream)
+
+def load(input_folder, mmap_mode='r'):
+    """Load the CSR matrix stored in the given folder (memory-mapped)"""
+
+    header = load_header(input_folder)
+
+    arrays = {}
+    for name, dtype in header['dtypes'].items():
+        filename = os.path.join(input_folder, name + '.bin')
+        utils.check_file_readable(filename)
+
+        if os.path.getsize(filename) == 0:
+            arrays[name] = numpy.zeros(0, dtype=dtype)
+        elif mmap_mode is None:
+            arrays[name] = numpy.fromfile(filename, dtype=dtype)
+        else:
+            arrays[name] = numpy.memmap(filename, dtype=dtype, mode=mmap_mode)
+
+    if len(arrays['indptr']) != header['shape'][0] + 1 \
+            or len(arrays['data']) != header['nnz']:
+        raise DataError(
+            "Inconsistent sparse matrix stored in '{}'".format(input_folder))
+
+    return scipy.sparse.csr_matrix(
+        (arrays['data'], arrays['indices'], arrays['indptr']),
+        shape=tuple(header['shape']), copy=False)
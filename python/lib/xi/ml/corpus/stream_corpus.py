@@ -33,3 +33,17 @@ class StreamCorpus(Component):
             for line in stream:
                 doc = json.loads(line)
                 yield doc
+
+    def batches(self, batch_size):
+        """Yield lists of at most 'batch_size' documents"""
+
+        batch = []
+        for doc in self:
+            batch.append(doc)
+
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
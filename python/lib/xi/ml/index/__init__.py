@@ -0,0 +1,4 @@
+# -*-coding:utf-8 -*
+
+
+from .similarity_index import SimilarityIndex
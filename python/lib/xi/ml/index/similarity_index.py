@@ -0,0 +1,302 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import json
+
+import numpy
+import sklearn.cluster
+
+from xi.ml.common import Component
+from xi.ml.tools import utils
+from xi.ml.error import ConfigError, DataError
+from xi.ml.corpus import StreamCorpus
+
+
+def normalize(vectors):
+    """Return the float32 unit-length rows of the matrix (null rows kept)"""
+
+    vectors = numpy.array(vectors, dtype=numpy.float32, ndmin=2)
+    norms = numpy.sqrt(numpy.einsum('ij,ij->i', vectors, vectors))
+    vectors[norms > 0] /= norms[norms > 0][:, numpy.newaxis]
+
+    return vectors
+
+def merge_top(sims, rows, block_sims, block_rows, k):
+    """
+    Merge the current top 'k' similarities (and rows) of each query
+    with the similarities of a new block of rows
+    """
+
+    sims = numpy.hstack((sims, block_sims))
+    rows = numpy.hstack((rows, block_rows))
+
+    if sims.shape[1] > k:
+        top = numpy.argpartition(-sims, k - 1, axis=1)[:, :k]
+        queries = numpy.arange(sims.shape[0])[:, numpy.newaxis]
+        sims, rows = sims[queries, top], rows[queries, top]
+
+    return sims, rows
+
+
+class SimilarityIndex(Component):
+    """
+    Class searching the documents most similar to a query (cosine similarity)
+    over the features of transformed documents:
+    - brute-force search: one matrix product per block of documents
+    - IVF search ('nlist' > 0): documents partitioned into 'nlist' k-means
+      clusters, only the documents of the 'nprobe' closest clusters searched
+    """
+
+    # files of the saved index
+    FILES = {
+        'header': 'header.json',
+        'vectors': 'vectors.npy',
+        'ids': 'ids.json',
+        'centroids': 'centroids.npy',
+        'offsets': 'offsets.npy'
+    }
+
+    def __init__(self, block_size=65536):
+        """Initialize an empty index ('block_size' documents per product)"""
+
+        super().__init__()
+
+        self.block_size = int(block_size)
+
+        self.vectors = None
+        self.ids = []
+        self.rows = None
+
+        # IVF: cluster centroids, first row of each cluster, clusters probed
+        self.centroids = None
+        self.offsets = None
+        self.nprobe = 1
+
+    def build(self, input_files, nlist=0, nprobe=8, seed=0):
+        """
+        Index the features of the transformed documents of the input files;
+        partition them into 'nlist' clusters when requested
+        """
+
+        self.logger.info(
+            "Build the similarity index of the '{}' documents"
+            .format(input_files))
+        self.timer.start_timer()
+
+        ids, features = [], []
+        for input_file in input_files:
+            for doc in StreamCorpus(input_file):
+                if 'id' in doc and 'features' in doc:
+                    ids.append(doc['id'])
+                    features.append(doc['features'])
+
+        if not features:
+            raise DataError(
+                "No document features found in '{}'".format(input_files))
+
+        vectors = normalize(features)
+        del features
+
+        self.centroids = None
+        self.offsets = None
+        self.nprobe = int(nprobe)
+
+        if nlist > 0:
+            nlist = min(int(nlist), len(ids))
+
+            kmeans = sklearn.cluster.MiniBatchKMeans(
+                n_clusters=nlist, random_state=seed)
+            kmeans.fit(vectors)
+
+            self.centroids = normalize(kmeans.cluster_centers_)
+            clusters = self.closest_clusters(vectors, 1)[:, 0]
+
+            # documents stored cluster after cluster
+            order = numpy.argsort(clusters, kind='mergesort')
+            vectors = vectors[order]
+            ids = [ids[row] for row in order]
+
+            self.offsets = numpy.concatenate(
+                ([0], numpy.cumsum(numpy.bincount(clusters, minlength=nlist))))
+
+        self.vectors = vectors
+        self.ids = ids
+        self.rows = None
+
+        self.timer.stop_timer(
+            "Indexed {} documents of {} features ({} clusters)"
+            .format(len(ids), vectors.shape[1], nlist))
+
+    def closest_clusters(self, vectors, n):
+        """Return the 'n' closest clusters of each (normalized) vector"""
+
+        clusters = []
+        for start in range(0, vectors.shape[0], self.block_size):
+            sims = vectors[start:start + self.block_size].dot(self.centroids.T)
+
+            top = numpy.argpartition(-sims, n - 1, axis=1)[:, :n] \
+                if n < sims.shape[1] else numpy.tile(
+                    numpy.arange(sims.shape[1]), (sims.shape[0], 1))
+            clusters.append(top)
+
+        return numpy.vstack(clusters)
+
+    def search(self, queries, k):
+        """
+        Return the top 'k' similarities and rows of the (normalized) queries
+        among all indexed rows, searched block by block
+        """
+
+        end = self.vectors.shape[0]
+
+        sims = numpy.zeros((queries.shape[0], 0), dtype=numpy.float32)
+        rows = numpy.zeros((queries.shape[0], 0), dtype=numpy.int64)
+
+        for bstart in range(0, end, self.block_size):
+            bend = min(bstart + self.block_size, end)
+            block_sims = queries.dot(self.vectors[bstart:bend].T)
+            block_rows = numpy.tile(
+                numpy.arange(bstart, bend), (queries.shape[0], 1))
+
+            sims, rows = merge_top(sims, rows, block_sims, block_rows, k)
+
+        return sims, rows
+
+    def query(self, vectors, k=10, nprobe=None):
+        """
+        Return, for each query vector, the list of its top 'k'
+        (document id, similarity) pairs, in decreasing similarity
+        """
+
+        self.check_index()
+
+        queries = normalize(vectors)
+        if queries.shape[1] != self.vectors.shape[1]:
+            raise ConfigError(
+                "Query vectors of {} features; expected {}"
+                .format(queries.shape[1], self.vectors.shape[1]))
+
+        k = min(int(k), self.vectors.shape[0])
+
+        if self.centroids is None:
+            sims, rows = self.search(queries, k)
+        else:
+            nprobe = min(nprobe or self.nprobe, len(self.centroids))
+            probes = self.closest_clusters(queries, nprobe)
+
+            sims = numpy.full((len(queries), k), -numpy.inf, dtype='float32')
+            rows = numpy.zeros((len(queries), k), dtype=numpy.int64)
+
+            for query, clusters in enumerate(probes):
+                # rows of the probed clusters
+                candidates = numpy.concatenate([
+                    numpy.arange(self.offsets[c], self.offsets[c + 1])
+                    for c in clusters])
+
+                csims, crows = merge_top(
+                    sims[query:query + 1, :0], rows[query:query + 1, :0],
+                    self.vectors[candidates].dot(queries[query])[None, :],
+                    candidates[None, :], k)
+
+                found = csims.shape[1]
+                sims[query, :found] = csims[0]
+                rows[query, :found] = crows[0]
+
+        results = []
+        for qsims, qrows in zip(sims, rows):
+            order = numpy.argsort(-qsims)
+            results.append([
+                (self.ids[qrows[i]], float(qsims[i]))
+                for i in order if qsims[i] > -numpy.inf])
+
+        return results
+
+    def neighbors(self, doc_id, k=10, nprobe=None):
+        """Return the top 'k' documents most similar to the indexed document"""
+
+        self.check_index()
+
+        if self.rows is None:
+            self.rows = {did: row for row, did in enumerate(self.ids)}
+
+        if doc_id not in self.rows:
+            raise DataError("Document '{}' not indexed".format(doc_id))
+
+        vector = self.vectors[self.rows[doc_id]]
+        return self.query(vector, k, nprobe)[0]
+
+    def save(self, folder):
+        """Save the index under the given folder"""
+
+        self.check_index()
+
+        files = {
+            key: os.path.join(folder, filename)
+            for key, filename in self.FILES.items()}
+
+        utils.create_path(files['header'])
+
+        numpy.save(files['vectors'], self.vectors)
+        with open(files['ids'], 'w') as ostream:
+            json.dump(self.ids, ostream, ensure_ascii=False)
+
+        nlist = 0
+        if self.centroids is not None:
+            nlist = len(self.centroids)
+            numpy.save(files['centroids'], self.centroids)
+            numpy.save(files['offsets'], self.offsets)
+
+        header = {
+            'ndocs': int(self.vectors.shape[0]),
+            'nfeatures': int(self.vectors.shape[1]),
+            'nlist': nlist,
+            'nprobe': self.nprobe
+        }
+
+        with open(files['header'], 'w') as ostream:
+            json.dump(header, ostream, indent=2, sort_keys=True)
+
+        self.logger.info(
+            "Saved the similarity index of {} documents under '{}'"
+            .format(header['ndocs'], folder))
+
+    def load(self, folder, mmap_mode='r'):
+        """Load the index saved under the given folder (memory-mapped)"""
+
+        files = {
+            key: os.path.join(folder, filename)
+            for key, filename in self.FILES.items()}
+
+        utils.check_file_readable(files['header'])
+        with open(files['header'], 'r') as istream:
+            header = json.load(istream)
+
+        self.vectors = numpy.load(files['vectors'], mmap_mode=mmap_mode)
+        with open(files['ids'], 'r') as istream:
+            self.ids = json.load(istream)
+
+        self.rows = None
+        self.centroids = None
+        self.offsets = None
+        self.nprobe = header['nprobe']
+
+        if header['nlist'] > 0:
+            self.centroids = numpy.load(files['centroids'])
+            self.offsets = numpy.load(files['offsets'])
+
+        if self.vectors.shape != (header['ndocs'], header['nfeatures']) \
+                or len(self.ids) != header['ndocs']:
+            raise DataError(
+                "Similarity index under '{}' does not match its header"
+                .format(folder))
+
+        self.logger.info(
+            "Loaded the similarity index of {} documents from '{}'"
+            .format(header['ndocs'], folder))
+
+    def check_index(self):
+        """Check if the index was built or loaded"""
+
+        if self.vectors is None:
+            raise ConfigError('Empty similarity index: build or load it')
@@ -2,4 +2,6 @@
 
 
 from . import utils
+from . import benchmark
+from . import shapes
 from .path_generator import PathGenerator
@@ -0,0 +1,68 @@
+# -*-coding:utf-8 -*
+
+
+import time
+import queue
+import resource
+import multiprocessing
+
+from xi.ml.error import CaughtException
+
+
+# Module: measure the wall time and the peak memory of a training function,
+# executed in a new process (so that each run gets its own peak memory)
+
+def peak_memory():
+    """Return the peak resident memory of the current process (in MB)"""
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def _measure(results, train, evaluate, args):
+    """Execute and measure the training function in the current process"""
+
+    try:
+        start = time.time()
+        model = train(*args)
+
+        stats = {
+            'time': time.time() - start,
+            'peak_memory_mb': peak_memory()
+        }
+
+        # evaluate only after measuring the training run
+        if evaluate is not None:
+            stats.update(evaluate(model, *args))
+
+        results.put(stats)
+    except Exception as e:
+        results.put(CaughtException(
+            "Exception encountered during benchmark run: {}".format(e)))
+
+def run_isolated(train, args=(), evaluate=None):
+    """
+    Execute 'train(*args)' in a new process; return the dictionary of
+    its wall time, its peak memory and the 'evaluate(model, *args)' stats
+    """
+
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_measure, args=(results, train, evaluate, args))
+
+    process.start()
+
+    while True:
+        try:
+            stats = results.get(timeout=1)
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                raise CaughtException(
+                    "Benchmark process died with exit code {}"
+                    .format(process.exitcode))
+
+    process.join()
+
+    if isinstance(stats, Exception):
+        raise stats
+
+    return stats
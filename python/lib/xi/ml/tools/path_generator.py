@@ -3,6 +3,7 @@
 
 import os
 from xi.ml.tools import utils
+from xi.ml.common import logger
 
 
 class PathGenerator:
@@ -23,6 +24,7 @@ class PathGenerator:
             'models': {
                 'trans': self._generate_transmodels_folders(),
                 'trans_topics': self._generate_transtopics_files(),
+                'index': self._generate_index_folders(),
                 'classif': self._generate_classifmodels_folders()
             },
             'dictionary': self._generate_dict_files(),
@@ -178,9 +180,20 @@ class PathGenerator:
 
         return topics_file
 
-    def classification_model(self, ttype, ptype, cname, ctype, train, csize):
+    def similarity_index(self, ttype, ptype):
+        """
+        Return the similarity index folder
+        given the transformation and preprocessing
+        """
+
+        ctrans = "{}_{}".format(ttype, ptype)
+        return self.paths['models']['index'][ctrans]
+
+    def classification_model(
+            self, ttype, ptype, cname, ctype, train, csize, existing=False):
         """
         Return the model's filename given the transformation and preprocessing
+        (existing: the legacy pickled model '.bin' when only this one exists)
         """
 
         if csize == -1:
@@ -189,9 +202,20 @@ class PathGenerator:
         ctrans = "{}_{}".format(ttype, ptype)
         cclassif = "{}_{}".format(cname, ctype)
         folder = self.paths['models']['classif'][cclassif][ctrans]
-        filename = "{}_{}.bin".format(train, str(csize))
+        filename = "{}_{}.model".format(train, str(csize))
 
-        return os.path.join(folder, filename)
+        model_file = os.path.join(folder, filename)
+        legacy_file = utils.change_extension(model_file, 'bin')
+
+        if existing and not os.path.exists(model_file) \
+                and os.path.isfile(legacy_file):
+            logger.create(__name__).warning(
+                "Loading the legacy pickled model '{}': retrain it "
+                "or save it again as the model folder '{}'"
+                .format(legacy_file, model_file))
+            return legacy_file
+
+        return model_file
 
     def _generate_data_files(self):
         """
@@ -313,6 +337,22 @@ class PathGenerator:
 
         return files
 
+    def _generate_index_folders(self):
+        """
+        Generate the similarity index paths for each preproc/trans type
+        """
+
+        folders = {}
+
+        for transformation in self.trans:
+            for preprocess in self.preproc:
+                ctrans = "{}_{}".format(transformation, preprocess)
+
+                folders[ctrans] = os.path.join(
+                    self.res, 'models', 'indexes', ctrans)
+
+        return folders
+
     def _generate_classifmodels_folders(self):
         """
         Generate all the classification models paths for each preproc/trans type
@@ -0,0 +1,120 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import json
+import hashlib
+
+import numpy
+
+from xi.ml.tools import utils
+from xi.ml.error import DataError
+
+
+# Module: export the shape of word-indexed models (one row per word id)
+# - binary: the 'XiML' format read by the Ruby ModelBinarizer
+#   (signature, uint32 number of weights per row, float32 rows),
+#   always little-endian, with a json header file describing the matrix
+# - json: one json array of weights per line
+
+BYTESIG = b'XiML'
+OFFSET = len(BYTESIG) + 4
+DTYPE = '<f4'
+
+def vocabulary_checksum(id2word):
+    """Return the sha1 checksum of the 'word_id word' vocabulary entries"""
+
+    if id2word is None:
+        return None
+
+    checksum = hashlib.sha1()
+    for wid in sorted(id2word.keys()):
+        checksum.update("{}\t{}\n".format(wid, id2word[wid]).encode('utf-8'))
+
+    return checksum.hexdigest()
+
+def header_file(output):
+    """Return the json header filename of the given binary shape file"""
+
+    return utils.change_extension(output, 'json')
+
+def save_binary(output, matrix, chunksize=10000, **header):
+    """
+    Save the 2D matrix in the binary 'XiML' format, by chunks of rows;
+    save its dimensions, type and the given extra header fields
+    into the json header file
+    """
+
+    nrows, ncols = matrix.shape
+
+    if ncols == 0:
+        raise DataError(
+            "Cannot save a matrix without columns under '{}'".format(output))
+
+    utils.create_path(output)
+    with open(output, 'wb') as ostream:
+        ostream.write(BYTESIG)
+        ostream.write(numpy.asarray([ncols], dtype='<u4').tobytes())
+
+        for start in range(0, nrows, chunksize):
+            numpy.asarray(matrix[start:start + chunksize], dtype=DTYPE)\
+                .tofile(ostream)
+
+    header = dict(header)
+    header.update({
+        'format': BYTESIG.decode('ascii'),
+        'dtype': 'float32',
+        'byteorder': 'little',
+        'offset': OFFSET,
+        'rows': int(nrows),
+        'cols': int(ncols)
+    })
+
+    with open(header_file(output), 'w') as ostream:
+        json.dump(header, ostream, indent=2, sort_keys=True)
+
+    return header
+
+def load_binary(input_file, mmap_mode='r'):
+    """Load the 2D matrix stored in the binary 'XiML' format"""
+
+    utils.check_file_readable(input_file)
+
+    with open(input_file, 'rb') as istream:
+        if istream.read(len(BYTESIG)) != BYTESIG:
+            raise DataError(
+                "Invalid binary format of file '{}'".format(input_file))
+
+        ncols = int(numpy.frombuffer(istream.read(4), dtype='<u4')[0])
+
+    payload = os.path.getsize(input_file) - OFFSET
+    itemsize = numpy.dtype(DTYPE).itemsize
+
+    if ncols == 0 or payload % (ncols * itemsize) != 0:
+        raise DataError(
+            "Invalid dimensions ({} bytes of {} columns) in file '{}'"
+            .format(payload, ncols, input_file))
+
+    # no row: numpy cannot memory-map an empty payload
+    if payload == 0:
+        return numpy.zeros((0, ncols), dtype=DTYPE)
+
+    matrix = numpy.memmap(
+        input_file, dtype=DTYPE, mode=mmap_mode or 'r', offset=OFFSET)
+    matrix = matrix.reshape((-1, ncols))
+
+    if mmap_mode is None:
+        matrix = numpy.array(matrix)
+
+    return matrix
+
+def save_json_lines(output, matrix, chunksize=10000):
+    """Save the 2D matrix as one json array of weights per line"""
+
+    utils.create_path(output)
+    with open(output, 'w') as ostream:
+        for start in range(0, matrix.shape[0], chunksize):
+            rows = numpy.asarray(
+                matrix[start:start + chunksize], dtype=numpy.float64).tolist()
+
+            ostream.write(''.join(json.dumps(row) + '\n' for row in rows))
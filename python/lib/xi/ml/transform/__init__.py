@@ -4,5 +4,6 @@
 from .train_transformer import TrainTransformer
 from .load_transformer import LoadTransformer
 from .topics import Topics
+from .lsi_benchmark import LsiBenchmark
 
-from .train_word2vec import TrainWord2Vec
+from .train_word2vec import TrainWord2Vec, TokenizedCorpus
@@ -1,6 +1,10 @@
 # -*-coding:utf-8 -*
 
 
+import multiprocessing
+
+import numpy
+import scipy.sparse
 import gensim.models
 
 from xi.ml.common import Component
@@ -8,6 +12,55 @@ from xi.ml.tools import utils
 from xi.ml.error import ConfigError, CaughtException
 from xi.ml.corpus import dictionary
 from xi.ml.corpus import StreamCorpus, PushCorpus
+from xi.ml.transform.train_word2vec import align_rows
+from xi.ml.transform.sparse_rp import SparseRpModel
+
+
+# LDA model of the current worker process (loaded by the pool initializer)
+_worker_lda = None
+
+def set_lda_inference(model, iterations=None, gamma_threshold=None):
+    """Update the E-step iterations and convergence threshold of a LDA model"""
+
+    if iterations is not None:
+        model.iterations = int(iterations)
+
+    if gamma_threshold is not None:
+        model.gamma_threshold = float(gamma_threshold)
+
+def lda_features(model, bow_chunk):
+    """
+    Run the LDA E-step on a chunk of bow documents at once.
+    Return the matrix of normalized topic distributions.
+    """
+
+    if not bow_chunk:
+        return numpy.zeros((0, model.num_topics))
+
+    gamma, _ = model.inference(bow_chunk, collect_sstats=False)
+    features = gamma / gamma.sum(axis=1)[:, numpy.newaxis]
+
+    # same sparsity threshold as the per-document gensim transformation
+    min_proba = max(getattr(model, 'minimum_probability', 0.01), 1e-8)
+    features[features < min_proba] = 0.0
+
+    return features
+
+def _init_lda_worker(model_file, iterations, gamma_threshold, mmap='r'):
+    """
+    Load the LDA model once in the current worker process
+    (memory-mapped arrays: pages shared by all the workers)
+    """
+
+    global _worker_lda
+
+    _worker_lda = gensim.models.LdaModel.load(model_file, mmap=mmap)
+    set_lda_inference(_worker_lda, iterations, gamma_threshold)
+
+def _lda_worker_features(bow_chunk):
+    """Run the LDA E-step on a chunk of bow documents in a worker process"""
+
+    return lda_features(_worker_lda, bow_chunk)
 
 
 class LoadTransformer(Component):
@@ -17,10 +70,27 @@ class LoadTransformer(Component):
         'TFIDF': gensim.models.TfidfModel,
         'LSI': gensim.models.LsiModel,
         'LDA': gensim.models.LdaModel,
-        'RP': gensim.models.RpModel
+        'RP': SparseRpModel,
+        'W2V': gensim.models.Word2Vec
     }
 
-    def __init__(self, model_name, model_file):
+    # options of the transformation stage:
+    # - batch_size: number of documents transformed at once
+    # - workers: number of processes used for the batched LDA inference
+    # - iterations, gamma_threshold: LDA E-step settings (model's by default)
+    # - idf: IDF-weighted (or plain) mean of the word vectors (W2V)
+    # - mmap: memory-map the model's arrays saved in their own .npy files
+    #   ('r': read-only, pages shared between processes; None: load in RAM)
+    OPTIONS = {
+        'batch_size': 1000,
+        'workers': 1,
+        'iterations': None,
+        'gamma_threshold': None,
+        'idf': True,
+        'mmap': 'r'
+    }
+
+    def __init__(self, model_name, model_file, **kwargs):
         """Initialize the transformation model"""
 
         super().__init__()
@@ -30,15 +100,40 @@ class LoadTransformer(Component):
                 "Unknown model name '{}'. Choose from {}"
                 .format(model_name, self.TRANSFORMERS.keys()))
 
+        unknown = set(kwargs.keys()).difference(self.OPTIONS.keys())
+        if unknown:
+            raise ConfigError(
+                "Unknown transformation options {}. Choose from {}"
+                .format(list(unknown), list(self.OPTIONS.keys())))
+
         utils.check_file_readable(model_file)
 
         self.name = model_name.upper()
-        self.model = self.TRANSFORMERS[self.name].load(model_file)
+        self.model_file = model_file
+
+        self.options = dict(self.OPTIONS)
+        self.options.update(kwargs)
+
+        self.model = self.TRANSFORMERS[self.name].load(
+            model_file, mmap=self.options['mmap'])
+
+        if self.name == 'LDA':
+            set_lda_inference(
+                self.model,
+                self.options['iterations'],
+                self.options['gamma_threshold'])
 
         self.ntopics = 0
 
         if hasattr(self.model, 'num_topics'):
             self.ntopics = self.model.num_topics
+        elif self.name == 'W2V':
+            self.ntopics = self.model.vector_size
+
+        # W2V: vectors' row and weight of each dictionary word id
+        self.aligned = None
+        self.rows = None
+        self.weights = None
 
         if self.name == "LSI" \
                 and self.ntopics != self.model.projection.u[0].size:
@@ -54,6 +149,11 @@ class LoadTransformer(Component):
         if self.name == "TFIDF":
             return self.model[corpus]
 
+        if self.name == 'W2V':
+            raise ConfigError(
+                'The W2V transformation applies on documents: '
+                'use transform_batch')
+
         full_corpus = []
         transformed_corpus = self.model[corpus]
 
@@ -74,6 +174,11 @@ class LoadTransformer(Component):
 
         self.check_model()
 
+        # W2V: a batch of one document (its own bow, no tf-idf)
+        if self.name == 'W2V':
+            return self.transform_batch(
+                cdictionary, tfidf_model, [doc], [doc_id])[0]
+
         features = None
 
         # transform document into bag-of-words format
@@ -99,33 +204,192 @@ class LoadTransformer(Component):
 
         return [0.0] * self.ntopics
 
-    def store_transformation(
-            self, input_file, output_file, dict_file, tfidf_file):
+    def transform_batch(
+            self, cdictionary, tfidf_model, docs, doc_ids=None, pool=None):
 
         """
-        Apply the transformation model on the given hash documents.
-        Store transformed 'features' in file.
+        Apply the transformation model on the given list of documents.
+        Return the list of features arrays.
         """
 
         self.check_model()
 
+        if doc_ids is None:
+            doc_ids = [-1] * len(docs)
+
+        # sparse RP: one sparse product for all the batch's tf-idf documents
+        if isinstance(self.model, SparseRpModel):
+            features = self.model.transform_corpus([
+                tfidf_model[cdictionary.doc2bow(doc.split())]
+                for doc in docs])
+
+            self.warn_empty(docs, doc_ids, numpy.abs(features).sum(axis=1))
+            return features.tolist()
+
+        if self.name not in ['LDA', 'W2V']:
+            return [
+                self.transform_doc(cdictionary, tfidf_model, doc, doc_id)
+                for doc, doc_id in zip(docs, doc_ids)]
+
+        bows = [cdictionary.doc2bow(doc.split()) for doc in docs]
+
+        if self.name == 'W2V':
+            if self.aligned is not cdictionary:
+                self.align_vocabulary(cdictionary, tfidf_model)
+
+            features, weights = self.w2v_features(bows)
+
+            self.warn_empty(docs, doc_ids, weights)
+            return features.tolist()
+
+        if pool is None:
+            features = lda_features(self.model, bows)
+        else:
+            # split the batch into one contiguous chunk per worker
+            csize = max(1, -(-len(bows) // self.options['workers']))
+            chunks = [bows[i:i + csize] for i in range(0, len(bows), csize)]
+
+            features = numpy.concatenate(
+                [numpy.zeros((0, self.ntopics))] +
+                pool.map(_lda_worker_features, chunks))
+
+        # no topic above the sparsity threshold: no features generated
+        self.warn_empty(docs, doc_ids, features.sum(axis=1))
+        return features.tolist()
+
+    def warn_empty(self, docs, doc_ids, weights):
+        """Warn about the documents of null weight (no features generated)"""
+
+        for doc in numpy.nonzero(weights == 0)[0]:
+            self.logger.warning(
+                "No features generated for the content '{}'. "
+                "Document id={}.".format(docs[doc], doc_ids[doc]))
+
+    def align_vocabulary(self, cdictionary, tfidf_model=None):
+        """
+        Map each dictionary word id to its row in the word vectors matrix
+        and to its weight (IDF weight when requested, 1.0 otherwise)
+        """
+
+        self.rows = align_rows(cdictionary, self.model.wv)
+        self.weights = numpy.ones(len(self.rows))
+
+        if self.options['idf'] and tfidf_model is not None:
+            self.weights[:] = 0.0
+            for wid, idf in tfidf_model.idfs.items():
+                if wid < len(self.weights):
+                    self.weights[wid] = idf
+
+        # ignore the words unknown to the word2vec model
+        self.weights[self.rows < 0] = 0.0
+        self.rows[self.rows < 0] = 0
+
+        self.aligned = cdictionary
+
+        self.logger.info(
+            "Found vectors for {} of {} dictionary words"
+            .format(numpy.count_nonzero(self.weights), len(self.weights)))
+
+    def w2v_features(self, bows):
+        """
+        Return the (weighted) mean word vectors of the bow documents
+        and the total weight of each document
+        """
+
+        lengths = [len(bow) for bow in bows]
+        indptr = numpy.concatenate(([0], numpy.cumsum(lengths)))
+
+        wids = numpy.fromiter(
+            (wid for bow in bows for wid, _ in bow),
+            dtype=numpy.int64, count=indptr[-1])
+        counts = numpy.fromiter(
+            (count for bow in bows for _, count in bow),
+            dtype=numpy.float64, count=indptr[-1])
+
+        vectors = self.model.wv.syn0
+
+        # documents x vector rows: sum of the words' weighted vectors
+        docs = scipy.sparse.csr_matrix(
+            (counts * self.weights[wids], self.rows[wids], indptr),
+            shape=(len(bows), vectors.shape[0]))
+
+        weights = numpy.asarray(docs.sum(axis=1)).ravel()
+        features = numpy.asarray(docs.dot(vectors), dtype=numpy.float64)
+
+        nonzero = weights > 0
+        features[nonzero] /= weights[nonzero][:, numpy.newaxis]
+
+        return features, weights
+
+    def create_pool(self):
+        """
+        Create the pool of worker processes used for the LDA inference;
+        return None when the inference runs in the current process.
+        """
+
+        if self.name != 'LDA' or self.options['workers'] <= 1:
+            return None
+
+        self.logger.info(
+            "Run the LDA inference on {} worker processes"
+            .format(self.options['workers']))
+
+        return multiprocessing.Pool(
+            self.options['workers'],
+            initializer=_init_lda_worker,
+            initargs=(
+                self.model_file,
+                self.options['iterations'],
+                self.options['gamma_threshold'],
+                self.options['mmap']))
+
+    def load_resources(self, dict_file, tfidf_file):
+        """
+        Load the dictionary and, when the transformation needs it,
+        the TF-IDF model applied before the transformation
+        """
+
         utils.check_file_readable(dict_file)
-        cdictionary = dictionary.load(dict_file)
+        cdictionary = dictionary.load(dict_file, mmap=self.options['mmap'])
 
         tfidf_model = None
-        if self.name != 'LDA':
+        if self.name != 'LDA' and (self.name != 'W2V' or self.options['idf']):
             utils.check_file_readable(tfidf_file)
-            tfidf_model = self.TRANSFORMERS['TFIDF'].load(tfidf_file)
+            tfidf_model = self.TRANSFORMERS['TFIDF'].load(
+                tfidf_file, mmap=self.options['mmap'])
+
+        return cdictionary, tfidf_model
+
+    def store_transformation(
+            self, input_file, output_file, dict_file, tfidf_file):
+
+        """
+        Apply the transformation model on the given hash documents.
+        Store transformed 'features' in file.
+        """
+
+        self.check_model()
+
+        cdictionary, tfidf_model = self.load_resources(dict_file, tfidf_file)
 
         sc = StreamCorpus(input_file)
+        pool = self.create_pool()
 
         try:
             pc = PushCorpus(output_file)
 
-            for doc in sc:
-                if 'content' in doc and 'id' in doc:
-                    doc['features'] = self.transform_doc(
-                        cdictionary, tfidf_model, doc['content'], doc['id'])
+            for batch in sc.batches(self.options['batch_size']):
+                docs = [
+                    doc for doc in batch if 'content' in doc and 'id' in doc]
+
+                features = self.transform_batch(
+                    cdictionary, tfidf_model,
+                    [doc['content'] for doc in docs],
+                    [doc['id'] for doc in docs],
+                    pool)
+
+                for doc, doc_features in zip(docs, features):
+                    doc['features'] = doc_features
                     pc.add(doc)
         except Exception as e:
             raise CaughtException(
@@ -136,6 +400,10 @@ class LoadTransformer(Component):
         finally:
             pc.close_stream()
 
+            if pool is not None:
+                pool.close()
+                pool.join()
+
     def check_model(self):
         """Check if the model was properly loaded"""
 
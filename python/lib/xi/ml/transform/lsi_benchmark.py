@@ -0,0 +1,181 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import json
+
+import numpy
+import gensim.models
+import gensim.matutils
+import sklearn.linear_model
+
+from xi.ml.common import Component
+from xi.ml.tools import utils, benchmark
+from xi.ml.corpus import sparse_matrix, LoadCorpora
+from xi.ml.transform.train_transformer import TrainTransformer
+from xi.ml.transform.randomized_lsi import RandomizedLsi
+
+
+def prepare_tfidf(
+        folder, train_files, test_files, cdictionary=None, filter_dict=None):
+
+    """
+    Store the train/test TF-IDF matrices of the preprocessed files
+    (sparse_matrix folders 'tfidf_train' and 'tfidf_test') and the
+    dictionary ('dictionary.bin') under the given folder: the dictionary
+    is built and filtered on the training files unless given (hashing)
+    """
+
+    if cdictionary is None:
+        cdictionary = LoadCorpora(train_files).dictionary
+        cdictionary.filter_extremes(**(filter_dict or {}))
+
+    tfidf_model = gensim.models.TfidfModel(
+        LoadCorpora(train_files, cdictionary))
+    num_terms = 1 + max(cdictionary.keys())
+
+    store_tfidf(
+        os.path.join(folder, 'tfidf_train'),
+        tfidf_model[LoadCorpora(train_files, cdictionary)],
+        num_terms, cdictionary)
+    store_tfidf(
+        os.path.join(folder, 'tfidf_test'),
+        tfidf_model[LoadCorpora(test_files, cdictionary)],
+        num_terms, cdictionary)
+
+    cdictionary.save(os.path.join(folder, 'dictionary.bin'))
+
+def store_tfidf(output, corpus, num_terms, cdictionary, input_files=None):
+    """
+    Store the TF-IDF corpus as a memory-mapped matrix with its fingerprint;
+    with 'input_files', a matrix already stored under 'output' is kept
+    when its fingerprint matches and the files did not change since
+    """
+
+    checker = RandomizedLsi(id2word=cdictionary)
+    fingerprint = checker.fingerprint(corpus, num_terms)
+
+    if input_files is not None \
+            and checker.reusable(output, fingerprint, input_files):
+        return
+
+    sparse_matrix.save(output, corpus, num_terms, fingerprint=fingerprint)
+
+def save_stats(output, stats):
+    """Save the benchmark statistics to json file"""
+
+    utils.create_path(output)
+    with open(output, 'w') as ostream:
+        json.dump(stats, ostream, indent=2, sort_keys=True)
+
+def _train_lsi(bench, kwargs):
+    """Train the LSI model with the given settings (benchmarked process)"""
+
+    kwargs = dict(kwargs)
+
+    # the randomized engine decomposes the memory-mapped matrix directly
+    if kwargs.get('engine') == 'randomized':
+        kwargs.setdefault('matrix', bench.train_matrix)
+
+    docs = sparse_matrix.load(bench.train_matrix)
+    corpus = gensim.matutils.Sparse2Corpus(docs, documents_columns=False)
+
+    model = TrainTransformer('LSI', num_topics=bench.num_topics, **kwargs)
+    model.train(corpus, bench.id2word)
+
+    return model.model
+
+def _evaluate_lsi(model, bench, _):
+    """Compute the reconstruction error and the classification accuracy"""
+
+    vectors = numpy.asarray(model.projection.u[:, :bench.num_topics])
+    rstate = numpy.random.RandomState(bench.seed)
+
+    # relative reconstruction error of sampled training documents
+    train_docs = sparse_matrix.load(bench.train_matrix)
+    rows = bench.sample_rows(train_docs.shape[0], rstate)
+    docs = train_docs[rows].astype(numpy.float64)
+
+    energy = docs.multiply(docs).sum()
+    captured = numpy.square(docs.dot(vectors)).sum()
+    error = numpy.sqrt(max(0.0, 1.0 - captured / energy)) if energy else 0.0
+
+    # accuracy of a classifier trained on the sampled documents' topics
+    classifier = sklearn.linear_model.LogisticRegression(solver='liblinear')
+    classifier.fit(docs.dot(vectors), bench.train_labels[rows])
+
+    test_docs = sparse_matrix.load(bench.test_matrix)
+    rows = bench.sample_rows(test_docs.shape[0], rstate)
+    accuracy = classifier.score(
+        test_docs[rows].astype(numpy.float64).dot(vectors),
+        bench.test_labels[rows])
+
+    return {
+        'num_topics': int(vectors.shape[1]),
+        'reconstruction_error': float(error),
+        'accuracy': float(accuracy)
+    }
+
+
+class LsiBenchmark(Component):
+    """
+    Class comparing LSI training settings on the same TF-IDF matrices:
+    wall time, peak memory, reconstruction error and classification accuracy
+    """
+
+    def __init__(
+            self, train_matrix, train_labels, test_matrix, test_labels,
+            id2word, num_topics=300, sample=10000, seed=0):
+
+        """
+        Initialize with the memory-mapped train/test TF-IDF matrices
+        (sparse_matrix folders) and the category of each of their rows
+        """
+
+        super().__init__()
+
+        self.train_matrix = train_matrix
+        self.test_matrix = test_matrix
+        self.train_labels = numpy.asarray(train_labels)
+        self.test_labels = numpy.asarray(test_labels)
+
+        self.id2word = id2word
+        self.num_topics = num_topics
+        self.sample = sample
+        self.seed = seed
+
+        self.stats = {}
+
+    def sample_rows(self, nrows, rstate):
+        """Return the sorted indices of (at most) 'sample' random rows"""
+
+        if nrows <= self.sample:
+            return numpy.arange(nrows)
+
+        return numpy.sort(rstate.choice(nrows, self.sample, replace=False))
+
+    def run(self, name, **kwargs):
+        """Benchmark the LSI training with the given settings"""
+
+        self.logger.info(
+            "Benchmark the '{}' LSI setting {}".format(name, kwargs))
+
+        stats = benchmark.run_isolated(
+            _train_lsi, (self, kwargs), _evaluate_lsi)
+        stats['settings'] = kwargs
+
+        self.logger.info(
+            "'{}': {:.1f} seconds, {:.0f} MB peak memory, "
+            "{:.4f} reconstruction error, {:.2%} accuracy"
+            .format(
+                name, stats['time'], stats['peak_memory_mb'],
+                stats['reconstruction_error'], stats['accuracy']))
+
+        self.stats[name] = stats
+        return stats
+
+    def save(self, output):
+        """Save the statistics of all benchmarked settings to json file"""
+
+        save_stats(output, self.stats)
+        self.logger.info("Benchmark statistics saved under '{}'".format(output))
@@ -0,0 +1,159 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import queue
+import multiprocessing
+
+import gensim.utils
+import gensim.models
+
+from xi.ml.common import Component
+from xi.ml.error import CaughtException
+
+
+def _lsi_worker(jobs, results, lsi_kwargs):
+    """
+    Worker process: decompose each received chunk of documents
+    and merge it into the worker's own projection
+    (same role as the gensim's Pyro4 lsi_worker)
+    """
+
+    try:
+        model = gensim.models.LsiModel(**lsi_kwargs)
+
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+
+            model.add_documents(job)
+
+        results.put(model.projection)
+    except Exception as e:
+        results.put(CaughtException(
+            "Exception encountered in LSI worker {}: {}"
+            .format(os.getpid(), e)))
+
+
+class ParallelLsi(Component):
+    """
+    Class training a LSI model on local worker processes:
+    each worker computes the decomposition of its own corpus chunks,
+    the workers' projections are then merged into the final model
+    (the gensim's distributed LSI scheme, without the Pyro4 name server)
+    """
+
+    def __init__(self, workers=0, **kwargs):
+        """
+        Initialize with the number of worker processes (0 => all local cores)
+        and the LsiModel's initialization arguments
+        """
+
+        super().__init__()
+
+        self.workers = workers if workers > 0 else os.cpu_count()
+
+        self.kwargs = dict(kwargs)
+        self.kwargs.pop('corpus', None)
+
+        # each worker updates its decomposition one chunk at a time
+        self.kwargs['distributed'] = False
+        self.kwargs['onepass'] = True
+        self.chunksize = self.kwargs.get('chunksize', 20000)
+
+        self.processes = []
+
+    def train(self, corpus):
+        """Train and return the LsiModel on the given gensim corpus"""
+
+        self.logger.info(
+            "Train the LSI model on {} local worker processes"
+            .format(self.workers))
+
+        jobs = multiprocessing.Queue(maxsize=2 * self.workers)
+        results = multiprocessing.Queue()
+
+        self.processes = [
+            multiprocessing.Process(
+                target=_lsi_worker, args=(jobs, results, self.kwargs))
+            for _ in range(self.workers)]
+
+        for process in self.processes:
+            process.daemon = True
+            process.start()
+
+        try:
+            ndocs = 0
+            for job_no, job in enumerate(
+                    gensim.utils.grouper(corpus, self.chunksize)):
+
+                self._put(jobs, list(job))
+                ndocs += len(job)
+
+                self.logger.info(
+                    "Dispatched job #{} ({} documents so far)"
+                    .format(job_no, ndocs))
+
+            # one stop signal for each worker
+            for _ in self.processes:
+                self._put(jobs, None)
+
+            projections = [self._get(results) for _ in self.processes]
+        except Exception as e:
+            for process in self.processes:
+                process.terminate()
+            raise CaughtException(
+                "Exception encountered when training the LSI model on {} "
+                "workers: {}".format(len(self.processes), e))
+        finally:
+            for process in self.processes:
+                process.join()
+
+        # merge the projections of all workers
+        self.logger.info(
+            "Merge the projections of {} workers".format(len(projections)))
+
+        projection = projections[0]
+        for other in projections[1:]:
+            projection.merge(other, decay=1.0)
+
+        model = gensim.models.LsiModel(**self.kwargs)
+        model.projection = projection
+        model.docs_processed = ndocs
+
+        return model
+
+    def _put(self, jobs, job):
+        """Send a job to the workers; fail if a worker died"""
+
+        while True:
+            try:
+                jobs.put(job, timeout=1)
+                return
+            except queue.Full:
+                self._check_workers()
+
+    def _get(self, results):
+        """Recover a worker's projection; fail if a worker died"""
+
+        while True:
+            try:
+                result = results.get(timeout=1)
+            except queue.Empty:
+                self._check_workers()
+                continue
+
+            if isinstance(result, Exception):
+                raise result
+
+            return result
+
+    def _check_workers(self):
+        """Check that no worker process died unexpectedly"""
+
+        for process in self.processes:
+            if not process.is_alive() and process.exitcode != 0:
+                raise CaughtException(
+                    "LSI worker {} died with exit code {}"
+                    .format(process.pid, process.exitcode))
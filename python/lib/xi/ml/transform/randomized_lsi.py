@@ -0,0 +1,279 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+import numpy
+import gensim.models
+
+from xi.ml.common import Component
+from xi.ml.corpus import sparse_matrix, dictionary
+
+
+class RandomizedLsi(Component):
+    """
+    Class training a LSI model with a multi-pass randomized SVD
+    over the memory-mapped TF-IDF matrix (documents x words):
+    - one pass to sample the range of the word-document matrix
+      ('extra_samples' oversampling columns)
+    - one pass for each power iteration ('power_iters')
+    - one last pass to decompose the sampled range
+    """
+
+    def __init__(
+            self, num_topics=300, id2word=None, extra_samples=100,
+            power_iters=2, chunksize=20000, matrix=None, seed=0, **kwargs):
+
+        """
+        Initialize the decomposition settings;
+        'matrix' is the folder of the memory-mapped TF-IDF matrix
+        (built from the training corpus when missing)
+        """
+
+        super().__init__()
+
+        self.num_topics = int(num_topics)
+        self.id2word = id2word
+        self.extra_samples = int(extra_samples)
+        self.power_iters = int(power_iters)
+        self.chunksize = int(chunksize)
+        self.matrix = matrix
+        self.seed = seed
+
+        # remaining LsiModel arguments
+        self.kwargs = dict(kwargs)
+        for key in ['corpus', 'distributed', 'onepass']:
+            self.kwargs.pop(key, None)
+
+    def train(self, corpus):
+        """Train and return the LsiModel on the given gensim corpus"""
+
+        num_terms = 1 + max(self.id2word.keys()) if self.id2word else 0
+
+        tmp_folder = None
+        matrix = self.matrix
+
+        if matrix is None:
+            tmp_folder = tempfile.mkdtemp(prefix='xi-ml-tfidf-')
+            matrix = tmp_folder
+
+        try:
+            fingerprint = self.fingerprint(corpus, num_terms)
+
+            if not self.reusable(matrix, fingerprint):
+                self.timer.start_timer()
+                sparse_matrix.save(
+                    matrix, corpus, num_terms, fingerprint=fingerprint)
+                self.timer.stop_timer(
+                    "TF-IDF matrix memory-mapped under '{}'".format(matrix))
+
+            docs = sparse_matrix.load(matrix)
+            vectors, values = self.decompose(docs)
+        finally:
+            if tmp_folder is not None:
+                shutil.rmtree(tmp_folder, ignore_errors=True)
+
+        model = gensim.models.LsiModel(
+            num_topics=self.num_topics, id2word=self.id2word,
+            chunksize=self.chunksize, extra_samples=self.extra_samples,
+            power_iters=self.power_iters, **self.kwargs)
+
+        model.projection.u = vectors
+        model.projection.s = values
+        model.docs_processed = docs.shape[0]
+
+        return model
+
+    def fingerprint(self, corpus, num_terms):
+        """
+        Return the fingerprint of the TF-IDF matrix built from the corpus:
+        its number of documents (when known without a pass over the
+        corpus), its vocabulary size, the digest of the dictionary
+        (words, ids and document frequencies) and the digest of
+        the TF-IDF model's weights (None when unknown)
+        """
+
+        dict_digest = None
+        if self.id2word:
+            dict_digest = self._dictionary_digest()
+
+        # gensim transformed corpus: tfidf_model[corpus]
+        tfidf_model = getattr(corpus, 'obj', None)
+        tfidf_digest = None
+        idfs = getattr(tfidf_model, 'idfs', None)
+        if idfs:
+            digest = hashlib.sha1(json.dumps([
+                getattr(tfidf_model, 'num_docs', None),
+                getattr(tfidf_model, 'num_nnz', None)]).encode('utf-8'))
+            _update_digest(digest, idfs, numpy.float64)
+            tfidf_digest = digest.hexdigest()
+
+        return {
+            'ndocs': self._count_documents(getattr(corpus, 'corpus', corpus)),
+            'num_terms': int(num_terms),
+            'dictionary': dict_digest,
+            'tfidf': tfidf_digest
+        }
+
+    def _dictionary_digest(self):
+        """
+        Return the digest of the dictionary's content:
+        hashing range for the hashing dictionary (its word tracking
+        depends on the hashed documents), words, word ids, document
+        frequencies and corpus statistics otherwise
+        """
+
+        if dictionary.is_hashing(self.id2word):
+            content = ['hashing', self.id2word.id_range]
+            return hashlib.sha1(
+                json.dumps(content).encode('utf-8')).hexdigest()
+
+        token2id = getattr(self.id2word, 'token2id', None)
+        if token2id is None:
+            token2id = {
+                str(token): word_id for word_id, token in self.id2word.items()}
+
+        digest = hashlib.sha1(json.dumps([
+            getattr(self.id2word, 'num_docs', None),
+            getattr(self.id2word, 'num_nnz', None)]).encode('utf-8'))
+        digest.update(json.dumps(
+            sorted(token2id.items()), ensure_ascii=False).encode('utf-8'))
+        _update_digest(digest, getattr(self.id2word, 'dfs', {}), numpy.int64)
+
+        return digest.hexdigest()
+
+    def _count_documents(self, corpus):
+        """
+        Return the number of documents of the corpus known without
+        reading it: size of its Matrix Market file or its length
+        (None when unknown)
+        """
+
+        if isinstance(getattr(corpus, 'num_docs', None), int):
+            return corpus.num_docs
+
+        if isinstance(corpus, (list, tuple)):
+            return len(corpus)
+
+        return None
+
+    def reusable(self, matrix, fingerprint, input_files=None):
+        """
+        Check that the TF-IDF matrix stored in the folder (if any)
+        was built from the same documents, dictionary and TF-IDF model
+        (values unknown on either side are not compared, but a matrix
+        stored without fingerprint or a corpus without any known digest
+        is never reused) and after the last change of the given input files
+        """
+
+        header_file = os.path.join(matrix, 'header.json')
+        if not os.path.exists(header_file):
+            return False
+
+        header = sparse_matrix.load_header(matrix)
+        if not header.get('fingerprint'):
+            self.logger.warning(
+                "Rebuild the TF-IDF matrix under '{}': stored without "
+                "fingerprint".format(matrix))
+            return False
+
+        if fingerprint.get('dictionary') is None \
+                and fingerprint.get('tfidf') is None:
+            self.logger.warning(
+                "Rebuild the TF-IDF matrix under '{}': unknown dictionary "
+                "and TF-IDF model".format(matrix))
+            return False
+
+        for filename in input_files or []:
+            if os.path.getmtime(filename) > os.path.getmtime(header_file):
+                self.logger.warning(
+                    "Rebuild the TF-IDF matrix under '{}': '{}' changed "
+                    "since it was stored".format(matrix, filename))
+                return False
+
+        stored = dict(header['fingerprint'])
+        stored['ndocs'], stored['num_terms'] = header['shape']
+
+        for key in ['ndocs', 'num_terms', 'dictionary', 'tfidf']:
+            if fingerprint.get(key) is None or stored.get(key) is None:
+                continue
+
+            if stored[key] != fingerprint[key]:
+                self.logger.warning(
+                    "Rebuild the TF-IDF matrix under '{}': different {} "
+                    "({} stored, {} expected)"
+                    .format(matrix, key, stored[key], fingerprint[key]))
+                return False
+
+        self.logger.info("Reuse the TF-IDF matrix under '{}'".format(matrix))
+
+        return True
+
+    def decompose(self, docs):
+        """
+        Return the 'num_topics' left singular vectors (words x topics)
+        and singular values of the word-document matrix 'docs.T'
+        """
+
+        ndocs, num_terms = docs.shape
+        samples = min(self.num_topics + self.extra_samples, num_terms)
+        rstate = numpy.random.RandomState(self.seed)
+
+        self.logger.info(
+            "Randomized SVD of a {}x{} matrix: {} samples, {} power iterations"
+            .format(num_terms, ndocs, samples, self.power_iters))
+
+        # sample the range: Y = A * O, with a new gaussian block O per chunk
+        sampled = numpy.zeros((num_terms, samples))
+        for chunk in self._chunks(docs):
+            gaussian = rstate.normal(0.0, 1.0, (chunk.shape[0], samples))
+            sampled += chunk.T.dot(gaussian)
+
+        basis = numpy.linalg.qr(sampled)[0]
+
+        # power iterations: Q = orth(A * A.T * Q)
+        for power_iter in range(self.power_iters):
+            sampled[:] = 0.0
+            for chunk in self._chunks(docs):
+                sampled += chunk.T.dot(chunk.dot(basis))
+
+            basis = numpy.linalg.qr(sampled)[0]
+            self.logger.info("Power iteration #{} done".format(power_iter))
+
+        del sampled
+
+        # decompose the small matrix B * B.T, with B = Q.T * A
+        bbt = numpy.zeros((samples, samples))
+        for chunk in self._chunks(docs):
+            projected = chunk.dot(basis)
+            bbt += projected.T.dot(projected)
+
+        eigvals, eigvecs = numpy.linalg.eigh(bbt)
+
+        # keep the largest singular values, in decreasing order
+        order = numpy.argsort(eigvals)[::-1][:self.num_topics]
+        keep = order[eigvals[order] > 1e-10 * max(eigvals.max(), 1e-300)]
+
+        values = numpy.sqrt(eigvals[keep])
+        vectors = basis.dot(eigvecs[:, keep])
+
+        return vectors, values
+
+    def _chunks(self, docs):
+        """Yield consecutive row blocks of the CSR matrix"""
+
+        for start in range(0, docs.shape[0], self.chunksize):
+            yield docs[start:start + self.chunksize].astype(numpy.float64)
+
+
+def _update_digest(digest, weights, dtype):
+    """Add the ids and weights of the {word_id: weight} dict to the digest"""
+
+    ids = numpy.array(sorted(weights), dtype=numpy.int64)
+    digest.update(ids.tobytes())
+    digest.update(numpy.array(
+        [weights[word_id] for word_id in ids.tolist()], dtype=dtype).tobytes())
@@ -0,0 +1,99 @@
+# -*-coding:utf-8 -*
+
+
+import numpy
+import scipy.sparse
+
+from gensim import interfaces, matutils, utils
+
+
+class SparseRpModel(interfaces.TransformationABC):
+    """
+    Very sparse random projection model (Achlioptas, Li et al.):
+    words x topics matrix of signs {-1, 0, +1}, stored in CSR format,
+    with 'density' non-zero entries (1 / sqrt(num_terms) by default);
+    a document's topics are scale * doc.dot(signs)
+    """
+
+    def __init__(
+            self, corpus=None, id2word=None, num_topics=500, density=None,
+            seed=0):
+
+        """
+        Draw the random matrix for the words of the dictionary
+        (or of the corpus when no dictionary given)
+        """
+
+        self.id2word = id2word
+        self.num_topics = int(num_topics)
+        self.seed = seed
+
+        if id2word is not None and len(id2word):
+            self.num_terms = 1 + max(id2word.keys())
+        elif corpus is not None:
+            self.num_terms = 1 + max(
+                [-1] + [wid for doc in corpus for wid, _ in doc])
+        else:
+            self.num_terms = 0
+
+        if density is None:
+            density = 1.0 / numpy.sqrt(max(self.num_terms, 1))
+        self.density = float(density)
+
+        # unit expected norm of each projected coordinate
+        self.scale = 1.0 / numpy.sqrt(self.density * self.num_topics)
+
+        self.signs = self.draw_signs()
+
+    def draw_signs(self):
+        """Return the random CSR matrix of signs (num_terms x num_topics)"""
+
+        rstate = numpy.random.RandomState(self.seed)
+        size = self.num_terms * self.num_topics
+
+        # non-zero positions drawn over the flat matrix (duplicates merged)
+        nnz = rstate.binomial(size, self.density) if size else 0
+        positions = numpy.unique(rstate.randint(0, max(size, 1), nnz))
+
+        rows = positions // self.num_topics
+        indptr = numpy.concatenate(
+            ([0], numpy.cumsum(numpy.bincount(rows, minlength=self.num_terms))))
+
+        signs = rstate.randint(0, 2, len(positions)).astype(numpy.int8)
+        signs = 2 * signs - 1
+
+        cols = (positions % self.num_topics).astype(numpy.int32)
+
+        return scipy.sparse.csr_matrix(
+            (signs, cols, indptr), shape=(self.num_terms, self.num_topics))
+
+    def transform_matrix(self, docs):
+        """Return the dense topics of the documents (sparse docs x words)"""
+
+        return docs.dot(self.signs).toarray() * self.scale
+
+    def transform_corpus(self, corpus):
+        """Return the dense topics of the given list of gensim documents"""
+
+        # documents x words matrix (unknown word ids ignored)
+        corpus = [
+            [(wid, weight) for wid, weight in doc if wid < self.num_terms]
+            for doc in corpus]
+
+        docs = matutils.corpus2csc(
+            corpus, num_terms=self.num_terms, num_docs=len(corpus)).T
+
+        return self.transform_matrix(docs.tocsr())
+
+    def __getitem__(self, bow):
+        """Return the topics of the given document (or gensim corpus)"""
+
+        is_corpus, bow = utils.is_corpus(bow)
+        if is_corpus:
+            return self._apply(bow)
+
+        features = self.transform_corpus([bow])
+
+        return [
+            (topic, float(weight))
+            for topic, weight in enumerate(features[0]) if weight != 0.0]
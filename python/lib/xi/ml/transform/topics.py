@@ -1,9 +1,9 @@
 # -*-coding:utf-8 -*
 
 
-import re
 import json
 
+import numpy
 from gensim.models import LsiModel, LdaModel
 
 from xi.ml.tools import utils
@@ -22,8 +22,17 @@ class Topics(Component):
         'LDA': LdaModel
     }
 
-    def __init__(self, model_name, model_file):
-        """Load the transformation model"""
+    # selection of the top words of each topic
+    # - absolute: highest absolute weights
+    # - positive: highest positive weights
+    # - negative: lowest negative weights
+    MODES = ['absolute', 'positive', 'negative']
+
+    def __init__(self, model_name, model_file, chunksize=20, mmap='r'):
+        """
+        Load the transformation model (arrays memory-mapped by default);
+        'chunksize' topics are searched at once
+        """
 
         super().__init__()
 
@@ -34,23 +43,115 @@ class Topics(Component):
                 "Unknown model name '{}'. Choose from {}"
                 .format(model_name, Topics.known_models))
 
-        self.model = Topics.known_models[model_name].load(model_file)
+        self.model = Topics.known_models[model_name].load(
+            model_file, mmap=mmap)
 
         if self.model is None:
             raise ConfigError(
                 "Did not load {} model".format(model_name))
 
+        self.name = model_name
+        self.chunksize = chunksize
+
+        # top words of each topic, per mode, for the last searched 'n'
+        self.topn = None
+        self.top = None
+
+    def topic_terms(self):
+        """
+        Return the topics x words weight matrix
+        (LSI: word-topic projection; LDA: normalized topic-word distribution)
+        """
+
+        if self.name == 'LSI':
+            ntopics = min(self.model.num_topics, len(self.model.projection.s))
+            return self.model.projection.u[:, :ntopics].T
+
+        return self.model.get_topics()
+
+    def top_words(self, n=50):
+        """
+        Return the top 'n' (word, weight) pairs of each topic, for each mode;
+        all modes are searched in a single pass over the topics
+        """
+
+        if self.topn == n:
+            return self.top
+
+        terms = self.topic_terms()
+        ntopics, nwords = terms.shape
+        n = min(n, nwords)
+
+        self.logger.info(
+            "Search the top {} words of {} topics ({} words)"
+            .format(n, ntopics, nwords))
+        self.timer.start_timer()
+
+        top = {mode: [] for mode in self.MODES}
+
+        for start in range(0, ntopics, self.chunksize):
+            chunk = numpy.asarray(
+                terms[start:start + self.chunksize], dtype=numpy.float64)
+
+            # LSI topics are displayed with unit norm (as gensim does)
+            if self.name == 'LSI':
+                norms = numpy.sqrt(numpy.sum(chunk * chunk, axis=1))
+                chunk = chunk / numpy.maximum(norms, 1e-300)[:, None]
+
+            top['absolute'].extend(
+                self._chunk_top(chunk, -numpy.abs(chunk), n))
+            top['positive'].extend(self._chunk_top(chunk, -chunk, n, 1))
+            top['negative'].extend(self._chunk_top(chunk, chunk, n, -1))
+
+        self.timer.stop_timer('Top words found')
+
+        self.topn = n
+        self.top = top
+
+        return top
+
+    def _chunk_top(self, chunk, keys, n, sign=0):
+        """
+        Return the (word, weight) pairs with the 'n' smallest keys
+        of each row of the chunk, sorted by key; keep only the weights
+        of the given sign (all weights when 'sign' is 0)
+        """
+
+        rows = numpy.arange(chunk.shape[0])[:, None]
+
+        cols = numpy.argpartition(keys, n - 1, axis=1)[:, :n]
+        cols = cols[rows, numpy.argsort(keys[rows, cols], axis=1)]
+        weights = chunk[rows, cols]
+
+        topics = []
+        for wids, wweights in zip(cols, weights):
+            if sign:
+                keep = numpy.sign(wweights) == sign
+                wids, wweights = wids[keep], wweights[keep]
+
+            topics.append([
+                (self.word(wid), float(weight))
+                for wid, weight in zip(wids, wweights)])
+
+        return topics
+
+    def word(self, wid):
+        """Return the word of the given id ('#id' for hashed word ids)"""
+
+        word = self.model.id2word[int(wid)]
+        if not isinstance(word, str):
+            word = "#{}".format(wid)
+
+        return word
+
     def save(self, output, n=50):
         """Save the top 'n' words for each topic"""
 
         self.logger.info("Display the top {} words for each topic".format(n))
 
-        topics = self.model.show_topics(-1, n, log=False)
-        wtopics = []
-        for _, topic in topics:
-            words = re.findall(r'"(.*?)"', topic)
-            if words:
-                wtopics.append(words)
+        wtopics = [
+            [word for word, _ in topic]
+            for topic in self.top_words(n)['absolute'] if topic]
 
         utils.create_path(output)
         with open(output, 'w') as ostream:
@@ -66,26 +167,43 @@ class Topics(Component):
         self.logger.info(
             "Display the top {} positive words for each topic".format(n))
 
-        topics = self.model.show_topics(-1, 10000, log=False, formatted=False)
+        wtopics = [
+            [word for word, _ in topic]
+            for topic in self.top_words(n)['positive']]
 
-        wtopics = []
-        for _, topic in topics:
-            words = []
-            for word, weight in topic:
-                word = str(word)
-                weight = float(weight)
+        utils.create_path(output)
+        with open(output, 'w') as ostream:
+            json.dump(wtopics, ostream, ensure_ascii=False, indent=2)
 
-                if weight > 0 and len(words) < n:
-                    words.append(word)
+        self.logger.info(
+            "{} topics saved in '{}' json file'"
+            .format(len(wtopics), output))
 
-                if len(words) >= n:
-                    break
+    def save_compact(self, output, n=50):
+        """
+        Save the top 'n' words and weights of each topic, for each mode,
+        as one json line per topic
+        """
 
-            wtopics.append(words)
+        self.logger.info(
+            "Display the top {} words and weights for each topic".format(n))
 
+        top = self.top_words(n)
+
+        utils.create_path(output)
         with open(output, 'w') as ostream:
-            json.dump(wtopics, ostream, ensure_ascii=False, indent=2)
+            for topic_id in range(len(top['absolute'])):
+                topic = {'topic': topic_id}
+                for mode in self.MODES:
+                    topic[mode] = [
+                        [word, round(weight, 6)]
+                        for word, weight in top[mode][topic_id]]
+
+                json.dump(
+                    topic, ostream, ensure_ascii=False, sort_keys=True,
+                    separators=(',', ':'))
+                ostream.write('\n')
 
         self.logger.info(
             "{} topics saved in '{}' json file'"
-            .format(len(wtopics), output))
+            .format(len(top['absolute']), output))
@@ -2,13 +2,22 @@
 
 
 import json
+import numpy
 import gensim.models
 
 from xi.ml.common import Component
-from xi.ml.tools import utils
+from xi.ml.tools import utils, shapes
 from xi.ml.error import ConfigError
+from xi.ml.corpus import dictionary
+from xi.ml.transform.parallel_lsi import ParallelLsi
+from xi.ml.transform.randomized_lsi import RandomizedLsi
+from xi.ml.transform.sparse_rp import SparseRpModel
 
 
+# arrays of the saved models larger than SEP_LIMIT bytes are stored
+# in their own .npy files, which can be memory-mapped when loading
+SEP_LIMIT = 1024 * 1024
+
 class TrainTransformer(Component):
     """Class training and saving tfidf/lsi/lda/rp transformation models"""
 
@@ -19,18 +28,25 @@ class TrainTransformer(Component):
         },
         'LSI':  {
             'model':gensim.models.LsiModel,
-            'kwargs': {'num_topics':300, 'id2word':None, 'distributed':False}
+            'kwargs': {'num_topics':300, 'id2word':None, 'distributed':False},
+            'options': {'engine':'gensim', 'workers':0, 'matrix':None}
         },
         'LDA': {
             'model':gensim.models.LdaModel,
             'kwargs': {'num_topics':100, 'id2word':None, 'distributed':False}
         },
         'RP': {
-            'model':gensim.models.RpModel,
+            'model':SparseRpModel,
             'kwargs': {'num_topics':500, 'id2word':None}
         }
     }
 
+    # LSI training engines:
+    # - gensim: gensim's serial (or Pyro4 distributed) training
+    # - multiprocess: gensim's distributed scheme on local worker processes
+    # - randomized: multi-pass randomized SVD over a memory-mapped matrix
+    ENGINES = ['gensim', 'multiprocess', 'randomized']
+
     def __init__(self, model_name, **kwargs):
         """Initialize the transformation model"""
 
@@ -42,12 +58,25 @@ class TrainTransformer(Component):
                 .format(model_name, self.TRANSFORMERS.keys()))
 
         self.model = None
+        self.dictionary = None
         self.name = model_name.upper()
 
         # define the model's training configuration
         # update default arguments when new provided
+        # (training options are kept apart from the model's arguments)
+        self.options = dict(self.TRANSFORMERS[self.name].get('options', {}))
         self.kwargs = dict(self.TRANSFORMERS[self.name]['kwargs'])
-        self.kwargs.update(kwargs)
+
+        for key, value in kwargs.items():
+            if key in self.options:
+                self.options[key] = value
+            else:
+                self.kwargs[key] = value
+
+        if self.options.get('engine', 'gensim') not in self.ENGINES:
+            raise ConfigError(
+                "Unknown training engine '{}'. Choose from {}"
+                .format(self.options['engine'], self.ENGINES))
 
         self.ntopics = self.kwargs.get('num_topics', 0)
 
@@ -65,18 +94,74 @@ class TrainTransformer(Component):
             .format(self.name, self.ntopics))
 
         # update train argument values for current training configuration
+        self.dictionary = dictionary
         self.kwargs['corpus'] = corpus
         if 'id2word' in self.kwargs:
             self.kwargs['id2word'] = dictionary
 
         # train model
         self.timer.start_timer()
-        self.model = self.TRANSFORMERS[self.name]['model'](**self.kwargs)
+
+        engine = self.options.get('engine', 'gensim')
+        if engine == 'multiprocess':
+            if self.kwargs.get('distributed'):
+                self.logger.warning(
+                    'Ignore the Pyro4 distributed mode: '
+                    'training on local worker processes')
+                self.kwargs['distributed'] = False
+
+            self.model = ParallelLsi(
+                self.options['workers'], **self.kwargs).train(corpus)
+        elif engine == 'randomized':
+            self.model = RandomizedLsi(
+                matrix=self.options['matrix'], **self.kwargs).train(corpus)
+        else:
+            self.model = self.TRANSFORMERS[self.name]['model'](**self.kwargs)
+
         self.timer.stop_timer("Model {} trained".format(self.name))
 
         # check changes in model
         self.check_changes()
 
+    def load(self, model_file):
+        """Load an already trained transformation model from binary file"""
+
+        utils.check_file_readable(model_file)
+
+        # loaded in memory (not memory-mapped): the model can be updated
+        # and saved under new files
+        self.model = self.TRANSFORMERS[self.name]['model'].load(model_file)
+        self.ntopics = getattr(self.model, 'num_topics', self.ntopics)
+        self.check_changes()
+
+        self.logger.info(
+            "Loaded the {} transformation model from '{}'"
+            .format(self.name, model_file))
+
+    def update(self, corpus, decay=1.0):
+        """
+        Update the trained LSI model with the documents of the given gensim
+        corpus; 'decay' < 1.0 gradually forgets the previous documents
+        """
+
+        self.check_model()
+
+        if self.name != 'LSI':
+            raise ConfigError(
+                "Can not update a {} model; only LSI models can be updated"
+                .format(self.name))
+
+        ndocs = self.model.docs_processed
+
+        self.timer.start_timer()
+        self.model.add_documents(corpus, decay=decay)
+        self.timer.stop_timer(
+            "Model {} updated with {} new documents (decay={})"
+            .format(self.name, self.model.docs_processed - ndocs, decay))
+
+        # check changes in model
+        self.check_changes()
+
     def check_changes(self):
         """
         Check if the number of topics changed
@@ -102,7 +187,32 @@ class TrainTransformer(Component):
 
         self.check_model()
         utils.create_path(output)
-        self.model.save(output)
+        self.model.save(output, sep_limit=SEP_LIMIT)
+
+    def shape_matrix(self):
+        """
+        Return the word-indexed matrix of the transformation model
+        (idf weight of each word id, or LSI topic weights of each word id)
+        """
+
+        self.check_model()
+
+        if self.name == 'TFIDF':
+            idfs = self.model.idfs
+            num_terms = max(len(idfs), 1 + max(idfs.keys(), default=-1))
+
+            # one weight per dictionary word id (or per hashed word id)
+            if self.dictionary is not None:
+                num_terms = max(num_terms, len(self.dictionary))
+
+            matrix = numpy.zeros((num_terms, 1))
+            matrix[list(idfs.keys()), 0] = list(idfs.values())
+            return matrix
+
+        if self.name == 'LSI':
+            return self.model.projection.u
+
+        return None
 
     def save_shape(self, output):
         """
@@ -110,43 +220,86 @@ class TrainTransformer(Component):
         (for further use in ruby code)
         """
 
-        self.check_model()
-        utils.create_path(output)
+        if self.name == 'RP':
+            self.save_rp_shape(output)
+            return
+
+        matrix = self.shape_matrix()
+        if matrix is None:
+            self.logger.warning('Unknown demand. Probably still WIP')
+            return
 
-        desc = ''
-        saved = False
+        utils.create_path(output)
 
         if self.name == 'TFIDF':
             desc = 'list with word_idf weight for each word id'
 
-            model_array = [0.0] * len(self.model.idfs)
-            for wid, weight in self.model.idfs.items():
-                model_array[int(wid)] = float(weight)
-
             with open(output, 'w') as ostream:
-                json.dump(model_array, ostream, indent=2)
-
-            saved = True
-        elif self.name == 'LSI':
+                json.dump(matrix[:, 0].tolist(), ostream, indent=2)
+        else:
             desc = "{}D array for each word id".format(self.ntopics)
+            shapes.save_json_lines(output, matrix)
 
-            model_array = [[0.0] * self.ntopics] * self.model.num_terms
-            for wid in range(self.model.num_terms):
-                model_array[int(wid)] = \
-                    [float(x) for x in self.model.projection.u[int(wid)]]
+        self.logger.info(
+            "Saved {}'s model shape ({}) under '{}'"
+            .format(self.name, desc, output))
 
-            with open(output, 'w') as ostream:
-                for weights in model_array:
-                    json.dump(weights, ostream)
-                    ostream.write('\n')
-            saved = True
-        else:
+    def save_rp_shape(self, output):
+        """
+        Save the sparse random matrix of the RP model to json file:
+        CSR arrays of the words x topics signs and their scale
+        """
+
+        self.check_model()
+
+        signs = self.model.signs
+        shape = {
+            'num_terms': int(self.model.num_terms),
+            'num_topics': int(self.model.num_topics),
+            'scale': float(self.model.scale),
+            'indptr': signs.indptr.tolist(),
+            'indices': signs.indices.tolist(),
+            'signs': signs.data.tolist()
+        }
+
+        utils.create_path(output)
+        with open(output, 'w') as ostream:
+            json.dump(shape, ostream, sort_keys=True)
+
+        self.logger.info(
+            "Saved {}'s model shape ({} non-zero signs of a {}x{} matrix) "
+            "under '{}'".format(
+                self.name, signs.nnz, shape['num_terms'], shape['num_topics'],
+                output))
+
+    def save_binary_shape(self, output):
+        """
+        Save the shape of the transformation model to binary file
+        (float32 matrix in the ruby ModelBinarizer format)
+        and its description to json header file
+        """
+
+        matrix = self.shape_matrix()
+        if matrix is None:
             self.logger.warning('Unknown demand. Probably still WIP')
+            return
+
+        id2word = self.dictionary
+        if id2word is None:
+            id2word = getattr(self.model, 'id2word', None)
 
-        if saved:
-            self.logger.info(
-                "Saved {}'s model shape ({}) under '{}'"
-                .format(self.name, desc, output))
+        # hashed word ids: the vocabulary is given by the number of ids
+        if dictionary.is_hashing(id2word):
+            vocabulary = "hashing-{}".format(id2word.id_range)
+        else:
+            vocabulary = shapes.vocabulary_checksum(id2word)
+
+        header = shapes.save_binary(
+            output, matrix, model=self.name, vocabulary=vocabulary)
+
+        self.logger.info(
+            "Saved {}'s binary model shape ({}x{} matrix) under '{}'"
+            .format(self.name, header['rows'], header['cols'], output))
 
     def check_model(self):
         """Check if the model was initialized"""
@@ -1,21 +1,35 @@
 # -*-coding:utf-8 -*
 
 
+import os
 import json
+import shutil
+import hashlib
+import multiprocessing
+
+import numpy
 import gensim.models
 
 from xi.ml.common import Component
-from xi.ml.tools import utils
+from xi.ml.tools import utils, shapes
 from xi.ml.error import ConfigError
+from xi.ml.transform.train_transformer import SEP_LIMIT
+
+def align_rows(id2word, words_vector):
+    """
+    Return the row of each dictionary word id in the words vector matrix
+    (-1 for the words unknown to the model)
+    """
 
-def reformat_wv(words_vector):
-    """Change format of words vector"""
+    num_terms = 1 + max(id2word.keys()) if len(id2word) else 0
+    rows = numpy.full(num_terms, -1, dtype=numpy.int64)
 
-    new_wv = {}
-    for index, word in enumerate(words_vector.vocab.keys()):
-        new_wv[word] = [float(x) for x in words_vector.syn0[index]]
+    for word_id, word in id2word.items():
+        vocab = words_vector.vocab.get(word)
+        if vocab is not None:
+            rows[word_id] = vocab.index
 
-    return new_wv
+    return rows
 
 def read_dictionary(dict_file):
     """Read the word - word_id dictionary"""
@@ -33,6 +47,39 @@ def read_dictionary(dict_file):
 
     return word_dictionary
 
+def tokenize_file(input_file, output_file):
+    """
+    Write the tokens of each json document of the input file
+    as one whitespace-separated line (gensim's LineSentence format)
+    """
+
+    ndocs = 0
+    with open(input_file, 'r') as istream, open(output_file, 'w') as ostream:
+        for line in istream:
+            doc = json.loads(line)
+            ostream.write(' '.join(doc['content'].split()))
+            ostream.write('\n')
+            ndocs += 1
+
+    return ndocs
+
+def _tokenize_file(args):
+    """Tokenize one input file in a worker process"""
+
+    return tokenize_file(*args)
+
+def corpus_checksum(input_files):
+    """Return the checksum of the input files' paths, sizes and dates"""
+
+    checksum = hashlib.sha1()
+    for filename in input_files:
+        stat = os.stat(filename)
+        checksum.update("{}\t{}\t{}\n".format(
+            os.path.abspath(filename), stat.st_size, stat.st_mtime)
+            .encode('utf-8'))
+
+    return checksum.hexdigest()
+
 class WordCorpus:
     """Iterate over sentences"""
 
@@ -51,6 +98,62 @@ class WordCorpus:
                     doc = json.loads(line)
                     yield doc['content'].split()
 
+class TokenizedCorpus(Component):
+    """
+    Tokenized documents of the input files stored into one corpus file
+    (one document per line), cached by the checksum of the input files
+    """
+
+    def __init__(self, input_files, cache_folder):
+        """Initialize the corpus filename given the input files"""
+
+        super().__init__()
+
+        self.files = list(input_files)
+
+        for filename in self.files:
+            utils.check_file_readable(filename)
+
+        self.filename = os.path.join(
+            cache_folder, "corpus_{}.txt".format(corpus_checksum(self.files)))
+
+    def prepare(self, workers=None):
+        """
+        Tokenize the input files in parallel into the corpus file
+        (unless already cached); return the corpus filename
+        """
+
+        if os.path.exists(self.filename):
+            self.logger.info(
+                "Reuse the tokenized corpus file '{}'".format(self.filename))
+            return self.filename
+
+        utils.create_path(self.filename)
+        self.timer.start_timer()
+
+        # one temporary part per input file, concatenated in the input order
+        parts = [
+            "{}.part{}".format(self.filename, index)
+            for index in range(len(self.files))]
+
+        with multiprocessing.Pool(workers) as pool:
+            ndocs = pool.map(_tokenize_file, list(zip(self.files, parts)))
+
+        tmp_file = self.filename + '.tmp'
+        with open(tmp_file, 'w') as ostream:
+            for part in parts:
+                with open(part, 'r') as istream:
+                    shutil.copyfileobj(istream, ostream)
+                os.remove(part)
+
+        os.rename(tmp_file, self.filename)
+
+        self.timer.stop_timer(
+            "Tokenized {} documents into the corpus file '{}'"
+            .format(sum(ndocs), self.filename))
+
+        return self.filename
+
 class TrainWord2Vec(Component):
     """Class training and saving the word2vec models"""
 
@@ -82,18 +185,28 @@ class TrainWord2Vec(Component):
         self.logger.info(
             "Initialize the {} transformation model".format(self.name))
 
-    def train(self, input_files):
-        """Train the transformation model on the given text documents"""
+    def train(self, input_files=None, corpus_file=None):
+        """
+        Train the transformation model on the given text documents,
+        or on the given tokenized corpus file (one document per line):
+        the corpus file is read by each worker thread in parallel
+        """
 
         self.logger.info(
             "Train the {} model on a vector size of {}"
             .format(self.name, self.vsize))
 
-        # load data: split documents into tokens (=> iterable object)
-        data = WordCorpus(input_files)
-
         self.timer.start_timer()
-        self.model = gensim.models.Word2Vec(data, **self.kwargs)
+
+        if corpus_file is not None:
+            utils.check_file_readable(corpus_file)
+            self.model = gensim.models.Word2Vec(
+                corpus_file=corpus_file, **self.kwargs)
+        else:
+            # load data: split documents into tokens (=> iterable object)
+            data = WordCorpus(input_files)
+            self.model = gensim.models.Word2Vec(data, **self.kwargs)
+
         self.timer.stop_timer("Model {} trained".format(self.name))
 
     def load(self, bin_file):
@@ -107,7 +220,38 @@ class TrainWord2Vec(Component):
 
         self.check_model()
         utils.create_path(output)
-        self.model.save(output)
+        self.model.save(output, sep_limit=SEP_LIMIT)
+
+    def shape_matrix(self, dict_file=None):
+        """
+        Return the words vector matrix and its vocabulary (word id: word):
+        the model's words, or the dictionary's words when requested
+        (zero vectors for the dictionary words unknown to the model)
+        """
+
+        self.check_model()
+
+        words_vector = self.model.wv
+
+        if dict_file is None:
+            return words_vector.syn0, dict(enumerate(words_vector.index2word))
+
+        wdict = read_dictionary(dict_file)
+
+        # row of each dictionary word id in the model's matrix
+        rows = align_rows(wdict, words_vector)
+        known = rows >= 0
+
+        matrix = numpy.zeros(
+            (len(rows), words_vector.syn0.shape[1]),
+            dtype=words_vector.syn0.dtype)
+        matrix[known] = words_vector.syn0[rows[known]]
+
+        self.logger.info(
+            "Found {} missing word transformations"
+            .format(len(rows) - numpy.count_nonzero(known)))
+
+        return matrix, wdict
 
     def save_shape(self, output, dict_file=None):
         """
@@ -115,11 +259,7 @@ class TrainWord2Vec(Component):
         (for further use in ruby code)
         """
 
-        self.check_model()
-
-        # recover words vector from model
-        # reformat it for a more practical use: dictionary word:word_weights
-        words_vector = reformat_wv(self.model.wv)
+        matrix, vocabulary = self.shape_matrix(dict_file)
 
         self.logger.info(
             "Save {} shape: {}-weigths list for each word"
@@ -128,42 +268,43 @@ class TrainWord2Vec(Component):
         utils.create_path(output)
 
         if dict_file is not None:
-            # remove unknown words when requested
-            words_vector = self.filter_words(words_vector, dict_file)
-            with open(output, 'w') as ostream:
-                for value in words_vector:
-                    json.dump(value, ostream)
-                    ostream.write('\n')
+            # keep only the dictionary words, one line per word id
+            shapes.save_json_lines(output, matrix)
         else:
             # keep all words present in the model
+            chunksize = 10000
             with open(output, 'w') as ostream:
-                for key, value in words_vector.items():
-                    json.dump({key: list(value)}, ostream, ensure_ascii=False)
-                    ostream.write('\n')
+                for start in range(0, matrix.shape[0], chunksize):
+                    rows = numpy.asarray(
+                        matrix[start:start + chunksize],
+                        dtype=numpy.float64).tolist()
+
+                    for index, weights in enumerate(rows, start):
+                        json.dump(
+                            {vocabulary[index]: weights}, ostream,
+                            ensure_ascii=False)
+                        ostream.write('\n')
 
         self.logger.info(
             "Saved {} transformation's model shape under '{}'"
             .format(self.name, output))
 
-    def filter_words(self, words_vector, dict_file):
-        """Keep only words present in the dictionary"""
-
-        wdict = read_dictionary(dict_file)
-
-        emptyw = 0
-        max_id = max(wdict.keys()) + 1
+    def save_binary_shape(self, output, dict_file=None):
+        """
+        Save the shape of the transformation model to binary file
+        (float32 matrix in the ruby ModelBinarizer format)
+        and its description to json header file
+        """
 
-        new_wv = []
-        for word_id in range(max_id):
-            if word_id in wdict and wdict[word_id] in words_vector:
-                new_wv.append(list(words_vector[wdict[word_id]]))
-            else:
-                new_wv.append([0.0] * self.vsize)
-                emptyw += 1
+        matrix, vocabulary = self.shape_matrix(dict_file)
 
-        self.logger.info("Found {} missing word transformations".format(emptyw))
+        header = shapes.save_binary(
+            output, matrix, model=self.name,
+            vocabulary=shapes.vocabulary_checksum(vocabulary))
 
-        return new_wv
+        self.logger.info(
+            "Saved {}'s binary model shape ({}x{} matrix) under '{}'"
+            .format(self.name, header['rows'], header['cols'], output))
 
     def check_model(self):
         """Check if the model was initialized"""
@@ -32,6 +32,7 @@ setup(
         'bin/xi-ml-trainword2vec',
         'bin/xi-ml-colorclassifier',
         'bin/xi-ml-plotdrawer',
+        'bin/xi-ml-benchmarklsi',
     ],
 
     classifiers=[
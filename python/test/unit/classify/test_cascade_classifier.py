@@ -0,0 +1,140 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import unittest
+
+import numpy
+
+from xi.ml.classify import MulticlassClassifier, MultilabelClassifier, \
+    CascadeClassifier
+from xi.ml.classify import model_format
+from xi.ml.classify.cascade_classifier import correct_predictions
+
+from temp_folder import TempFolderTestCase
+
+
+class CascadeClassifierTest(TempFolderTestCase):
+    """Test case for the cascade classifier lib"""
+
+    def setUp(self):
+        """
+        Train a cheap (few documents) and an expensive model
+        on 3 noisy categories
+        """
+
+        super().setUp()
+
+        rstate = numpy.random.RandomState(0)
+        self.categories = ['society', 'sport', 'unk']
+
+        labels = rstate.randint(0, 3, 600)
+        self.features = rstate.randn(600, 10) + labels[:, numpy.newaxis]
+        self.labels = [self.categories[label] for label in labels]
+
+        # multilabel documents: a second category for a third of them
+        self.multilabels = [
+            [label, self.categories[(i + 1) % 3]] if i % 3 == 0 else [label]
+            for i, label in enumerate(self.labels)]
+
+        self.model_files = self.train_models(
+            MulticlassClassifier, self.labels)
+
+    def train_models(self, classifier_class, labels):
+        """
+        Train and save the cheap (few documents) and the expensive models.
+        Return their model files.
+        """
+
+        model_files = []
+        for name, ndocs, kwargs in [
+                ('LogisticRegression', 15, {'C': 0.01}),
+                ('MLPClassifier', 300, {'max_iter': 300, 'random_state': 0})]:
+
+            classifier = classifier_class(name, self.categories, **kwargs)
+            classifier.train(self.features[:ndocs], labels[:ndocs], 'offline')
+
+            model_file = os.path.join(
+                self.folder, "{}_{}.model".format(name, len(model_files)))
+            model_format.save(model_file, classifier.model)
+            model_files.append(model_file)
+
+        return model_files
+
+    def test_tune(self):
+        """Test the tuned threshold against the dev documents"""
+
+        cascade = CascadeClassifier(*self.model_files)
+        dev_features, dev_labels = self.features[300:], self.labels[300:]
+
+        target = cascade.expensive.classify_batch(dev_features)[0]
+        target = numpy.mean([x == y for x, y in zip(target, dev_labels)])
+
+        threshold = cascade.tune(dev_features, dev_labels, target)
+        self.assertTrue(cascade.stats['accuracy'] >= target)
+        self.assertTrue(0 < cascade.stats['escalated'] < 1)
+
+        # the cascade reproduces the dev statistics
+        doc_classes, probas = cascade.classify_batch(dev_features)
+        accuracy = numpy.mean(
+            [x == y for x, y in zip(doc_classes, dev_labels)])
+
+        self.assertAlmostEqual(accuracy, cascade.stats['accuracy'])
+        self.assertAlmostEqual(
+            cascade.nescalated / 300.0, cascade.stats['escalated'])
+        self.assertEqual(
+            cascade.nescalated,
+            numpy.sum(cascade.cheap.classify_batch(dev_features)[1].max(
+                axis=1) < threshold))
+        self.assertTrue(numpy.allclose(probas.sum(axis=1), 1.0))
+
+        # no threshold: the cheap classifier only
+        cascade.threshold = 0.0
+        self.assertEqual(
+            cascade.classify_batch(dev_features)[0],
+            cascade.cheap.classify_batch(dev_features)[0])
+
+    def test_correct_predictions(self):
+        """Test the correctness of single & multiple categories"""
+
+        correct = correct_predictions(
+            ['sport', ['sport', 'unk'], ['unk', 'sport'], ['sport'], 'unk'],
+            ['sport', ['sport'], ['sport', 'unk'], 'sport', ['unk', 'sport']])
+
+        self.assertEqual(correct.tolist(), [True, False, True, True, False])
+
+    def test_tune_multilabel(self):
+        """Test the tuned threshold of multilabel classifiers"""
+
+        model_files = self.train_models(MultilabelClassifier, self.multilabels)
+
+        cascade = CascadeClassifier(*model_files)
+        self.assertTrue(cascade.multilabel)
+
+        dev_features = self.features[300:]
+        dev_labels = self.multilabels[300:]
+
+        target = correct_predictions(
+            cascade.expensive.classify_batch(dev_features)[0],
+            dev_labels).mean()
+
+        cascade.tune(dev_features, dev_labels, target)
+        self.assertTrue(cascade.stats['expensive_accuracy'] > 0)
+        self.assertTrue(
+            cascade.stats['accuracy'] > cascade.stats['cheap_accuracy'])
+
+        # the cascade reproduces the dev statistics
+        doc_classes, _ = cascade.classify_batch(dev_features)
+        self.assertAlmostEqual(
+            correct_predictions(doc_classes, dev_labels).mean(),
+            cascade.stats['accuracy'])
+
+        # margin of the least certain category to the 0.5 decision
+        self.assertLessEqual(cascade.threshold, 0.5)
+        numpy.testing.assert_allclose(
+            cascade.confidence([[0.9, 0.45, 0.0], [0.2, 0.8, 1.0]]),
+            [0.05, 0.3])
+
+
+if __name__ == '__main__':
+    unittest.main()
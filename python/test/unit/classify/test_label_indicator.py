@@ -0,0 +1,104 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import json
+import unittest
+
+import numpy
+
+from xi.ml.classify import EvalMetrics, PredictionStatistics
+from xi.ml.classify.label_indicator import indicator_matrix, LabelIndicator, \
+    load_predictions, load_predictions_probas
+
+from temp_folder import TempFolderTestCase
+
+
+class LabelIndicatorTest(TempFolderTestCase):
+    """Test case for the label indicator lib"""
+
+    def setUp(self):
+        """Write classified documents with several categories"""
+
+        super().setUp()
+        self.categories = ['society', 'sport', 'unk']
+
+        docs = [
+            {'category': 'sport', 'season': 'sport'},
+            {'category': 'sport', 'season': 'unk'},
+            {'category': ['sport', 'society'],
+             'season': ['society', 'sport']},
+            {'category': ['sport', 'society', 'unk'],
+             'season': ['society', 'sport']},
+            {'category': ['society', 'unk'], 'season': ['sport']},
+            {'id': 'unclassified'}
+        ]
+
+        self.data_file = os.path.join(self.folder, 'classified.json')
+        with open(self.data_file, 'w') as ostream:
+            for doc in docs:
+                ostream.write(json.dumps(doc) + '\n')
+
+    def test_indicator_matrix(self):
+        """Test the single & multiple categories indicator matrices"""
+
+        matrix = indicator_matrix(['sport', 'unk', 'sport'], self.categories)
+        self.assertEqual(matrix.dtype, numpy.uint8)
+        self.assertEqual(matrix.tolist(), [[0, 1, 0], [0, 0, 1], [0, 1, 0]])
+
+        matrix = indicator_matrix(
+            [['sport', 'society'], [], ['other', 'unk']], self.categories)
+        self.assertEqual(matrix.tolist(), [[1, 1, 0], [0, 0, 0], [0, 0, 1]])
+
+        # streaming construction, mixing single & multiple categories
+        indicator = LabelIndicator(self.categories)
+        indicator.extend_single(['unk', 'other'])
+        indicator.add(['society', 'unk'])
+
+        matrix = indicator.matrix(dense=False)
+        self.assertEqual(matrix.shape, (3, 3))
+        self.assertEqual(
+            matrix.toarray().tolist(), [[0, 0, 1], [0, 0, 0], [1, 0, 1]])
+
+    def test_load_predictions(self):
+        """Test the predictions read with & without their probabilities"""
+
+        real, predicted = load_predictions([self.data_file], self.categories)
+        self.assertEqual(real.shape, (5, 3))
+        self.assertEqual(
+            predicted.toarray().tolist()[:2], [[0, 1, 0], [0, 0, 1]])
+
+        with open(self.data_file, 'a') as ostream:
+            ostream.write(json.dumps({
+                'category': 'unk', 'season': 'unk',
+                'season_prob': {'society': 0.1, 'sport': 0.2, 'unk': 0.7}
+            }) + '\n')
+
+        # only the documents with probabilities
+        real, predicted, probas = load_predictions_probas(
+            [self.data_file], self.categories)
+        self.assertEqual(real.toarray().tolist(), [[0, 0, 1]])
+        self.assertEqual(predicted.shape, (1, 3))
+        self.assertEqual(probas.tolist(), [[0.1, 0.2, 0.7]])
+
+    def test_confusion_matrix(self):
+        """Test the confusion matrix with several correct categories"""
+
+        cm = EvalMetrics([self.data_file], self.categories).confusion_matrix()
+
+        # rows: real categories, columns: predicted categories
+        self.assertEqual(cm.tolist(), [[2, 1, 0], [0, 3, 1], [0, 1, 0]])
+
+    def test_prediction_statistics(self):
+        """Test the counts of the prediction statistics"""
+
+        statistics = PredictionStatistics([self.data_file], self.categories)
+        statistics.compute_stats()
+
+        self.assertEqual(statistics.stats['global-accuracy'], '55.56%')
+        self.assertEqual(statistics.stats['sport']['recall'], '75.00%')
+        self.assertEqual(statistics.stats['sport']['precision'], '50.00%')
+
+
+if __name__ == '__main__':
+    unittest.main()
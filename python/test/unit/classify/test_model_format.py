@@ -0,0 +1,108 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import unittest
+
+import numpy
+
+from xi.ml.classify import TrainClassifier, LoadClassifier
+
+from temp_folder import TempFolderTestCase
+
+
+class ModelFormatTest(TempFolderTestCase):
+    """Test case for the classifier model format"""
+
+    def setUp(self):
+        """Generate random documents of 3 categories"""
+
+        super().setUp()
+
+        rstate = numpy.random.RandomState(0)
+        self.categories = ['society', 'sport', 'unk']
+
+        self.labels = [self.categories[i] for i in rstate.randint(0, 3, 200)]
+        self.features = rstate.randn(200, 10) + numpy.array(
+            [[self.categories.index(label)] * 10 for label in self.labels])
+
+    def check_model(self, name, ctype, extension, **kwargs):
+        """Compare the predictions of the trained and loaded classifiers"""
+
+        classifier = TrainClassifier(name, ctype, self.categories, **kwargs)
+        classifier.classifier.train(self.features, self.labels, 'offline')
+
+        model_file = os.path.join(
+            self.folder, "{}_{}{}".format(name, ctype, extension))
+        classifier.save(model_file)
+
+        loaded = LoadClassifier(model_file)
+
+        self.assertEqual(list(loaded.categories), self.categories)
+        self.assertTrue(numpy.array_equal(
+            classifier.classifier.model.predict_proba(self.features),
+            loaded.model.predict_proba(self.features)))
+
+        return loaded
+
+    def test_model_folder(self):
+        """Test the models saved as arrays and manifest"""
+
+        loaded = self.check_model('LogisticRegression', 'multiclass', '.model')
+        self.assertTrue(os.path.isdir(
+            os.path.join(self.folder, 'LogisticRegression_multiclass.model')))
+        self.assertIsInstance(loaded.model.coef_, numpy.memmap)
+
+        loaded = self.check_model(
+            'MLPClassifier', 'multilabel', '.model',
+            hidden_layer_sizes=(8,), max_iter=50, random_state=0)
+        self.assertTrue(loaded.multilabel)
+        self.assertIsInstance(loaded.model.coefs_[0], numpy.memmap)
+
+        # training-only state (optimizer, best weights) not saved:
+        # arrays of the 2 layers' coefs_ & intercepts_ and classes_
+        model_folder = os.path.join(
+            self.folder, 'MLPClassifier_multilabel.model')
+        self.assertFalse(
+            os.path.exists(os.path.join(model_folder, 'fallback.pkl')))
+        self.assertFalse(hasattr(loaded.model, '_optimizer'))
+        self.assertEqual(
+            len([name for name in os.listdir(model_folder)
+                 if name.endswith('.npy')]), 4 + 1)
+
+        # tree structure saved in the fallback file
+        self.check_model('DecisionTreeClassifier', 'multiclass', '.model')
+
+    def test_multi_output_model(self):
+        """Test the positive class' probabilities of multi-output models"""
+
+        # 'unk' never among the training categories: class 0 only
+        labels = [[label] if label != 'unk' else ['sport']
+                  for label in self.labels]
+
+        classifier = TrainClassifier(
+            'DecisionTreeClassifier', 'multilabel', self.categories,
+            random_state=0)
+        classifier.classifier.train(self.features, labels, 'offline')
+
+        model_file = os.path.join(self.folder, 'tree_multilabel.model')
+        classifier.save(model_file)
+
+        doc_classes, probas = LoadClassifier(model_file).classify_batch(
+            self.features)
+
+        self.assertTrue(numpy.all(probas[:, 2] == 0.0))
+        self.assertEqual(
+            [doc_class for doc_class in doc_classes if 'unk' in doc_class], [])
+        self.assertEqual(doc_classes, labels)
+
+    def test_legacy_model(self):
+        """Test the models saved as pickle files"""
+
+        self.check_model(
+            'MLPClassifier', 'multiclass', '.bin',
+            hidden_layer_sizes=(8,), max_iter=50, random_state=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
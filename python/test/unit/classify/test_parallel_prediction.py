@@ -0,0 +1,62 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import json
+import unittest
+
+import numpy
+
+from xi.ml.classify import ParallelTraining, ParallelPrediction
+from xi.ml.classify import parallel_prediction
+
+from temp_folder import TempFolderTestCase
+
+
+class ParallelPredictionTest(TempFolderTestCase):
+    """Test case for the documents classified on worker processes"""
+
+    def setUp(self):
+        """Write the features of two categories' documents and train a model"""
+
+        super().setUp()
+        self.categories = ['non-sport', 'sport']
+        self.input_file = os.path.join(self.folder, 'docs.json')
+
+        rstate = numpy.random.RandomState(0)
+        with open(self.input_file, 'w') as ostream:
+            for index in range(40):
+                ostream.write(json.dumps({
+                    'features': (rstate.randn(5) + index % 2).tolist(),
+                    'category': self.categories[index % 2]}) + '\n')
+
+        self.model_file = os.path.join(self.folder, 'model.model')
+
+        training = ParallelTraining(workers=1)
+        training.add(
+            'LogisticRegression', 'multiclass', self.categories, 'offline',
+            [self.input_file], -1, self.model_file)
+        training.run()
+
+    def test_sequential_prediction(self):
+        """Test the documents classified in the current process"""
+
+        output_file = os.path.join(self.folder, 'classified.json')
+
+        prediction = ParallelPrediction(
+            workers=1, batch_size=7, range_size=100)
+        prediction.add(self.model_file, self.input_file, output_file)
+        prediction.run()
+
+        with open(output_file) as istream:
+            docs = [json.loads(line) for line in istream]
+
+        self.assertEqual(len(docs), 40)
+        self.assertTrue(all(doc['season'] in self.categories for doc in docs))
+
+        # the loaded models are released once the run is over
+        self.assertEqual(parallel_prediction._classifiers, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
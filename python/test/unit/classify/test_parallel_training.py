@@ -0,0 +1,81 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import json
+import unittest
+
+import numpy
+
+from xi.ml.classify import ParallelTraining
+
+from temp_folder import TempFolderTestCase
+
+
+class ParallelTrainingTest(TempFolderTestCase):
+    """Test case for the classifiers trained on worker processes"""
+
+    def setUp(self):
+        """Write the features of two categories' documents"""
+
+        super().setUp()
+        self.categories = ['non-sport', 'sport']
+        self.input_files = []
+
+        rstate = numpy.random.RandomState(0)
+        for index, (category, ndocs) in enumerate(
+                zip(self.categories, [30, 20])):
+            input_file = os.path.join(self.folder, category + '.json')
+
+            with open(input_file, 'w') as ostream:
+                for features in rstate.randn(ndocs, 5) + index:
+                    ostream.write(json.dumps({
+                        'features': features.tolist(),
+                        'category': category}) + '\n')
+
+            self.input_files.append(input_file)
+
+    def test_progressive_skipped_chunk(self):
+        """Test that a chunk size without enough documents saves no model"""
+
+        training = ParallelTraining()
+
+        model_files = {}
+        for chunk_size in [20, 60]:
+            model_files[chunk_size] = os.path.join(
+                self.folder, "model_{}.model".format(chunk_size))
+
+            training.add(
+                'LogisticRegression', 'multiclass', self.categories,
+                'offline', self.input_files, chunk_size,
+                model_files[chunk_size], progressive=True)
+
+        stats = training.run()
+
+        self.assertEqual([job['chunk_size'] for job in stats], [20])
+        self.assertFalse(stats[0]['warm_start'])
+
+        self.assertTrue(os.path.exists(model_files[20]))
+        self.assertFalse(os.path.exists(model_files[60]))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.folder, 'model_60.json')))
+
+    def test_sequential_thread_limit(self):
+        """Test the jobs trained in the current process with a thread limit"""
+
+        training = ParallelTraining(workers=1, threads=1)
+        model_file = os.path.join(self.folder, 'model.model')
+
+        training.add(
+            'LogisticRegression', 'multiclass', self.categories, 'offline',
+            self.input_files, 20, model_file)
+
+        stats = training.run()
+
+        self.assertEqual(len(stats), 1)
+        self.assertTrue(stats[0]['peak_memory_cumulative'])
+        self.assertTrue(os.path.exists(model_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,235 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import sys
+import json
+import unittest
+import subprocess
+
+import numpy
+import sklearn.linear_model
+
+import xi.ml
+from xi.ml.classify import MulticlassClassifier, MultilabelClassifier, \
+    ShapeClassifier
+
+from temp_folder import TempFolderTestCase
+
+
+class ShapeClassifierTest(TempFolderTestCase):
+    """Test case for the shape classifier lib"""
+
+    def setUp(self):
+        """Generate random documents of 3 categories"""
+
+        super().setUp()
+
+        rstate = numpy.random.RandomState(0)
+        self.categories = ['society', 'sport', 'unk']
+
+        self.labels = [self.categories[i] for i in rstate.randint(0, 3, 300)]
+        self.features = rstate.randn(300, 10) + numpy.array(
+            [[self.categories.index(label)] * 10 for label in self.labels])
+
+    def shape_classifier(self, classifier):
+        """Return the shape classifier of the trained classifier"""
+
+        shape_file = os.path.join(self.folder, 'shape.json')
+        with open(shape_file, 'w') as ostream:
+            json.dump(classifier.shape(), ostream)
+
+        return ShapeClassifier(shape_file)
+
+    def check_probas(self, classifier, shape_classifier):
+        """Compare the sklearn and shape classifiers' probabilities"""
+
+        probas = classifier.model.predict_proba(self.features)
+        shape_probas = shape_classifier.predict_proba(self.features)
+
+        self.assertEqual(shape_probas.dtype, numpy.float32)
+        self.assertTrue(numpy.allclose(probas, shape_probas, atol=1e-5))
+
+    def test_lr(self):
+        """Test the binary logistic regression shape"""
+
+        labels = ['sport' if label == 'sport' else 'society'
+                  for label in self.labels]
+
+        classifier = MulticlassClassifier(
+            'LogisticRegression', ['society', 'sport'])
+        classifier.train(self.features, labels, 'offline')
+
+        shape_classifier = self.shape_classifier(classifier)
+        self.check_probas(classifier, shape_classifier)
+
+        doc_classes, _ = shape_classifier.classify_batch(self.features)
+        self.assertEqual(
+            doc_classes, list(classifier.model.predict(self.features)))
+
+    def test_lr_multinomial(self):
+        """Test the multinomial logistic regression shape (softmax)"""
+
+        # multinomial scheme requested explicitly (one-vs-rest by default
+        # up to sklearn 0.21; no 'multi_class' parameter since 1.7)
+        kwargs = {'solver': 'lbfgs'}
+        if 'multi_class' in sklearn.linear_model.LogisticRegression()\
+                .get_params():
+            kwargs['multi_class'] = 'multinomial'
+
+        classifier = MulticlassClassifier(
+            'LogisticRegression', self.categories, **kwargs)
+        classifier.train(self.features, self.labels, 'offline')
+
+        shape_classifier = self.shape_classifier(classifier)
+        self.assertEqual(shape_classifier.multi_class, 'multinomial')
+        self.check_probas(classifier, shape_classifier)
+
+        doc_classes, _ = shape_classifier.classify_batch(self.features)
+        self.assertEqual(
+            doc_classes, list(classifier.model.predict(self.features)))
+
+    def test_mlp(self):
+        """Test the multiclass and multilabel MLP shapes"""
+
+        for activation in ['relu', 'tanh', 'logistic', 'identity']:
+            classifier = MulticlassClassifier(
+                'MLPClassifier', self.categories, activation=activation,
+                hidden_layer_sizes=(8, 6), max_iter=50, random_state=0)
+            classifier.train(self.features, self.labels, 'offline')
+
+            self.check_probas(classifier, self.shape_classifier(classifier))
+
+        classifier = MultilabelClassifier(
+            'MLPClassifier', self.categories,
+            hidden_layer_sizes=(8,), max_iter=50, random_state=0)
+        classifier.train(self.features, self.labels)
+
+        shape_classifier = self.shape_classifier(classifier)
+        self.check_probas(classifier, shape_classifier)
+        self.assertTrue(shape_classifier.multilabel)
+
+    def test_mlp_multilabel_warm_start(self):
+        """Test a second multilabel MLP training from the first weights"""
+
+        classifier = MultilabelClassifier(
+            'MLPClassifier', self.categories,
+            hidden_layer_sizes=(8,), max_iter=20, random_state=0)
+        classifier.train(self.features[:150], self.labels[:150])
+        self.assertEqual(classifier.model.classes_, self.categories)
+
+        weights = classifier.model.coefs_[0].copy()
+        classifier.model.set_params(warm_start=True)
+        classifier.train(self.features, self.labels)
+
+        self.assertTrue(classifier.trained)
+        self.assertEqual(classifier.model.classes_, self.categories)
+        self.assertFalse(numpy.array_equal(
+            classifier.model.coefs_[0], weights))
+        self.check_probas(classifier, self.shape_classifier(classifier))
+
+    def test_lr_multilabel(self):
+        """Test the one-vs-rest logistic regression shape"""
+
+        labels = [
+            [label, 'unk'] if i % 3 == 0 else [label]
+            for i, label in enumerate(self.labels)]
+
+        classifier = MultilabelClassifier(
+            'LogisticRegression', self.categories, n_jobs=1)
+        classifier.train(self.features, labels)
+
+        shape = classifier.shape()
+        self.assertEqual(shape['classifier_type'], 'multilabel')
+        self.assertEqual(len(shape['coeffs']), len(self.categories))
+        self.assertEqual(len(shape['intercept']), len(self.categories))
+
+        # independent probabilities of the binary models
+        shape_classifier = self.shape_classifier(classifier)
+        self.assertTrue(shape_classifier.multilabel)
+        self.check_probas(classifier, shape_classifier)
+
+        doc_classes, _ = shape_classifier.classify_batch(self.features)
+        self.assertTrue(any(len(doc_class) > 1 for doc_class in doc_classes))
+
+    def test_lr_constant_category(self):
+        """Test the multilabel LR shape of a category without documents"""
+
+        # 'unk' never among the training categories: constant predictor
+        labels = [[label] if label != 'unk' else ['sport']
+                  for label in self.labels]
+
+        classifier = MultilabelClassifier(
+            'LogisticRegression', self.categories, n_jobs=1)
+        classifier.train(self.features, labels)
+
+        shape = classifier.shape()
+        self.assertEqual(shape['coeffs'][2], [0.0] * 10)
+        self.assertLess(shape['intercept'][2], 0.0)
+
+        shape_classifier = self.shape_classifier(classifier)
+        self.check_probas(classifier, shape_classifier)
+
+        doc_classes, probas = shape_classifier.classify_batch(self.features)
+        self.assertTrue(numpy.all(probas[:, 2] == 0.0))
+        self.assertEqual(
+            [doc_class for doc_class in doc_classes if 'unk' in doc_class], [])
+
+    def test_lr_all_constant_categories(self):
+        """Test the multilabel LR shape of constant binary models only"""
+
+        # every document in 'society' & 'sport', never in 'unk'
+        labels = [['society', 'sport']] * len(self.labels)
+
+        classifier = MultilabelClassifier(
+            'LogisticRegression', self.categories, n_jobs=1)
+        classifier.train(self.features, labels)
+
+        shape = classifier.shape()
+        self.assertEqual(shape['n_features'], 10)
+        self.assertEqual(shape['coeffs'], [[0.0] * 10] * 3)
+
+        probas = self.shape_classifier(classifier).predict_proba(
+            self.features)
+        self.assertTrue(numpy.all(probas == [1.0, 1.0, 0.0]))
+
+    def test_lr_two_categories(self):
+        """Test the multilabel logistic regression on 2 categories"""
+
+        features = self.features[[
+            i for i, label in enumerate(self.labels) if label != 'unk']]
+        labels = [label for label in self.labels if label != 'unk']
+
+        classifier = MultilabelClassifier(
+            'LogisticRegression', ['society', 'sport'], n_jobs=1)
+        classifier.train(features, labels)
+
+        shape = classifier.shape()
+        self.assertEqual(len(shape['coeffs']), 2)
+
+        self.check_probas(classifier, self.shape_classifier(classifier))
+
+    def test_light_import(self):
+        """Test that the shape engine loads without sklearn and gensim"""
+
+        lib_folder = os.path.dirname(os.path.dirname(
+            os.path.dirname(os.path.abspath(xi.ml.__file__))))
+
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            path for path in [lib_folder, env.get('PYTHONPATH')] if path)
+
+        modules = subprocess.check_output([
+            sys.executable, '-c',
+            'import sys; '
+            'from xi.ml.classify.shape_classifier import ShapeClassifier; '
+            'print(" ".join(sorted(sys.modules)))'], env=env)
+
+        modules = modules.decode('utf-8').split()
+        self.assertIn('xi.ml.classify.shape_classifier', modules)
+        self.assertNotIn('sklearn', modules)
+        self.assertNotIn('gensim', modules)
+
+
+if __name__ == '__main__':
+    unittest.main()
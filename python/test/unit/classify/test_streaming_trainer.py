@@ -0,0 +1,119 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import json
+import threading
+import unittest
+
+import numpy
+
+from xi.ml.corpus import OffsetCorpora
+from xi.ml.classify import MulticlassClassifier, StreamingTrainer
+
+from temp_folder import TempFolderTestCase
+
+
+class RecordingClassifier(object):
+    """Online classifier recording its training batches"""
+
+    name = 'RecordingClassifier'
+
+    def __init__(self, fail_at=None):
+        """Initialize with the batch whose training fails (if any)"""
+
+        self.model = self
+        self.fail_at = fail_at
+        self.batches = []
+
+    def partial_fit(self, features, labels):
+        """Online training method of the model"""
+
+    def train(self, features, labels, train_type):
+        """Record the training batch"""
+
+        if len(self.batches) == self.fail_at:
+            raise ValueError('Training error')
+
+        self.batches.append([tuple(doc) for doc in features.tolist()])
+
+
+class StreamingTrainerTest(TempFolderTestCase):
+    """Test case for the out-of-core online training"""
+
+    def setUp(self):
+        """Write the features of two categories' documents"""
+
+        super().setUp()
+        self.categories = ['non-sport', 'sport']
+
+        rstate = numpy.random.RandomState(0)
+        input_files = []
+
+        for index, category in enumerate(self.categories):
+            input_file = os.path.join(self.folder, category + '.json')
+
+            with open(input_file, 'w') as ostream:
+                for features in rstate.randn(20, 5) + 2 * index:
+                    ostream.write(json.dumps({
+                        'features': features.tolist(),
+                        'category': category}) + '\n')
+
+            input_files.append(input_file)
+
+        self.corpora = OffsetCorpora(input_files)
+
+    def test_epochs(self):
+        """Test the shuffled batches of each epoch"""
+
+        classifier = RecordingClassifier()
+        trainer = StreamingTrainer(classifier, epochs=3, prefetch=2)
+
+        self.assertEqual(trainer.train(self.corpora, 8), 120)
+        self.assertEqual(
+            [len(batch) for batch in classifier.batches], [8] * 15)
+
+        epochs = [sum(classifier.batches[i:i + 5], []) for i in [0, 5, 10]]
+        ref_docs = sum(
+            [[tuple(doc) for doc in features.tolist()]
+             for features, _ in self.corpora.batches(8)], [])
+
+        for docs in epochs:
+            self.assertEqual(sorted(docs), sorted(ref_docs))
+            self.assertNotEqual(docs, ref_docs)
+
+        self.assertNotEqual(epochs[0], epochs[1])
+
+        # not shuffled: the documents' order of the corpora
+        classifier = RecordingClassifier()
+        StreamingTrainer(classifier, shuffle=False).train(self.corpora, 8)
+        self.assertEqual(sum(classifier.batches, []), ref_docs)
+
+    def test_training_error(self):
+        """Test that a training error stops the prefetching thread"""
+
+        threads = threading.active_count()
+
+        classifier = RecordingClassifier(fail_at=1)
+        trainer = StreamingTrainer(classifier, prefetch=1)
+
+        self.assertRaises(ValueError, trainer.train, self.corpora, 2)
+        self.assertEqual(len(classifier.batches), 1)
+        self.assertEqual(threading.active_count(), threads)
+
+    def test_online_classifier(self):
+        """Test the online training of a sklearn classifier"""
+
+        classifier = MulticlassClassifier(
+            'SGDClassifier', self.categories, random_state=0)
+        StreamingTrainer(classifier, epochs=5).train(self.corpora, 10)
+
+        self.assertTrue(classifier.trained)
+
+        features, labels = next(self.corpora.batches(-1))
+        self.assertTrue(
+            numpy.mean(classifier.model.predict(features) == labels) > 0.9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,9 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import sys
+
+
+# shared test helpers (ex: temp_folder) importable from every test folder
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
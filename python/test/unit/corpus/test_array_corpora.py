@@ -0,0 +1,72 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import json
+import unittest
+
+from xi.ml.error import DataError
+from xi.ml.corpus import ArrayCorpora, MergeCorpora, save_corpora
+
+from temp_folder import TempFolderTestCase
+
+
+class ArrayCorporaTest(TempFolderTestCase):
+    """Test case for the memory-mapped training documents"""
+
+    def setUp(self):
+        """Write the features of two categories' documents"""
+
+        super().setUp()
+        self.input_files = []
+
+        for category, ndocs in [('sport', 30), ('non-sport', 20)]:
+            input_file = os.path.join(self.folder, category + '.json')
+
+            with open(input_file, 'w') as ostream:
+                for i in range(ndocs):
+                    ostream.write(json.dumps({
+                        'features': [i, len(category)],
+                        'category': category}) + '\n')
+
+            self.input_files.append(input_file)
+
+        self.data_folder = os.path.join(self.folder, 'data')
+
+    def test_prefix(self):
+        """Test the prefixes against the documents loaded by MergeCorpora"""
+
+        save_corpora(self.input_files, self.data_folder, 15)
+        corpora = ArrayCorpora(self.data_folder)
+
+        self.assertEqual(corpora.ndocs, [30, 20])
+        self.assertEqual(corpora.class_size, 15)
+
+        features, labels = corpora.subset(10)
+        ref_features, ref_labels = \
+            MergeCorpora(self.input_files).load_data(10)
+
+        self.assertEqual(features.tolist(), ref_features)
+        self.assertEqual(labels, ref_labels)
+
+    def test_random(self):
+        """Test that the random subsets are balanced and nested"""
+
+        save_corpora(self.input_files, self.data_folder)
+        corpora = ArrayCorpora(self.data_folder, 'random', seed=1)
+
+        small, small_labels = corpora.subset(5)
+        large, large_labels = corpora.subset(12)
+
+        self.assertEqual(small_labels.count('sport'), 5)
+        self.assertEqual(large_labels.count('non-sport'), 12)
+
+        large_docs = [tuple(doc) for doc in large.tolist()]
+        for doc in small.tolist():
+            self.assertIn(tuple(doc), large_docs)
+
+        self.assertRaises(DataError, corpora.subset, 21)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import json
+import unittest
+
+import numpy
+
+from xi.ml.corpus import OffsetCorpora, MergeCorpora
+
+from temp_folder import TempFolderTestCase
+
+
+class OffsetCorporaTest(TempFolderTestCase):
+    """Test case for the documents read from their byte offsets"""
+
+    def setUp(self):
+        """Write the features of two categories' documents"""
+
+        super().setUp()
+        self.input_files = []
+
+        for category, ndocs in [('sport', 30), ('non-sport', 20)]:
+            input_file = os.path.join(self.folder, category + '.json')
+
+            with open(input_file, 'w') as ostream:
+                for i in range(ndocs):
+                    ostream.write(json.dumps({
+                        'features': [i, len(category)],
+                        'category': category}) + '\n')
+
+            self.input_files.append(input_file)
+
+    def test_batches(self):
+        """Test the batches against the documents loaded by MergeCorpora"""
+
+        corpora = OffsetCorpora(self.input_files, 15)
+        self.assertEqual(corpora.ndocs, [30, 20])
+        self.assertEqual(len(corpora), 30)
+
+        batches = list(corpora.batches(7))
+        self.assertEqual([len(labels) for _, labels in batches], [7] * 4 + [2])
+
+        ref_features, ref_labels = \
+            MergeCorpora(self.input_files).load_data(15)
+
+        self.assertEqual(
+            numpy.vstack([features for features, _ in batches]).tolist(),
+            ref_features)
+        self.assertEqual(
+            sum([labels for _, labels in batches], []), ref_labels)
+
+    def test_shuffled_batches(self):
+        """Test that the shuffled batches hold each document once"""
+
+        corpora = OffsetCorpora(self.input_files)
+
+        epochs = []
+        rstate = numpy.random.RandomState(0)
+        for _ in range(2):
+            features = numpy.vstack([
+                features for features, _ in corpora.batches(8, rstate)])
+            epochs.append([tuple(doc) for doc in features.tolist()])
+
+        ref_features, _ = MergeCorpora(self.input_files).load_data()
+        ref_docs = sorted(tuple(doc) for doc in ref_features)
+
+        for docs in epochs:
+            self.assertEqual(sorted(docs), ref_docs)
+
+        # a new order at each epoch
+        self.assertNotEqual(epochs[0], epochs[1])
+        self.assertNotEqual(epochs[0], [tuple(doc) for doc in ref_features])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# -*-coding:utf-8 -*
+
+
+import os
+import json
+import unittest
+
+import numpy
+
+from xi.ml.index import SimilarityIndex
+
+from temp_folder import TempFolderTestCase
+
+
+class SimilarityIndexTest(TempFolderTestCase):
+    """Test case for the similarity index lib"""
+
+    def setUp(self):
+        """Write the features of random transformed documents"""
+
+        super().setUp()
+        self.input_file = os.path.join(self.folder, 'transformed.json')
+
+        rstate = numpy.random.RandomState(0)
+        self.features = rstate.randn(500, 20)
+        self.ids = ["doc{}".format(i) for i in range(500)]
+
+        with open(self.input_file, 'w') as ostream:
+            for doc_id, features in zip(self.ids, self.features):
+                ostream.write(json.dumps(
+                    {'id': doc_id, 'features': features.tolist()}) + '\n')
+
+    def test_brute_force(self):
+        """Test the blocked search against the full similarity matrix"""
+
+        index = SimilarityIndex(block_size=64)
+        index.build([self.input_file])
+
+        queries = self.features[:5]
+        results = index.query(queries, k=10)
+
+        norms = numpy.linalg.norm(self.features, axis=1)
+        sims = self.features.dot(queries.T).T / norms[:5, None] / norms
+
+        for qsims, result in zip(sims, results):
+            top = numpy.argsort(-qsims)[:10]
+            self.assertEqual([self.ids[i] for i in top], [r[0] for r in result])
+            self.assertTrue(
+                numpy.allclose(qsims[top], [r[1] for r in result], atol=1e-5))
+
+        self.assertEqual(index.neighbors('doc3', 1)[0][0], 'doc3')
+
+    def test_save_load(self):
+        """Test the saved (partitioned) index loaded memory-mapped"""
+
+        index = SimilarityIndex()
+        index.build([self.input_file], nlist=10, nprobe=10)
+        index.save(os.path.join(self.folder, 'index'))
+
+        loaded = SimilarityIndex()
+        loaded.load(os.path.join(self.folder, 'index'))
+
+        self.assertIsInstance(loaded.vectors, numpy.memmap)
+        self.assertEqual(
+            index.query(self.features[:5], k=10),
+            loaded.query(self.features[:5], k=10))
+
+        # all clusters probed: same results as the brute-force search
+        brute = SimilarityIndex()
+        brute.build([self.input_file])
+        self.assertEqual(
+            [[r[0] for r in result]
+             for result in brute.query(self.features[:5], k=10)],
+            [[r[0] for r in result]
+             for result in loaded.query(self.features[:5], k=10)])
+
+
+if __name__ == '__main__':
+    unittest.main()
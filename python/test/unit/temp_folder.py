@@ -0,0 +1,16 @@
+# -*-coding:utf-8 -*
+
+
+import shutil
+import tempfile
+import unittest
+
+
+class TempFolderTestCase(unittest.TestCase):
+    """Test case writing its files under a temporary folder"""
+
+    def setUp(self):
+        """Create the temporary folder (removed after each test)"""
+
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, True)
@@ -2,30 +2,41 @@
 
 
 import os
-import unittest
+import copy
+import json
 
-from xi.ml.tools import utils
-from xi.ml.corpus import dictionary
-from xi.ml.transform import LoadTransformer
+import numpy
 
+from xi.ml.tools import utils, shapes
+from xi.ml.error import DataError
+from xi.ml.corpus import dictionary, sparse_matrix
+from xi.ml.transform import LoadTransformer, TrainTransformer, Topics
+from xi.ml.transform.sparse_rp import SparseRpModel
+from xi.ml.transform.randomized_lsi import RandomizedLsi
 
-class TransformationTest(unittest.TestCase):
+from temp_folder import TempFolderTestCase
+
+
+class TransformationTest(TempFolderTestCase):
     """Test case for the transformer lib"""
 
     def setUp(self):
         """Initialize test models"""
 
+        super().setUp()
+
         cfolder = os.path.dirname(__file__)
 
         dict_file = os.path.join(cfolder, 'example_dictionary.bin')
         tfidf_file = os.path.join(cfolder, 'example_model_tfidf.bin')
         lsi_file = os.path.join(cfolder, 'example_model_lsi.bin')
+        self.lsi_file = lsi_file
 
         utils.check_file_readable(dict_file)
         utils.check_file_readable(tfidf_file)
         utils.check_file_readable(lsi_file)
 
-        self.dictionary = dictionary.load(dict_file)
+        self.dictionary = dictionary.load(dict_file, mmap='r')
         self.tfidf_model = LoadTransformer('TFIDF', tfidf_file).model
         self.transformer = LoadTransformer('LSI', lsi_file)
 
@@ -83,3 +94,128 @@ class TransformationTest(unittest.TestCase):
         real_features = [round(float(x), 7) for x in real_features]
 
         self.assertListEqual(real_features, features)
+
+    def test_lsi_binary_shape(self):
+        """Test the binary and json shapes of the LSI model"""
+
+        model = TrainTransformer('LSI')
+        model.load(self.lsi_file)
+
+        binary_file = os.path.join(self.folder, 'model_LSI.shape.bin')
+        json_file = os.path.join(self.folder, 'model_LSI.json')
+
+        model.save_binary_shape(binary_file)
+        model.save_shape(json_file)
+
+        u = model.model.projection.u
+        matrix = shapes.load_binary(binary_file)
+        numpy.testing.assert_array_equal(u.astype(numpy.float32), matrix)
+
+        with open(json_file, 'r') as istream:
+            rows = [line for line in istream]
+
+        self.assertEqual(len(rows), u.shape[0])
+        self.assertEqual(rows[-1], json.dumps([float(x) for x in u[-1]]) + '\n')
+
+    def test_empty_binary_shape(self):
+        """Test the binary shape of a matrix without rows or columns"""
+
+        binary_file = os.path.join(self.folder, 'empty.shape.bin')
+
+        header = shapes.save_binary(
+            binary_file, numpy.zeros((0, 20), dtype=numpy.float32))
+        self.assertEqual((header['rows'], header['cols']), (0, 20))
+
+        for mmap_mode in ['r', None]:
+            matrix = shapes.load_binary(binary_file, mmap_mode)
+            self.assertEqual(matrix.shape, (0, 20))
+            self.assertEqual(matrix.dtype, numpy.float32)
+
+        self.assertRaises(
+            DataError, shapes.save_binary, binary_file,
+            numpy.zeros((3, 0), dtype=numpy.float32))
+
+    def test_lsi_topics(self):
+        """Test the top words of the LSI topics"""
+
+        topics = Topics('LSI', self.lsi_file)
+        top = topics.top_words(10)
+
+        for topic_id in [0, 5]:
+            words = topics.model.show_topic(topic_id, topics.model.num_terms)
+
+            self.assertListEqual(
+                [word for word, _ in words[:10]],
+                [word for word, _ in top['absolute'][topic_id]])
+            self.assertListEqual(
+                [word for word, weight in words if weight > 0][:10],
+                [word for word, _ in top['positive'][topic_id]])
+            self.assertListEqual(
+                [word for word, weight in words if weight < 0][:10],
+                [word for word, _ in top['negative'][topic_id]])
+
+    def test_sparse_rp_features(self):
+        """Test the batched sparse RP transformation"""
+
+        model = SparseRpModel(id2word=self.dictionary, num_topics=50)
+
+        docs = [self.doc, self.doc[:200], 'unknownword']
+        tfidf_docs = [
+            self.tfidf_model[self.dictionary.doc2bow(doc.split())]
+            for doc in docs]
+
+        features = model.transform_corpus(tfidf_docs)
+        self.assertEqual(features.shape, (3, 50))
+        self.assertFalse(features[2].any())
+
+        matrix = model.signs.toarray() * model.scale
+        for doc, doc_features in zip(tfidf_docs, features):
+            real_features = numpy.zeros(50)
+            for wid, weight in doc:
+                real_features += weight * matrix[wid]
+
+            numpy.testing.assert_allclose(real_features, doc_features)
+
+    def test_tfidf_matrix_reuse(self):
+        """Test the reuse and the rebuild of a memory-mapped TF-IDF matrix"""
+
+        matrix = os.path.join(self.folder, 'tfidf')
+        num_terms = 1 + max(self.dictionary.keys())
+
+        bow_docs = [
+            self.dictionary.doc2bow(doc.split())
+            for doc in [self.doc, self.doc[:200], self.doc[200:]]]
+        corpus = self.tfidf_model[bow_docs]
+
+        # matrix stored without fingerprint: never reused
+        checker = RandomizedLsi(id2word=self.dictionary)
+        fingerprint = checker.fingerprint(corpus, num_terms)
+        self.assertEqual(fingerprint['ndocs'], 3)
+
+        sparse_matrix.save(matrix, corpus, num_terms)
+        self.assertFalse(checker.reusable(matrix, fingerprint))
+
+        sparse_matrix.save(matrix, corpus, num_terms, fingerprint=fingerprint)
+        docs = sparse_matrix.load(matrix)
+        dense = docs.toarray()
+        self.assertTrue(checker.reusable(matrix, fingerprint))
+
+        # same vocabulary size, different document frequencies
+        other = copy.deepcopy(self.dictionary)
+        other.dfs[0] += 1
+        self.assertNotEqual(
+            RandomizedLsi(id2word=other).fingerprint(
+                corpus, num_terms)['dictionary'],
+            fingerprint['dictionary'])
+
+        # rebuild while the previous matrix is still memory-mapped
+        small = self.tfidf_model[bow_docs[:2]]
+        fingerprint = checker.fingerprint(small, num_terms)
+        self.assertFalse(checker.reusable(matrix, fingerprint))
+
+        sparse_matrix.save(matrix, small, num_terms, fingerprint=fingerprint)
+        numpy.testing.assert_array_equal(docs.toarray(), dense)
+
+        self.assertEqual(sparse_matrix.load(matrix).shape[0], 2)
+        self.assertTrue(checker.reusable(matrix, fingerprint))
+        self.assertEqual(os.listdir(self.folder), ['tfidf'])
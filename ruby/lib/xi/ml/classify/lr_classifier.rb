@@ -4,12 +4,16 @@
 
 # LogisticRegression classifier
 class Xi::ML::Classify::LRClassifier < Xi::ML::Tools::Component
-  attr_reader :input, :probas, \
+  attr_reader :input, :probas, :type, :multi_class, \
     :classes, :n_classes, :n_features, \
     :coeffs, :intercept
 
   STRUCTURE = %w[name n_classes n_features classes coeffs intercept].freeze
 
+  # optional keys: 'classifier_type' (multiclass by default, or multilabel)
+  # and 'multi_class' (ovr by default, or multinomial)
+  OPTIONAL = %w[classifier_type multi_class].freeze
+
   # Initialize the LogisticRegression classifier
   #
   # @param input [String] the file storing the classifier's configuration
@@ -44,13 +48,26 @@ class Xi::ML::Classify::LRClassifier < Xi::ML::Tools::Component
 
     raise Xi::ML::Error::ConfigError, \
       "Given parameters '#{params}' do not match '#{STRUCTURE}' structure" \
-      unless params.keys.sort == STRUCTURE.sort
+      unless (params.keys - OPTIONAL).sort == STRUCTURE.sort
+
+    @type = params.fetch('classifier_type', 'multiclass')
+
+    raise Xi::ML::Error::ConfigError, \
+      "Unknown classifier type '#{@type}'" \
+      unless %w[multiclass multilabel].include?(@type)
+
+    @multi_class = params.fetch('multi_class', 'ovr')
 
+    raise Xi::ML::Error::ConfigError, \
+      "Unknown multiclass scheme '#{@multi_class}'" \
+      unless %w[ovr multinomial].include?(@multi_class)
+
+    # multilabel: one binary model per class
     raise Xi::ML::Error::ConfigError, \
       'Invalid classifier model: '\
       "not equal dimensions between coefficients (#{params['coeffs'].size}) " \
       "and classes (#{params['n_classes']})" \
-      if params['n_classes'] > 2 \
+      if (params['n_classes'] > 2 || @type == 'multilabel') \
         && params['coeffs'].size != params['classes'].size
 
     # store parameters
@@ -66,7 +83,8 @@ class Xi::ML::Classify::LRClassifier < Xi::ML::Tools::Component
   # Predict class for a new document
   #
   # @param doc [Array] the list of float features
-  # @return [Hash] the most likely class and the class probabilities
+  # @return [Hash] the most likely class (multilabel: the list of classes)
+  #   and the class probabilities
   def classify_doc(doc)
     { probas: predict_proba(doc), category: predict_class(doc) }
   end
@@ -84,6 +102,17 @@ class Xi::ML::Classify::LRClassifier < Xi::ML::Tools::Component
       "instead of #{features.size} features"\
       if @n_features != features.size
 
+    # multilabel classifier: independent probability of each class
+    if @type == 'multilabel'
+      @probas = {}
+      @coeffs.each_with_index do |class_coeffs, index|
+        @probas[@classes[index]] = \
+          lr_prob(features, class_coeffs, @intercept[index])
+      end
+
+      return @probas
+    end
+
     # special format for the 2-class classifier
     if @n_classes == 2
       # coeffs: matrix form [1 x n_features]
@@ -100,6 +129,22 @@ class Xi::ML::Classify::LRClassifier < Xi::ML::Tools::Component
       return @probas
     end
 
+    if @n_classes > 2 && @multi_class == 'multinomial'
+      # softmax of the classes' scores
+      scores = @coeffs.each_with_index.map do |class_coeffs, index|
+        (Numo::DFloat[*features] * class_coeffs).sum + @intercept[index]
+      end
+
+      max_score = scores.max
+      exps = scores.map{|score| Math.exp(score - max_score) }
+      sum_e = exps.reduce {|sum, ex| sum + ex }
+
+      @probas = @classes.zip(exps).map{|category, ex|
+        [category, (ex / sum_e).round(7)] }.to_h
+
+      return @probas
+    end
+
     if @n_classes > 2
       # coeffs: matrix form [n_classes x n_features]
       # intercept: matrix form [n_classes x n_features]
@@ -139,13 +184,18 @@ class Xi::ML::Classify::LRClassifier < Xi::ML::Tools::Component
   #
   # @param doc [Array] given document's features
   # @return [String] the most likely class
+  #   (multilabel: [Array] the classes above 0.5, or the most likely class)
   def predict_class(doc)
     predict_proba(doc) if @probas.empty?
 
     # no features => no probabilities => category not available
     return Xi::ML::Classify::Classifier::NOCLASS if @probas.empty?
 
-    @probas.key(@probas.values.max)
+    best = @probas.key(@probas.values.max)
+    return best unless @type == 'multilabel'
+
+    categories = @probas.select{|_, prob| prob > 0.5 }.keys
+    categories.empty? ? [best] : categories
   end
 
   private :load_model_parameters, :lr_prob
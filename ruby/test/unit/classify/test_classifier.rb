@@ -93,4 +93,42 @@ class ClassifierTest < Minitest::Unit::TestCase
     assert_equal rprobas, probas
   end
 
+  def test_lr_multilabel
+    lr_file = File.join(File.dirname(__FILE__), 'example_lr_multilabel.json')
+    classifier = Xi::ML::Classify::Classifier.new(:LogisticRegression, lr_file)
+
+    # independent class probabilities: all classes above 0.5
+    probas = classifier.classify_doc([1.0, 3.0, 0.0])
+    rprobas = {
+      category: ['non-sport', 'sport'],
+      probas: {
+        'non-sport' => 0.8612255,
+        'sport' => 0.9901388,
+      },
+    }
+
+    assert_equal rprobas, probas
+
+    probas = classifier.classify_doc([-1.0, 0.3, -0.4])
+    assert_equal ['non-sport'], probas[:category]
+  end
+
+  def test_lr_multinomial
+    lr_file = File.join(File.dirname(__FILE__), 'example_lr_multinomial.json')
+    classifier = Xi::ML::Classify::Classifier.new(:LogisticRegression, lr_file)
+
+    # softmax of the classes' scores
+    probas = classifier.classify_doc([1.0, 3.0, 0.0])
+    rprobas = {
+      category: 'non-sport',
+      probas: {
+        'non-sport' => 0.4499147,
+        'society' => 0.1329508,
+        'sport' => 0.4171346,
+      },
+    }
+
+    assert_equal rprobas, probas
+  end
+
 end